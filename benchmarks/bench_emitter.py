@@ -0,0 +1,77 @@
+"""Memory and time of the streaming dict emitter as the entity count grows.
+
+    python benchmarks/bench_emitter.py [max_faces]
+
+Emits a blockMeshDict with N boundary faces spread over N / 10 patches, once
+through DictEmitter straight to a file and once by building the whole text
+with ``+=`` first (how generate_dict used to work). Peak memory of the
+emitter should stay flat while the concatenated string grows with N.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmg.emitter import emit_block_mesh_dict  # noqa: E402
+
+
+def patches(n_faces):
+    per_patch = 10
+    for p in range(n_faces // per_patch):
+        base = p * per_patch
+        yield f"patch{p}", "wall", (f"({i} {i + 1} {i + 2} {i + 3})" for i in range(base, base + per_patch))
+
+
+def vertices():
+    return [(0.0, 0.0, 0.0)] * 8
+
+
+BLOCKS = ["hex (0 1 2 3 4 5 6 7) (10 10 10) simpleGrading (1 1 1)"]
+
+
+def streamed(path, n_faces):
+    with open(path, "w") as f:
+        emit_block_mesh_dict(f, 1, vertices(), BLOCKS, patches(n_faces))
+
+
+def concatenated(path, n_faces):
+    boundary_str = "boundary\n(\n"
+    for name, patch_type, faces in patches(n_faces):
+        boundary_str += f"    {name}\n    {{\n        type {patch_type};\n        faces\n        (\n"
+        for face in faces:
+            boundary_str += f"            {face}\n"
+        boundary_str += "        );\n    }\n"
+    boundary_str += ");\n"
+    with open(path, "w") as f:
+        f.write(boundary_str)
+
+
+def measure(func, path, n_faces):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(path, n_faces)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "blockMeshDict")
+    print(f"{'faces':>10} {'stream s':>10} {'stream KiB':>11} {'concat s':>10} {'concat KiB':>11}")
+    max_faces = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_faces = 1_000
+    while n_faces <= max_faces:
+        stream_time, stream_peak = measure(streamed, path, n_faces)
+        concat_time, concat_peak = measure(concatenated, path, n_faces)
+        print(f"{n_faces:>10} {stream_time:>10.3f} {stream_peak / 1024:>11.0f} "
+              f"{concat_time:>10.3f} {concat_peak / 1024:>11.0f}")
+        n_faces *= 10
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
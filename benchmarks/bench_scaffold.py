@@ -0,0 +1,70 @@
+"""Scaffolding complete cases from a template: time and extra disk per link mode.
+
+    python benchmarks/bench_scaffold.py [cases] [mode ...]
+
+Builds a template case of about 4 MB (system/, constant/, 0/ and a 2 MB
+results directory that must be left out), then runs a batch of ``cases``
+cases (10k by default) with ``--template`` for each mode given ("auto"
+by default; "copy" needs the full template size per case). Disk use
+counts every inode once, the way ``du`` does.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmg.batch import run_batch  # noqa: E402
+from bmg.scaffold import load_template  # noqa: E402
+
+TEMPLATE_FILES = {
+    "system/controlDict": 4_000, "system/fvSchemes": 2_000, "system/fvSolution": 3_000,
+    "system/decomposeParDict": 1_000, "constant/transportProperties": 1_000,
+    "constant/turbulenceProperties": 1_000, "0/U": 2_000, "0/p": 2_000, "0/k": 2_000,
+    "0/nut": 2_000, "0/alpha.water": 2_000_000, "100/U": 2_000_000, "Allrun": 500,
+}
+
+
+def write_template(root):
+    for rel, size in TEMPLATE_FILES.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+
+
+def disk_usage(root):
+    seen = set()
+    total = 0
+    for directory, _, names in os.walk(root):
+        for path in [directory] + [os.path.join(directory, name) for name in names]:
+            st = os.lstat(path)
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+    return total
+
+
+def main():
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    modes = sys.argv[2:] or ["auto"]
+    entries = [{"name": f"case{i:05d}", "lengths": [1, 1, 1], "cells": [10 + i % 50, 10, 10]} for i in range(cases)]
+    with tempfile.TemporaryDirectory() as tmp:
+        template_dir = os.path.join(tmp, "template")
+        write_template(template_dir)
+        print(f"{cases:,} cases from a {disk_usage(template_dir) / 2 ** 20:.1f} MB template")
+        for mode in modes:
+            out_dir = os.path.join(tmp, f"cases-{mode}")
+            template = load_template(template_dir, out_dir, mode)
+            start = time.perf_counter()
+            for _, name, _, error in run_batch(entries, out_dir, template=template):
+                if error:
+                    raise RuntimeError(f"{name}: {error}")
+            elapsed = time.perf_counter() - start
+            print(f"{mode:<6} ({template['link']:<8}) {elapsed:>7.2f} s  {cases / elapsed:>8.0f} cases/s  "
+                  f"{disk_usage(out_dir) / 2 ** 20:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
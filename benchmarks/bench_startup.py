@@ -0,0 +1,76 @@
+"""Cold start time of the library and command line paths.
+
+    python benchmarks/bench_startup.py [runs] [budget_ms]
+
+Each command runs in a fresh interpreter ``runs`` times (default 10) and
+the best and median wall times are reported next to a bare ``python -c
+pass`` for reference. Exits with status 1 if the median of any bmg command
+is over the budget (default 100 ms) or if anything on the library path
+imports tkinter.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASE = '{"lengths": [1, 1, 1], "cells": [10, 10, 10]}'
+
+
+def commands(case_path, out_dir):
+    return [
+        ("python -c pass", [sys.executable, "-c", "pass"]),
+        ("import bmg", [sys.executable, "-c", "import bmg"]),
+        ("render a dict", [sys.executable, "-c",
+                           "import bmg; bmg.render_dict(bmg.normalize_case(%s))" % CASE]),
+        ("bmg --help", [sys.executable, "-m", "bmg", "--help"]),
+        ("bmg batch (1 case)", [sys.executable, "-m", "bmg", "batch", case_path, "-o", out_dir, "-j", "1"]),
+    ]
+
+
+def time_command(argv, runs):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, env=env, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def loads_tkinter():
+    code = ("import sys, bmg, bmg.cli, bmg.core, bmg.batch; bmg.render_dict; "
+            "print('tkinter' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip() == "True"
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+    work = tempfile.mkdtemp()
+    case_path = os.path.join(work, "cases.json")
+    with open(case_path, "w") as f:
+        f.write("[%s]" % CASE)
+
+    over = False
+    print(f"{'command':<22} {'best ms':>9} {'median ms':>10}")
+    for label, argv in commands(case_path, os.path.join(work, "out")):
+        best, median = time_command(argv, runs)
+        flag = ""
+        if label != "python -c pass" and median * 1000 > budget:
+            flag = "  over budget"
+            over = True
+        print(f"{label:<22} {best * 1000:>9.1f} {median * 1000:>10.1f}{flag}")
+    if loads_tkinter():
+        print("tkinter is imported on the library path")
+        over = True
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
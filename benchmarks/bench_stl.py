@@ -0,0 +1,72 @@
+"""Binary STL bounding box: strided reduction against a per-triangle loop.
+
+    python benchmarks/bench_stl.py [triangles]
+
+Writes a binary STL of random triangles (2M by default, about 95 MB) and
+times ``stl_bounds`` with one worker against unpacking every record with
+``struct.iter_unpack``. Both must agree exactly.
+"""
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmg.stl import HEADER_BYTES, RECORD_BYTES, stl_bounds  # noqa: E402
+
+
+def write_stl(path, count):
+    buf = bytearray(HEADER_BYTES + 4 + RECORD_BYTES * count)
+    struct.pack_into("<I", buf, HEADER_BYTES, count)
+    records = memoryview(buf)[HEADER_BYTES + 4:]
+    for offset in range(12, 48, 4):
+        column = array("f", (random.uniform(-1, 1) for _ in range(count))).tobytes()
+        for byte in range(4):
+            records[offset + byte::RECORD_BYTES] = column[byte::4]
+    with open(path, "wb") as f:
+        f.write(buf)
+
+
+def per_triangle(path):
+    low = [float("inf")] * 3
+    high = [float("-inf")] * 3
+    with open(path, "rb") as f:
+        data = f.read()
+    for record in struct.iter_unpack("<12fH", data[HEADER_BYTES + 4:]):
+        for i in range(3, 12):
+            value = record[i]
+            axis = i % 3
+            if value < low[axis]:
+                low[axis] = value
+            if value > high[axis]:
+                high[axis] = value
+    return low, high
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "surface.stl")
+        write_stl(path, count)
+        size = os.path.getsize(path) / 2 ** 20
+
+        start = time.perf_counter()
+        fast = stl_bounds(path, workers=1)
+        fast_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        slow = per_triangle(path)
+        slow_time = time.perf_counter() - start
+
+    assert fast == slow, (fast, slow)
+    print(f"{count:,} triangles, {size:.0f} MB")
+    print(f"{'stl_bounds':<14} {fast_time:>7.2f} s  {size / fast_time:>7.0f} MB/s")
+    print(f"{'per triangle':<14} {slow_time:>7.2f} s  {size / slow_time:>7.0f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Benchmark and regression suite.
+
+    python benchmarks/suite.py [--quick] [--output results.json]
+                               [--baseline FILE] [--threshold 0.25]
+                               [--save-baseline] [--update-golden]
+
+First the golden files are checked: every case in golden/cases.json is
+built from its GUI fields the way generate_dict does, must pass
+validate_case, and is rendered and compared byte for byte with
+golden/<name>.blockMeshDict. Then the benchmarks run, each
+reporting the best of several repeats:
+
+    render_box_us            one single-box dict from GUI fields (the baseline path)
+    render_patches_ms        a dict with 100k boundary faces in 10k patches
+    preview_us               the GUI preview of a graded 2000 x 2000 x 2000 box
+    validation_us            re-checking the GUI form after one keystroke in a cells field
+    batch_j<N>_cases_per_s   batch throughput with 1, 2 and 4 workers
+    cell_stats_1e<K>_ms      cell statistics and quality report, 10^6 to 10^9 cells
+    cell_stats_line_ms       the same for a graded 10^9 x 1 x 1 line of cells
+    responses_queue_us       what saving responses.json costs the GUI thread
+    responses_save_us        the atomic write and journal append on the saver thread
+    responses_load_us        reading it back
+    library_import_per_s     importing 50k cases into the SQLite case library
+    library_page_ms          the first page of the library listing
+    library_search_ms        a name search with its match count
+
+Results are compared with the stored baseline (baseline.json next to this
+file). The run fails if a golden file differs or a metric is worse than
+its baseline by more than the threshold (25% by default). Timings depend
+on the machine, so save a baseline on the machine that runs the comparison.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bmg.batch import run_batch  # noqa: E402
+from bmg.core import case_from_fields, default_patch_names, normalize_patch_names, render_dict, validate_case  # noqa: E402
+from bmg.emitter import emit_block_mesh_dict  # noqa: E402
+from bmg.grading import cell_stats  # noqa: E402
+from bmg.library import Library  # noqa: E402
+from bmg.persist import Saver, load as load_responses  # noqa: E402
+from bmg.preview import preview_scene  # noqa: E402
+from bmg.quality import mesh_quality  # noqa: E402
+from bmg.validation import box_validator  # noqa: E402
+
+GOLDEN_DIR = os.path.join(HERE, "golden")
+BASELINE_FILE = os.path.join(HERE, "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+
+BATCH_CASES = 1000
+BATCH_WORKERS = [1, 2, 4]
+
+LIBRARY_CASES = 50_000
+
+
+def best_time(func, repeat, number=1):
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def golden_cases():
+    with open(os.path.join(GOLDEN_DIR, "cases.json"), "r") as f:
+        return json.load(f)
+
+
+def check_golden(update=False):
+    """Names of the golden cases whose output differs or that fail validate_case (all rewritten with ``update``)."""
+    failed = []
+    for name, fields in golden_cases().items():
+        case = case_from_fields(fields)
+        try:
+            validate_case(case)
+        except ValueError as e:
+            print(f"golden case {name} is invalid: {e}", file=sys.stderr)
+            failed.append(name)
+            continue
+        text = render_dict(case)
+        path = os.path.join(GOLDEN_DIR, f"{name}.blockMeshDict")
+        if update:
+            with open(path, "w") as f:
+                f.write(text)
+            continue
+        with open(path, "r") as f:
+            if f.read() != text:
+                failed.append(name)
+    return failed
+
+
+def bench_render_box(repeat):
+    fields = golden_cases()["channel_mm"]
+    return 1e6 * best_time(lambda: render_dict(case_from_fields(fields)), repeat, 200)
+
+
+def bench_render_patches(repeat, tmp):
+    per_patch = 10
+    n_faces = 100_000
+    path = os.path.join(tmp, "blockMeshDict")
+
+    def patches():
+        for p in range(n_faces // per_patch):
+            base = p * per_patch
+            yield f"patch{p}", "wall", (f"({i} {i + 1} {i + 2} {i + 3})" for i in range(base, base + per_patch))
+
+    def emit():
+        with open(path, "w") as f:
+            emit_block_mesh_dict(f, 1, [(0.0, 0.0, 0.0)] * 8,
+                                 ["hex (0 1 2 3 4 5 6 7) (10 10 10) simpleGrading (1 1 1)"], patches())
+
+    return 1e3 * best_time(emit, repeat)
+
+
+def bench_preview(repeat):
+    case = {"origin": [0, 0, 0], "lengths": [2, 1, 0.5], "cells": [2000, 2000, 2000],
+            "grading": [4, [[0.5, 0.5, 4], [0.5, 0.5, 0.25]], 1], "patch_names": default_patch_names()}
+    return 1e6 * best_time(lambda: preview_scene(case), repeat, 100)
+
+
+def bench_validation(repeat):
+    fields = {"xmin": "0", "ymin": "0", "zmin": "0", "length_x": "2", "length_y": "1", "length_z": "0.5",
+              "cells_x": "2000", "cells_y": "2000", "cells_z": "2000",
+              "grading_x": "4", "grading_y": "(0.5 0.5 4) (0.5 0.5 0.25)", "grading_z": ""}
+    validator = box_validator(fields)
+    values = iter(["2000", "2001"] * 1000000)
+
+    # What the GUI asks for after a keystroke: the field's error, the reset button, the cost and the preview
+    def keystroke():
+        validator.set("cells_x", next(values))
+        validator.error("cells x")
+        validator.get("is reset")
+        validator.get("cells")
+        validator.get("box")
+    return 1e6 * best_time(keystroke, repeat, 1000)
+
+
+def bench_batch(repeat, tmp, workers):
+    entries = [{"name": f"c{i}", "lengths": [1, 1, 1], "cells": [10 + i % 50, 10, 10]} for i in range(BATCH_CASES)]
+
+    def run():
+        out_dir = tempfile.mkdtemp(dir=tmp)
+        for _, _, _, error in run_batch(entries, out_dir, workers=workers):
+            if error:
+                raise RuntimeError(error)
+
+    return BATCH_CASES / best_time(run, repeat)
+
+
+def bench_cell_stats(repeat, exponent, line=False):
+    n = round(10 ** (exponent / 3))
+    case = {"origin": [0, 0, 0], "lengths": [4, 1, 0.5], "cells": [n, n, n],
+            "grading": [4, [[0.5, 0.5, 4], [0.5, 0.5, 0.25]], 0.25]}
+    if line:
+        # Cost must follow the shorter axes, not the cell count along the long one
+        case["cells"] = [10 ** exponent, 1, 1]
+        case["grading"] = [[[0.5, 0.5, 4], [0.5, 0.5, 0.25]], 1, 1]
+
+    def stats():
+        cell_stats(case)
+        mesh_quality([case])
+
+    return 1e3 * best_time(stats, repeat)
+
+
+def responses_payload():
+    fields = dict(golden_cases()["channel_mm"])
+    fields["patch_names"] = normalize_patch_names(fields["patch_names"])
+    fields["save_responses"] = True
+    return fields
+
+
+def bench_responses(repeat, tmp):
+    # The GUI's save_data() queues on a Saver; the write itself happens on its thread
+    path = os.path.join(tmp, "responses.json")
+    data = responses_payload()
+    queued = Saver(path, delay=3600)
+    queue = best_time(lambda: queued.save(data), repeat, 200)
+    queued.close()
+    saver = Saver(path, delay=0)
+
+    def save():
+        saver.save(data)
+        saver.flush()
+
+    save_time = best_time(save, repeat, 20)
+    saver.close()
+    return 1e6 * queue, 1e6 * save_time, 1e6 * best_time(lambda: load_responses(path), repeat, 200)
+
+
+def bench_library(repeat, tmp):
+    manifest = os.path.join(tmp, "library.jsonl")
+    with open(manifest, "w") as f:
+        for i in range(LIBRARY_CASES):
+            fields = {"xmin": "0", "ymin": "0", "zmin": "0", "length_x": str(1 + i % 7), "length_y": "1",
+                      "length_z": "0.5", "cells_x": str(10 + i % 100), "cells_y": "20", "cells_z": "5"}
+            f.write(json.dumps({"name": f"case{i:06d}", "tags": [f"project{i % 50}"], "fields": fields}) + "\n")
+    with Library(os.path.join(tmp, "cases.db")) as library:
+        start = time.perf_counter()
+        library.import_jsonl(manifest)
+        rate = LIBRARY_CASES / (time.perf_counter() - start)
+        page = best_time(library.search, repeat, 20)
+        search = best_time(lambda: (library.search("99"), library.count("99")), repeat, 5)
+    return rate, 1e3 * page, 1e3 * search
+
+
+def run_benchmarks(repeat):
+    """{metric: {"value", "unit", "better"}} for every benchmark."""
+    results = {}
+
+    def add(name, value, unit, better="lower"):
+        results[name] = {"value": value, "unit": unit, "better": better}
+        print(f"  {name:<26} {value:>12.3f} {unit}", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        add("render_box_us", bench_render_box(repeat), "us")
+        add("render_patches_ms", bench_render_patches(repeat, tmp), "ms")
+        add("preview_us", bench_preview(repeat), "us")
+        add("validation_us", bench_validation(repeat), "us")
+        for workers in BATCH_WORKERS:
+            add(f"batch_j{workers}_cases_per_s", bench_batch(repeat, tmp, workers), "cases/s", "higher")
+        for exponent in (6, 7, 8, 9):
+            add(f"cell_stats_1e{exponent}_ms", bench_cell_stats(repeat, exponent), "ms")
+        add("cell_stats_line_ms", bench_cell_stats(repeat, 9, line=True), "ms")
+        queue, save, load = bench_responses(repeat, tmp)
+        add("responses_queue_us", queue, "us")
+        add("responses_save_us", save, "us")
+        add("responses_load_us", load, "us")
+        rate, page, search = bench_library(repeat, tmp)
+        add("library_import_per_s", rate, "cases/s", "higher")
+        add("library_page_ms", page, "ms")
+        add("library_search_ms", search, "ms")
+    return results
+
+
+def machine():
+    return {"host": platform.node(), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(results, baseline, threshold):
+    """Table lines and the names of metrics that regressed beyond ``threshold``."""
+    lines = [f"{'metric':<26} {'value':>12} {'baseline':>12} {'change':>8}"]
+    regressed = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            lines.append(f"{name:<26} {result['value']:>12.3f} {'-':>12} {'':>8}")
+            continue
+        value, old = result["value"], base["value"]
+        # Positive change is always worse: more time, or fewer cases per second
+        change = (value - old) / old if result["better"] == "lower" else (old - value) / old
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        lines.append(f"{name:<26} {value:>12.3f} {old:>12.3f} {100 * change:>+7.1f}%{flag}")
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="fewer repeats")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden files from the current output")
+    args = parser.parse_args()
+
+    failed = check_golden(args.update_golden)
+    if args.update_golden:
+        print("Golden files rewritten.", file=sys.stderr)
+    for name in failed:
+        print(f"golden file {name}.blockMeshDict differs from the current output", file=sys.stderr)
+
+    print("Running benchmarks...", file=sys.stderr)
+    report = {"machine": machine(), "created": time.time(), "results": run_benchmarks(3 if args.quick else 7)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    regressed = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        lines, regressed = compare(report["results"], baseline, args.threshold)
+        print("\n".join(lines))
+        if baseline.get("machine", {}).get("host") != report["machine"]["host"]:
+            print("(baseline was recorded on another machine)")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Baseline saved to {args.baseline}.")
+
+    if failed or regressed:
+        print(f"{len(failed)} golden mismatch(es), {len(regressed)} regression(s) over {100 * args.threshold:.0f}%.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
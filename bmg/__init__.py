@@ -0,0 +1,38 @@
+"""blockMeshDict generator: importable core used by the GUI and the ``bmg`` command line.
+
+Nothing is imported until it is used, so ``import bmg`` costs next to
+nothing and never loads tkinter; the GUI lives in ``bmg.gui``.
+"""
+import importlib
+
+# Public name -> module it lives in
+_exports = {
+    "case_from_fields": "bmg.core",
+    "fields_from_case": "bmg.core",
+    "normalize_case": "bmg.core",
+    "render_dict": "bmg.core",
+    "validate_case": "bmg.core",
+    "write_dict": "bmg.core",
+    "write_polymesh": "bmg.polymesh",
+    "load_block_mesh_dict": "bmg.dictparser",
+    "render_multiblock": "bmg.multiblock",
+    "case_quality": "bmg.quality",
+    "estimate_cost": "bmg.cost",
+    "plan_decomposition": "bmg.decompose",
+    "auto_size": "bmg.autosize",
+    "open_library": "bmg.library",
+}
+
+__all__ = sorted(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module 'bmg' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
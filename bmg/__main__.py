@@ -0,0 +1,5 @@
+import sys
+
+from bmg.cli import main
+
+sys.exit(main())
@@ -0,0 +1,160 @@
+"""Pick cells_x/y/z for a target cell count or cell size.
+
+The search minimises the largest aspect ratio of the (uniform) cells over
+integer triples whose total lies in the allowed range. It walks outwards
+from the ideal counts L / h and stops in each direction as soon as a lower
+bound on the aspect ratio reaches the best one found: if one cell size is t
+times the geometric mean cell size, the other two multiply to 1 / t and so
+the aspect ratio is at least t ** 1.5. Only a handful of triples end up
+being looked at, even for 10^9 cells.
+"""
+import math
+
+# Fraction below the budget (or either side of a target size) a result may land
+DEFAULT_TOLERANCE = 0.1
+
+# Aspect ratios this close (relatively) count as equal: a bound only prunes
+# when it is worse than the best by more than this, so rounding in L / n
+# neither drops an equal ratio with a bigger total nor keeps a dead branch going
+RATIO_TOLERANCE = 1e-12
+
+
+def _aspect_ratio(sizes):
+    return max(sizes) / min(sizes)
+
+
+def _multiples_outward(ideal, multiple, low, high):
+    # Multiples of ``multiple`` within [low, high], nearest to ``ideal`` first,
+    # as two iterators walking down and up
+    low = -(-low // multiple) * multiple
+    high = high // multiple * multiple
+    if high < low:
+        return range(0), range(0)
+    start = max(low, min(high, int(ideal // multiple) * multiple))
+    return range(start, low - 1, -multiple), range(start + multiple, high + 1, multiple)
+
+
+def _mean_bound(d, g_low, g_high):
+    # Lower bound on the aspect ratio of a cell with one size d when the
+    # geometric mean size lies in [g_low, g_high]
+    if d > g_high:
+        return (d / g_high) ** 1.5
+    if d < g_low:
+        return (g_low / d) ** 1.5
+    return 1.0
+
+
+def _best_nz(lengths, nx, ny, multiple, low, high, dx, dy):
+    nz_low = max(multiple, -(-low // (nx * ny)))
+    nz_low = -(-nz_low // multiple) * multiple
+    nz_high = high // (nx * ny) // multiple * multiple
+    if nz_high < nz_low:
+        return None
+    best = None
+    for d in (dx, dy):
+        guess = lengths[2] / d
+        base = int(guess // multiple) * multiple
+        for nz in (base, base + multiple, nz_low, nz_high):
+            nz = min(max(nz, nz_low), nz_high)
+            ratio = _aspect_ratio((dx, dy, lengths[2] / nz))
+            # Equal ratios go to the bigger count, as in _search
+            if best is None or (ratio, -nz) < (best[0], -best[1]):
+                best = (ratio, nz)
+    return best
+
+
+def _search(lengths, low, high, multiple):
+    # The shortest axis has the fewest counts to try and the coarsest steps
+    # between them, so it goes in the outer loop and the longest is solved last
+    order = sorted(range(3), key=lambda a: lengths[a])
+    best = _search_ordered([lengths[a] for a in order], low, high, multiple)
+    if best is None:
+        return None
+    ratio, total, ordered = best
+    cells = [0, 0, 0]
+    for a, n in zip(order, ordered):
+        cells[a] = n
+    return ratio, total, tuple(cells)
+
+
+def _search_ordered(lengths, low, high, multiple):
+    volume = lengths[0] * lengths[1] * lengths[2]
+    g_low = (volume / high) ** (1 / 3)
+    g_high = (volume / max(low, 1)) ** (1 / 3)
+    g = (volume / ((low + high) / 2)) ** (1 / 3)
+    best = None
+
+    def better(candidate):
+        return best is None or (candidate[0], -candidate[1]) < (best[0], -best[1])
+
+    def reached(bound):
+        return best is not None and bound > best[0] * (1 + RATIO_TOLERANCE)
+
+    for nx_range in _multiples_outward(lengths[0] / g, multiple, multiple, high // (multiple * multiple)):
+        for nx in nx_range:
+            dx = lengths[0] / nx
+            if reached(_mean_bound(dx, g_low, g_high)):
+                break
+            ny_high = high // (nx * multiple)
+            for ny_range in _multiples_outward(lengths[1] / dx, multiple, multiple, ny_high):
+                for ny in ny_range:
+                    dy = lengths[1] / ny
+                    if reached(max(_aspect_ratio((dx, dy)), _mean_bound(dy, g_low, g_high))):
+                        break
+                    found = _best_nz(lengths, nx, ny, multiple, low, high, dx, dy)
+                    if found is None:
+                        continue
+                    ratio, nz = found
+                    candidate = (ratio, nx * ny * nz, (nx, ny, nz))
+                    if better(candidate):
+                        best = candidate
+    return best
+
+
+def auto_size(lengths, total_cells=None, cell_size=None, multiple=1, tolerance=DEFAULT_TOLERANCE):
+    """Cell counts giving the most nearly cubic cells.
+
+    Give either ``total_cells``, a budget the result stays within (and no
+    more than ``tolerance`` below), or ``cell_size``, a target size the
+    total may miss by ``tolerance`` either way. Every count is a multiple of
+    ``multiple``. If nothing fits, the tolerance is widened step by step.
+    Returns {"cells", "total", "aspect_ratio", "sizes"}; raises ValueError
+    for impossible inputs.
+    """
+    lengths = [float(v) for v in lengths]
+    if len(lengths) != 3 or min(lengths) <= 0:
+        raise ValueError("Three positive lengths are needed.")
+    multiple = int(multiple)
+    if multiple < 1:
+        raise ValueError("The multiple must be at least 1.")
+    volume = lengths[0] * lengths[1] * lengths[2]
+    if total_cells is not None:
+        target = int(total_cells)
+    elif cell_size is not None:
+        if cell_size <= 0:
+            raise ValueError("The cell size must be positive.")
+        target = max(1, round(volume / float(cell_size) ** 3))
+    else:
+        raise ValueError("Give a total cell count or a cell size.")
+    if target < multiple ** 3:
+        raise ValueError(f"At least {multiple ** 3} cells are needed for multiples of {multiple}.")
+
+    while True:
+        if total_cells is not None:
+            low, high = max(1, math.ceil(target * (1 - tolerance))), target
+        else:
+            low, high = max(1, math.ceil(target / (1 + tolerance))), math.floor(target * (1 + tolerance))
+        best = _search(lengths, low, high, multiple)
+        if best is not None or tolerance >= 1:
+            break
+        tolerance = min(1.0, tolerance * 2)
+    if best is None:
+        raise ValueError("No cell counts fit the target.")
+
+    ratio, total, cells = best
+    return {
+        "cells": list(cells),
+        "total": total,
+        "aspect_ratio": ratio,
+        "sizes": [length / n for length, n in zip(lengths, cells)],
+    }
@@ -0,0 +1,209 @@
+"""Headless batch generation of blockMeshDicts from a manifest of cases."""
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from bmg import trace
+from bmg.core import normalize_case, validate_case, write_dict
+
+# Cases handed to a worker per task; big enough to amortise the pickling round trip
+DEFAULT_CHUNKSIZE = 64
+
+
+def read_manifest(path):
+    """Yield raw case entries from a .json, .jsonl or .csv manifest.
+
+    JSONL and CSV manifests are streamed, so very long manifests never sit in
+    memory as a whole. A .json manifest is either a list of cases or an object
+    with a "cases" list and optional "defaults" merged into every case.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".jsonl":
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    elif ext == ".csv":
+        with open(path, "r", newline="") as f:
+            for row in csv.DictReader(f):
+                # Patch maps don't fit in a column, so they are stored as JSON text
+                if row.get("patch_names"):
+                    row["patch_names"] = json.loads(row["patch_names"])
+                yield {key: val for key, val in row.items() if val not in (None, "")}
+    else:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            defaults = data.get("defaults", {})
+            for entry in data.get("cases", []):
+                case = dict(defaults)
+                case.update(entry)
+                yield case
+        else:
+            yield from data
+
+
+def case_name(raw, index):
+    """Directory of a case below the output directory.
+
+    ValueError for names that would put it anywhere else: absolute names,
+    names with a path separator and "." or "..".
+    """
+    name = str(raw.get("name") or f"case_{index:05d}")
+    if os.path.isabs(name) or "/" in name or "\\" in name or name in (".", ".."):
+        raise ValueError(f"Case name '{name}' must be a plain directory name, without path separators or '..'.")
+    return name
+
+
+def check_names(entries):
+    """Raise ValueError for the first bad or repeated case name in ``entries``.
+
+    Only the names are kept, so a streamed manifest can be checked before
+    anything is written without holding its cases in memory.
+    """
+    first = {}
+    for index, raw in enumerate(entries):
+        name = case_name(raw, index)
+        if name in first:
+            raise ValueError(f"Cases {first[name]} and {index} are both named '{name}'; "
+                             f"they would be written to the same directory.")
+        first[name] = index
+
+
+def dict_dir(out_dir, name, template=None):
+    # Cases scaffolded from a template are complete OpenFOAM cases with the dicts in system/
+    return os.path.join(out_dir, name, "system") if template else os.path.join(out_dir, name)
+
+
+def generate_case(index, raw, out_dir, polymesh=None, template=None):
+    # Runs inside a worker: returns (index, name, path, error) instead of raising
+    try:
+        name = case_name(raw, index)
+    except ValueError as e:
+        return index, raw.get("name"), None, str(e)
+    trace.count("cases")
+    decompose = raw.get("processors") or raw.get("nodes")
+    try:
+        if "blocks" in raw:
+            if template:
+                scaffold(raw, out_dir, name, template, decompose)
+            return index, name, write_multiblock_case(raw, out_dir, name, polymesh, template), None
+        case = normalize_case(raw)
+        validate_case(case)
+        if not decompose:
+            # Left over from a run with processors set; a template's own is placed again below
+            try:
+                os.unlink(os.path.join(dict_dir(out_dir, name, template), "decomposeParDict"))
+            except FileNotFoundError:
+                pass
+        if template:
+            scaffold(raw, out_dir, name, template, decompose)
+        path = write_dict(case, os.path.join(dict_dir(out_dir, name, template), "blockMeshDict"))
+        if decompose:
+            write_decomposition(case, raw, os.path.join(dict_dir(out_dir, name, template), "decomposeParDict"))
+        if polymesh:
+            from bmg.polymesh import write_polymesh
+            write_polymesh(case, os.path.join(out_dir, name), binary=polymesh == "binary")
+        return index, name, path, None
+    except ValueError as e:
+        return index, name, None, str(e)
+    except Exception as e:
+        return index, name, None, f"{type(e).__name__}: {e}"
+
+
+@trace.traced("scaffold")
+def scaffold(raw, out_dir, name, template, decompose):
+    from bmg.scaffold import scaffold_case, unshare
+
+    skip = ["system/decomposeParDict"] if decompose else []
+    scaffold_case(os.path.join(out_dir, name), template, skip)
+    for rel in skip:
+        unshare(os.path.join(out_dir, name, rel))
+
+
+def write_decomposition(case, raw, path):
+    from bmg.decompose import plan_decomposition, write_decompose_par_dict
+
+    best = plan_decomposition(case["cells"], raw.get("processors"), raw.get("nodes"))[0]
+    return write_decompose_par_dict(best["n"], path, raw.get("decomposition_method", "hierarchical"))
+
+
+def write_multiblock_case(raw, out_dir, name, polymesh=None, template=None):
+    from bmg.multiblock import emit_multiblock, normalize_multiblock
+
+    if polymesh:
+        raise ValueError("Direct polyMesh output only supports single-block cases.")
+    if raw.get("processors") or raw.get("nodes"):
+        raise ValueError("Decomposition planning only supports single-block cases.")
+    topology = normalize_multiblock(raw)
+    path = os.path.join(dict_dir(out_dir, name, template), "blockMeshDict")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        emit_multiblock(topology, f)
+    return path
+
+
+def generate_chunk(chunk, out_dir, polymesh=None, template=None):
+    return [generate_case(index, raw, out_dir, polymesh, template) for index, raw in chunk]
+
+
+def traced_chunk(chunk, out_dir, polymesh=None, template=None):
+    # Worker side of a profiled batch: the spans travel back with the results
+    trace.enable()
+    results = generate_chunk(chunk, out_dir, polymesh, template)
+    return results, trace.collect()
+
+
+def _chunk_results(future, traced):
+    if not traced:
+        return future.result()
+    results, snapshot = future.result()
+    trace.merge(snapshot)
+    return results
+
+
+def _chunks(entries, chunksize):
+    chunk = []
+    for index, raw in enumerate(entries):
+        chunk.append((index, raw))
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(entries, out_dir, workers=None, chunksize=DEFAULT_CHUNKSIZE, polymesh=None, template=None):
+    """Generate every case in ``entries`` below ``out_dir``.
+
+    Yields (index, name, path, error) per case as chunks complete; a failing
+    case reports its error and the rest of the batch carries on. Only a few
+    chunks per worker are in flight at once, so lazily produced entries stay
+    lazy. With ``polymesh`` set to "ascii" or "binary", constant/polyMesh is
+    written next to each dict as well. With a ``template`` from
+    ``bmg.scaffold.load_template``, every case becomes a complete OpenFOAM
+    case sharing the template's files, with its dicts in system/.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(entries, chunksize)
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from generate_chunk(chunk, out_dir, polymesh, template)
+        return
+
+    traced = trace.is_enabled()
+    job = traced_chunk if traced else generate_chunk
+    max_in_flight = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(job, chunk, out_dir, polymesh, template))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from _chunk_results(future, traced)
+        for future in pending:
+            yield from _chunk_results(future, traced)
@@ -0,0 +1,567 @@
+"""Command line entry point: ``python -m bmg <command> ...``."""
+import argparse
+import sys
+import time
+
+
+def load_template(args):
+    # None without --template; prints why and returns False if the template can't be used
+    if not args.template:
+        return None
+    from bmg.scaffold import load_template as load
+
+    try:
+        template = load(args.template, args.output, args.link)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return False
+    print(f"{len(template['files'])} template file(s) shared by {template['link']}.")
+    return template
+
+
+def cmd_batch(args):
+    from bmg.batch import check_names, read_manifest, run_batch
+
+    try:
+        check_names(read_manifest(args.manifest))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    template = load_template(args)
+    if template is False:
+        return 1
+    start = time.perf_counter()
+    ok = 0
+    failed = 0
+    for index, name, path, error in run_batch(read_manifest(args.manifest), args.output,
+                                              workers=args.jobs, chunksize=args.chunksize,
+                                              polymesh=args.polymesh, template=template):
+        if error:
+            failed += 1
+            print(f"[{index}] {name}: {error}", file=sys.stderr)
+        else:
+            ok += 1
+            if args.verbose:
+                print(path)
+    elapsed = time.perf_counter() - start
+    print(f"{ok} blockMeshDict(s) generated, {failed} failed in {elapsed:.2f} s.")
+    return 1 if failed else 0
+
+
+def cmd_sweep(args):
+    import json
+
+    from bmg.sweep import run_sweep, sweep_size
+
+    with open(args.spec, "r") as f:
+        spec = json.load(f)
+    if args.dry_run:
+        print(f"{sweep_size(spec)} case(s) in sweep.")
+        return 0
+    template = load_template(args)
+    if template is False:
+        return 1
+    start = time.perf_counter()
+    try:
+        summary = run_sweep(spec, args.output, workers=args.jobs, force=args.force, template=template)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for name, error in summary["errors"]:
+        print(f"{name}: {error}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['written']} written, {summary['unchanged']} unchanged, "
+          f"{summary['failed']} failed in {elapsed:.2f} s.")
+    return 1 if summary["failed"] else 0
+
+
+def cmd_polymesh(args):
+    import json
+
+    from bmg.core import normalize_case, validate_case
+    from bmg.polymesh import write_polymesh
+
+    with open(args.case, "r") as f:
+        raw = json.load(f)
+    try:
+        case = normalize_case(raw)
+        validate_case(case)
+        start = time.perf_counter()
+        counts = write_polymesh(case, args.case_dir, binary=args.format == "binary")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"{counts['cells']} cells, {counts['faces']} faces, {counts['points']} points "
+          f"written to {args.case_dir}/constant/polyMesh in {elapsed:.2f} s.")
+    return 0
+
+
+def cmd_grading(args):
+    from bmg.grading import first_cell_height, format_grading, solve_first_cell, spacing_stats
+
+    if args.first is None and (args.y_plus is None or args.velocity is None):
+        print("Give either --first or both --y-plus and --velocity.", file=sys.stderr)
+        return 1
+    try:
+        if args.first is not None:
+            height = args.first
+        else:
+            height = first_cell_height(args.y_plus, args.velocity, args.ref_length or args.length, args.nu)
+        cells, spec = solve_first_cell(args.length, height, args.max_ratio, args.side)
+        sizes = spacing_stats(args.length, cells, spec)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"first cell height: {height:.6g}")
+    print(f"cells:             {cells}")
+    print(f"grading:           {format_grading(spec)}")
+    print(f"cell sizes:        min {sizes['min']:.6g}  max {sizes['max']:.6g}")
+    return 0
+
+
+def cmd_multiblock(args):
+    import json
+
+    from bmg.multiblock import emit_multiblock, normalize_multiblock
+
+    with open(args.spec, "r") as f:
+        raw = json.load(f)
+    try:
+        topology = normalize_multiblock(raw)
+        with open(args.output, "w") as f:
+            mesh = emit_multiblock(topology, f)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{len(mesh['blocks'])} blocks, {len(mesh['vertices'])} vertices, {mesh['internal_faces']} internal faces, "
+          f"{len(mesh['patches'])} patches written to {args.output}.")
+    return 0
+
+
+def cmd_import(args):
+    import json
+
+    from bmg.dictparser import load_block_mesh_dict
+
+    start = time.perf_counter()
+    try:
+        case = load_block_mesh_dict(args.dict)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    with open(args.output, "w") as f:
+        json.dump(case, f, indent=4)
+    blocks = len(case["blocks"]) if "blocks" in case else 1
+    print(f"{blocks} block(s) read from {args.dict} in {elapsed:.2f} s, case written to {args.output}.")
+    return 0
+
+
+def cmd_quality(args):
+    import json
+
+    from bmg.core import normalize_case, validate_case
+    from bmg.multiblock import normalize_multiblock
+    from bmg.quality import case_quality, format_report, quality_warnings
+
+    with open(args.case, "r") as f:
+        raw = json.load(f)
+    try:
+        if "blocks" in raw:
+            case = normalize_multiblock(raw)
+        else:
+            case = normalize_case(raw)
+            validate_case(case)
+        report = case_quality(case)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(format_report(report))
+    return 1 if quality_warnings(report) else 0
+
+
+def cmd_cost(args):
+    import json
+
+    from bmg.core import normalize_case, validate_case
+    from bmg.cost import (calibrate, cost_warnings, estimate_cost, format_estimate, load_calibration,
+                          multiblock_counts)
+    from bmg.multiblock import assemble, normalize_multiblock
+    from bmg.polymesh import mesh_axes, mesh_counts
+
+    if args.calibrate:
+        print("Calibrating...", file=sys.stderr)
+        calibration = calibrate()
+    else:
+        calibration = load_calibration()
+    if not args.case:
+        return 0
+
+    with open(args.case, "r") as f:
+        raw = json.load(f)
+    try:
+        if "blocks" in raw:
+            topology = normalize_multiblock(raw)
+            mesh = assemble(topology)
+            counts = multiblock_counts(topology["blocks"], mesh)
+            estimate = estimate_cost(counts, calibration)
+        else:
+            case = normalize_case(raw)
+            validate_case(case)
+            estimate = estimate_cost(mesh_counts(case["cells"]), calibration, mesh_axes(case), case["scale"])
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(format_estimate(estimate))
+    if not calibration:
+        print("Run with --calibrate to time this machine.")
+    return 1 if cost_warnings(estimate) else 0
+
+
+def cmd_decompose(args):
+    import json
+
+    from bmg.core import normalize_case, validate_case
+    from bmg.decompose import format_plan, naive_split, plan_decomposition, score_split, write_decompose_par_dict
+
+    with open(args.case, "r") as f:
+        raw = json.load(f)
+    try:
+        if "blocks" in raw:
+            raise ValueError("Decomposition planning only supports single-block cases.")
+        case = normalize_case(raw)
+        validate_case(case)
+        scored = plan_decomposition(case["cells"], args.processors, args.nodes)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    processors = sum(args.nodes) if args.nodes else args.processors
+    naive = score_split(case["cells"], naive_split(processors))
+    print(format_plan(scored, naive, args.top))
+    if args.output:
+        write_decompose_par_dict(scored[0]["n"], args.output, args.method)
+        print(f"decomposeParDict written to {args.output}.")
+    return 0
+
+
+def cmd_autosize(args):
+    from bmg.autosize import auto_size
+
+    start = time.perf_counter()
+    try:
+        result = auto_size(args.lengths, total_cells=args.cells, cell_size=args.size,
+                           multiple=args.multiple, tolerance=args.tolerance)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    nx, ny, nz = result["cells"]
+    print(f"cells:         {nx} {ny} {nz}  ({result['total']:,} in total)")
+    print(f"cell sizes:    {' '.join(f'{d:.6g}' for d in result['sizes'])}")
+    print(f"aspect ratio:  {result['aspect_ratio']:.4f}")
+    print(f"found in {1000 * elapsed:.1f} ms")
+    return 0
+
+
+def cmd_stl(args):
+    import json
+
+    from bmg.stl import background_box, pad_bounds, stl_bounds
+
+    start = time.perf_counter()
+    try:
+        bounds = stl_bounds(args.stl, workers=args.jobs)
+        box = background_box(pad_bounds(bounds, args.padding, args.distance), args.size)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"geometry:  ({' '.join(f'{v:.6g}' for v in bounds[0])}) to ({' '.join(f'{v:.6g}' for v in bounds[1])})")
+    print(f"origin:    {' '.join(f'{v:.6g}' for v in box['origin'])}")
+    print(f"lengths:   {' '.join(f'{v:.6g}' for v in box['lengths'])}")
+    if "cells" in box:
+        cells = box["cells"]
+        print(f"cells:     {cells[0]} {cells[1]} {cells[2]}  ({cells[0] * cells[1] * cells[2]:,} in total)")
+    print(f"read in {elapsed:.2f} s")
+    if args.output:
+        if "cells" not in box:
+            print("Give --size to write a case.", file=sys.stderr)
+            return 1
+        with open(args.output, "w") as f:
+            json.dump(box, f, indent=4)
+        print(f"case written to {args.output}.")
+    return 0
+
+
+def cmd_serve(args):
+    from bmg.server import serve
+
+    def ready(address):
+        print(f"Serving on {address} (Ctrl+C to stop).", flush=True)
+
+    serve(args.host, args.port, args.unix, workers=args.jobs, cache_entries=args.cache, ready=ready)
+    return 0
+
+
+def cmd_loadtest(args):
+    from bmg.client import format_load_test, load_test
+
+    try:
+        summary = load_test(args.address, args.endpoint, args.requests, args.concurrency, args.distinct)
+    except OSError as e:
+        print(f"Can't reach {args.address}: {e}", file=sys.stderr)
+        return 1
+    print(format_load_test(summary))
+    return 1 if summary["errors"] else 0
+
+
+def library_filters(args):
+    from bmg.library import parse_range
+
+    ranges = {}
+    for column in ("cells", "length_x", "length_y", "length_z"):
+        if getattr(args, column):
+            ranges[column] = parse_range(getattr(args, column))
+    return {"text": args.text or "", "tags": args.tag or (), "ranges": ranges}
+
+
+def cmd_library(args):
+    import json
+
+    from bmg.library import PAGE_SIZE, fields_from_entry, open_library
+
+    try:
+        library = open_library(args.db, responses_path=args.responses)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    with library:
+        try:
+            if args.action == "list":
+                filters = library_filters(args)
+                total = library.count(**filters)
+                shown = 0
+                after = None
+                while not args.limit or shown < args.limit:
+                    limit = min(PAGE_SIZE, args.limit - shown) if args.limit else PAGE_SIZE
+                    rows = library.search(after=after, limit=limit, **filters)
+                    for row in rows:
+                        cells = f"{row['total_cells']:,}" if row["total_cells"] is not None else "-"
+                        lengths = " x ".join(f"{v:.4g}" for v in row["lengths"]) if row["lengths"][0] is not None else "-"
+                        print(f"{row['name']:<30} {cells:>14} cells  {lengths:<24} {' '.join(row['tags'])}")
+                    shown += len(rows)
+                    if len(rows) < limit:
+                        break
+                    after = rows[-1]["name"]
+                print(f"{shown} of {total} case(s) shown.")
+            elif args.action == "show":
+                case = library.get(args.name)
+                if args.output:
+                    with open(args.output, "w") as f:
+                        json.dump(case["fields"], f, indent=4)
+                    print(f"{case['name']} written to {args.output}.")
+                else:
+                    print(json.dumps(case, indent=4))
+            elif args.action == "add":
+                with open(args.case, "r") as f:
+                    entry = json.load(f)
+                library.save(args.name, fields_from_entry(entry), args.tag or entry.get("tags", ()))
+                print(f"{args.name} saved to {args.db}.")
+            elif args.action == "delete":
+                library.delete(args.name)
+                print(f"{args.name} deleted.")
+            elif args.action == "import":
+                start = time.perf_counter()
+                imported, errors = library.import_jsonl(args.file)
+                for number, error in errors:
+                    print(f"{args.file}:{number}: {error}", file=sys.stderr)
+                print(f"{imported} case(s) imported, {len(errors)} skipped in {time.perf_counter() - start:.2f} s.")
+                return 1 if errors else 0
+            elif args.action == "export":
+                print(f"{library.export_jsonl(args.file, **library_filters(args))} case(s) exported to {args.file}.")
+            elif args.action == "migrate":
+                if library.migrate_responses(args.file, args.name):
+                    print(f"{args.file} added as {args.name}.")
+                else:
+                    print(f"Nothing added: {args.file} was migrated before, is empty or {args.name} exists.")
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+    return 0
+
+
+def cmd_gui(args):
+    from bmg.gui import main as gui_main
+
+    gui_main()
+    return 0
+
+
+def add_template_arguments(parser):
+    parser.add_argument("--template", metavar="CASE",
+                        help="make complete OpenFOAM cases from this template case, with the dicts in system/")
+    parser.add_argument("--link", choices=["auto", "reflink", "hardlink", "copy"], default="auto",
+                        help="how template files are shared between cases (default: the first that works)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="bmg", description="Headless blockMeshDict generator.")
+    parser.add_argument("--profile", action="store_true", help="print time spent per stage when done")
+    parser.add_argument("--trace", metavar="FILE", help="also write a Chrome trace (implies --profile)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="generate one blockMeshDict per case in a manifest")
+    batch.add_argument("manifest", help="cases as .json, .jsonl or .csv")
+    batch.add_argument("-o", "--output", default="cases", help="directory receiving one sub-directory per case")
+    batch.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    batch.add_argument("--chunksize", type=int, default=64, help="cases handed to a worker at a time")
+    batch.add_argument("--polymesh", choices=["ascii", "binary"], help="also write constant/polyMesh for every case")
+    batch.add_argument("-v", "--verbose", action="store_true", help="print every written path")
+    add_template_arguments(batch)
+    batch.set_defaults(func=cmd_batch)
+
+    sweep = commands.add_parser("sweep", help="expand a parametric sweep, rewriting only changed cases")
+    sweep.add_argument("spec", help="sweep spec as .json")
+    sweep.add_argument("-o", "--output", default="cases", help="directory receiving one sub-directory per case")
+    sweep.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    sweep.add_argument("--force", action="store_true", help="rewrite every case even if its inputs are unchanged")
+    sweep.add_argument("--dry-run", action="store_true", help="only report how many cases the sweep expands to")
+    add_template_arguments(sweep)
+    sweep.set_defaults(func=cmd_sweep)
+
+    polymesh = commands.add_parser("polymesh", help="write constant/polyMesh directly, without blockMesh")
+    polymesh.add_argument("case", help="case as .json (same fields as a manifest entry)")
+    polymesh.add_argument("-d", "--case-dir", default=".", help="OpenFOAM case directory")
+    polymesh.add_argument("-f", "--format", choices=["ascii", "binary"], default="binary")
+    polymesh.set_defaults(func=cmd_polymesh)
+
+    grading = commands.add_parser("grading", help="solve cells and grading for a target first cell height or y+")
+    grading.add_argument("length", type=float, help="length of the graded axis")
+    grading.add_argument("--first", type=float, help="target first cell height (same units as length)")
+    grading.add_argument("--y-plus", type=float, help="target y+ (lengths in metres)")
+    grading.add_argument("--velocity", type=float, help="free stream velocity for the y+ estimate")
+    grading.add_argument("--ref-length", type=float, help="reference length for the Reynolds number (default: length)")
+    grading.add_argument("--nu", type=float, default=1.5e-5, help="kinematic viscosity (default: air)")
+    grading.add_argument("--max-ratio", type=float, default=1.2, help="largest allowed cell-to-cell growth")
+    grading.add_argument("--side", choices=["min", "max", "both"], default="min", help="which end(s) of the axis are walls")
+    grading.set_defaults(func=cmd_grading)
+
+    multiblock = commands.add_parser("multiblock", help="assemble a multi-block blockMeshDict from a list of boxes")
+    multiblock.add_argument("spec", help="multi-block case as .json")
+    multiblock.add_argument("-o", "--output", default="blockMeshDict", help="file to write")
+    multiblock.set_defaults(func=cmd_multiblock)
+
+    importer = commands.add_parser("import", help="read an existing blockMeshDict into a case .json")
+    importer.add_argument("dict", help="blockMeshDict to read")
+    importer.add_argument("-o", "--output", default="case.json", help="case file to write")
+    importer.set_defaults(func=cmd_import)
+
+    quality = commands.add_parser("quality", help="report aspect ratio, expansion, non-orthogonality and skewness")
+    quality.add_argument("case", help="single or multi-block case as .json")
+    quality.set_defaults(func=cmd_quality)
+
+    cost = commands.add_parser("cost", help="predict cells, polyMesh size, blockMesh memory and runtime")
+    cost.add_argument("case", nargs="?", help="single or multi-block case as .json")
+    cost.add_argument("--calibrate", action="store_true", help="time this machine first and cache the result")
+    cost.set_defaults(func=cmd_cost)
+
+    decompose = commands.add_parser("decompose", help="pick the processor split with the fewest processor faces")
+    decompose.add_argument("case", help="case as .json")
+    count = decompose.add_mutually_exclusive_group(required=True)
+    count.add_argument("-n", "--processors", type=int, help="number of subdomains")
+    count.add_argument("--nodes", type=int, nargs="+", help="ranks on each node, e.g. 64 64 64")
+    decompose.add_argument("-m", "--method", choices=["simple", "hierarchical"], default="hierarchical")
+    decompose.add_argument("-o", "--output", help="write the best split to this decomposeParDict")
+    decompose.add_argument("--top", type=int, default=5, help="splits to list")
+    decompose.set_defaults(func=cmd_decompose)
+
+    autosize = commands.add_parser("autosize", help="pick cell counts for near-cubic cells")
+    autosize.add_argument("lengths", type=float, nargs=3, help="lengths in x, y and z")
+    target = autosize.add_mutually_exclusive_group(required=True)
+    target.add_argument("--cells", type=int, help="cell budget")
+    target.add_argument("--size", type=float, help="target cell size")
+    autosize.add_argument("--multiple", type=int, default=1, help="make every count a multiple of this")
+    autosize.add_argument("--tolerance", type=float, default=0.1, help="how far below the budget (or off the size) the total may land")
+    autosize.set_defaults(func=cmd_autosize)
+
+    stl = commands.add_parser("stl", help="size a snappyHexMesh background box from STL bounding boxes")
+    stl.add_argument("stl", nargs="+", help="ASCII or binary STL files")
+    stl.add_argument("--padding", type=float, default=0.1, help="padding on each side as a fraction of the extent")
+    stl.add_argument("--distance", type=float, default=0.0, help="extra padding on each side, in STL units")
+    stl.add_argument("--size", type=float, help="background cell size; lengths are rounded up to whole cells")
+    stl.add_argument("-j", "--jobs", type=int, default=None, help="worker processes for large binary files")
+    stl.add_argument("-o", "--output", help="write the box as a case .json (needs --size)")
+    stl.set_defaults(func=cmd_stl)
+
+    serve = commands.add_parser("serve", help="serve dicts, polyMesh, quality and cost over local HTTP")
+    serve.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--unix", help="listen on this Unix socket instead")
+    serve.add_argument("-j", "--jobs", type=int, default=None, help="worker processes for polyMesh and quality (default: all cores)")
+    serve.add_argument("--cache", type=int, default=1024, help="results kept in the LRU cache")
+    serve.set_defaults(func=cmd_serve)
+
+    loadtest = commands.add_parser("loadtest", help="load test a running 'bmg serve'")
+    loadtest.add_argument("address", nargs="?", default="http://127.0.0.1:8765", help="http://host:port or unix:/path")
+    loadtest.add_argument("-e", "--endpoint", choices=["/dict", "/quality", "/cost", "/polymesh"], default="/dict")
+    loadtest.add_argument("-n", "--requests", type=int, default=1000)
+    loadtest.add_argument("-c", "--concurrency", type=int, default=16, help="connections kept open")
+    loadtest.add_argument("--distinct", type=int, default=10, help="different cases among the requests")
+    loadtest.set_defaults(func=cmd_loadtest)
+
+    library = commands.add_parser("library", help="search, import and export the SQLite case library")
+    library.add_argument("--db", default="cases.db", help="library file")
+    library.add_argument("--responses", default="responses.json",
+                         help="old responses.json to add to the library the first time it is seen")
+    actions = library.add_subparsers(dest="action", required=True)
+    library.set_defaults(func=cmd_library)
+
+    def add_filters(action):
+        action.add_argument("text", nargs="?", help="part of the case name")
+        action.add_argument("-t", "--tag", action="append", help="only cases with this tag (repeatable)")
+        action.add_argument("--cells", metavar="RANGE", help="total cells, e.g. 1e5..1e6 or ..2e6")
+        for axis in "xyz":
+            action.add_argument(f"--length-{axis}", metavar="RANGE", help=f"length in {axis.upper()} in metres")
+
+    library_list = actions.add_parser("list", help="list matching cases by name")
+    add_filters(library_list)
+    library_list.add_argument("-n", "--limit", type=int, default=50, help="cases to list, 0 for all")
+    library_show = actions.add_parser("show", help="print a case, or write its fields as a case .json")
+    library_show.add_argument("name")
+    library_show.add_argument("-o", "--output", help="case file to write")
+    library_add = actions.add_parser("add", help="add or replace a case from a case .json")
+    library_add.add_argument("name")
+    library_add.add_argument("case", help="case as .json (same fields as a manifest entry)")
+    library_add.add_argument("-t", "--tag", action="append", help="tag (repeatable)")
+    library_delete = actions.add_parser("delete", help="delete a case")
+    library_delete.add_argument("name")
+    library_import = actions.add_parser("import", help="add or replace the cases in a .jsonl file")
+    library_import.add_argument("file")
+    library_export = actions.add_parser("export", help="write matching cases to a .jsonl file")
+    library_export.add_argument("file")
+    add_filters(library_export)
+    library_migrate = actions.add_parser("migrate", help="add an old responses.json as a named case")
+    library_migrate.add_argument("file")
+    library_migrate.add_argument("--name", default="responses", help="name of the new case")
+
+    gui = commands.add_parser("gui", help="open the GUI")
+    gui.set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.profile or args.trace):
+        return args.func(args)
+
+    from bmg import trace
+
+    trace.enable()
+    try:
+        return args.func(args)
+    finally:
+        print(trace.format_summary(), file=sys.stderr)
+        if args.trace:
+            trace.write_chrome_trace(args.trace)
+            print(f"Trace written to {args.trace}.", file=sys.stderr)
@@ -0,0 +1,131 @@
+"""Client for ``bmg serve``: single requests and a local load test.
+
+Addresses are ``http://host:port`` or ``unix:/path/to/socket``. The load
+test keeps ``concurrency`` connections open and sends requests over them
+back to back, varying the case so that only ``distinct`` different inputs
+are ever asked for; the repeats show what the cache and coalescing buy.
+"""
+import asyncio
+import json
+import time
+
+from bmg.server import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_ADDRESS = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+BASE_CASE = {"origin": [0, 0, 0], "lengths": [1, 1, 1], "cells": [20, 20, 20]}
+
+
+async def _connect(address):
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[len("unix:"):])
+    host, _, port = address.split("://", 1)[-1].rstrip("/").partition(":")
+    return await asyncio.open_connection(host, int(port or DEFAULT_PORT))
+
+
+async def _send(reader, writer, method, path, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: bmg\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("The server closed the connection.")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _request(address, method, path, payload):
+    reader, writer = await _connect(address)
+    try:
+        return await _send(reader, writer, method, path, payload)
+    finally:
+        writer.close()
+
+
+def request(address, method, path, payload=None):
+    """(status, body bytes) of one request."""
+    return asyncio.run(_request(address, method, path, payload))
+
+
+def load_case(index, distinct, base=None):
+    case = json.loads(json.dumps(base or BASE_CASE))
+    case["cells"][0] += index % distinct
+    return case
+
+
+async def _load_test(address, path, requests, concurrency, distinct, base):
+    latencies = []
+    errors = []
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        reader, writer = await _connect(address)
+        try:
+            while sent < requests:
+                index = sent
+                sent += 1
+                payload = load_case(index, distinct, base)
+                if path == "/polymesh":
+                    payload = {"case": payload, "case_dir": f"loadtest/case{index % distinct}"}
+                start = time.perf_counter()
+                status, body = await _send(reader, writer, "POST", path, payload)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors.append(body.decode("utf-8", "replace"))
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    status, body = await _request(address, "GET", "/stats", None)
+    return latencies, errors, elapsed, json.loads(body) if status == 200 else None
+
+
+def load_test(address=DEFAULT_ADDRESS, path="/dict", requests=1000, concurrency=16, distinct=10, base=None):
+    """Send ``requests`` requests over ``concurrency`` connections and summarise the latencies."""
+    latencies, errors, elapsed, stats = asyncio.run(
+        _load_test(address, path, requests, concurrency, max(1, distinct), base))
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return 1000 * ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99),
+                       "max": percentile(1.0)},
+        "server": stats,
+    }
+
+
+def format_load_test(summary):
+    latency = summary["latency_ms"]
+    lines = [
+        f"{summary['requests']:,} requests in {summary['seconds']:.2f} s: {summary['rps']:,.0f} requests/s, "
+        f"{summary['errors']} errors",
+        f"latency ms: p50 {latency['p50']:.2f}  p95 {latency['p95']:.2f}  p99 {latency['p99']:.2f}  "
+        f"max {latency['max']:.2f}",
+    ]
+    server = summary["server"]
+    if server:
+        cache = server["cache"]
+        lines.append(f"server: {cache['hits']:,} cache hits, {cache['misses']:,} misses, "
+                     f"{server['coalesced']:,} coalesced, {server['requests']:,} requests served")
+    if summary["first_error"]:
+        lines.append(f"first error: {summary['first_error']}")
+    return "\n".join(lines)
@@ -0,0 +1,443 @@
+"""Geometry, validation and rendering for single-box blockMeshDict cases.
+
+Nothing in here touches tkinter, so it can be used from the GUI, the
+command line and worker processes alike.
+"""
+import io
+import math
+import os
+import re
+
+from bmg.emitter import emit_block_mesh_dict
+from bmg.grading import apply_first_cell, format_grading, normalize_grading, parse_grading
+from bmg.trace import count, traced
+
+patch_faces = ["bottom (zmin)", "top (zmax)", "front (ymax)", "back (ymin)", "left (xmin)", "right (xmax)"]
+patch_types = ["patch", "wall", "symmetryPlane", "empty", "wedge", "cyclic"]
+patch_role_types = ["inlet", "outlet", "custom"]
+
+face_vertex_map = {
+    "bottom (zmin)": "(0 1 2 3)",
+    "top (zmax)": "(4 5 6 7)",
+    "front (ymax)": "(2 3 7 6)",
+    "back (ymin)": "(0 1 5 4)",
+    "left (xmin)": "(0 3 7 4)",
+    "right (xmax)": "(1 2 6 5)"
+}
+
+# Face -> (normal axis, 0 for the min side or 1 for the max side)
+face_sides = {
+    "bottom (zmin)": (2, 0), "top (zmax)": (2, 1),
+    "back (ymin)": (1, 0), "front (ymax)": (1, 1),
+    "left (xmin)": (0, 0), "right (xmax)": (0, 1),
+}
+# Face on the other side of the box
+opposite_faces = {face: next(other for other, side in face_sides.items() if side == (axis, 1 - end))
+                  for face, (axis, end) in face_sides.items()}
+
+# Types that only make sense on both faces of a pair
+paired_types = ["empty", "wedge", "cyclic"]
+# Total angle of a wedge case, turned symmetrically either side of the box's mid-plane
+WEDGE_ANGLE = 5
+
+unit_scale = {'m': 1, 'cm': 0.01, 'mm': 0.001}
+
+# Flat field names as used by the GUI and responses.json
+field_names = ["xmin", "ymin", "zmin", "length_x", "length_y", "length_z", "cells_x", "cells_y", "cells_z"]
+# Optional flat grading fields; blank means uniform
+grading_field_names = ["grading_x", "grading_y", "grading_z"]
+
+
+def default_patch_names():
+    return {face: {"type": "patch", "name": ""} for face in patch_faces}
+
+
+def normalize_patch_names(saved_patch_names):
+    # Fill in missing faces and convert the old string format to the dictionary format
+    patch_names = {}
+    saved_patch_names = saved_patch_names or {}
+    for face in patch_faces:
+        if face in saved_patch_names:
+            val = saved_patch_names[face]
+            if isinstance(val, dict):
+                patch_names[face] = val
+            else:
+                patch_names[face] = {"type": "patch", "name": val}
+        else:
+            patch_names[face] = {"type": "patch", "name": ""}
+    return patch_names
+
+
+@traced("validate name")
+def validate_boundary_name(name):
+    if not name:
+        return False, "Boundary name cannot be empty."
+    if name[0].isdigit():
+        return False, "Boundary name cannot start with a number."
+    if re.search(r'[#/]', name):
+        return False, "Boundary name cannot contain '#' or '/'."
+    if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', name):
+        return False, "Boundary name can only contain alphanumeric characters and underscores."
+    return True, ""
+
+
+def resolve_scale(scale_unit, custom_sign="+", custom_exp="1"):
+    if scale_unit == "custom..":
+        try:
+            exp = int(custom_exp)
+            if not (1 <= exp <= 10):
+                raise ValueError
+            exponent = exp if custom_sign == "+" else -exp
+            return 10 ** exponent
+        except Exception:
+            return 1  # fallback
+    return unit_scale.get(scale_unit, 1)
+
+
+@traced("parse fields")
+def case_from_fields(fields):
+    """Build a case from the flat string fields used by the GUI and responses.json.
+
+    Raises ValueError with the message the GUI shows in its status line.
+    """
+    if not all(fields.get(key) for key in field_names):
+        raise ValueError("One or more field(s) were not entered.")
+    try:
+        origin = [float(fields["xmin"]), float(fields["ymin"]), float(fields["zmin"])]
+        lengths = [float(fields["length_x"]), float(fields["length_y"]), float(fields["length_z"])]
+        cells = [int(fields["cells_x"]), int(fields["cells_y"]), int(fields["cells_z"])]
+    except ValueError:
+        raise ValueError("Please enter valid numbers.")
+    scale = resolve_scale(fields.get("scale_unit", "m"), fields.get("custom_sign", "+"), fields.get("custom_exp", "1"))
+    grading = [parse_grading(fields.get(key, "")) for key in grading_field_names]
+    return {
+        "origin": origin,
+        "lengths": lengths,
+        "cells": cells,
+        "grading": grading,
+        "scale": scale,
+        "patch_names": normalize_patch_names(fields.get("patch_names")),
+    }
+
+
+def scale_fields(scale):
+    """The (scale_unit, custom_sign, custom_exp) GUI fields for a scale factor.
+
+    Raises ValueError for factors the GUI can't express, i.e. anything but
+    a power of ten up to 1e10 either way.
+    """
+    scale = float(scale)
+    for unit, factor in unit_scale.items():
+        if math.isclose(scale, factor, rel_tol=1e-12):
+            return unit, "+", "1"
+    if scale > 0:
+        exponent = round(math.log10(scale))
+        if 1 <= abs(exponent) <= 10 and math.isclose(scale, 10.0 ** exponent, rel_tol=1e-12):
+            return "custom..", "+" if exponent > 0 else "-", str(abs(exponent))
+    raise ValueError(f"A scale of {scale:g} can't be set in the GUI, only m, cm, mm or a power of ten.")
+
+
+def fields_from_case(case):
+    """The flat string fields for a single-box case; the reverse of case_from_fields."""
+    fields = {}
+    for names, values in ((field_names[0:3], case["origin"]), (field_names[3:6], case["lengths"]),
+                          (field_names[6:9], case["cells"]), (grading_field_names, case["grading"])):
+        for name, value in zip(names, values):
+            fields[name] = format_grading(value)
+    fields["scale_unit"], fields["custom_sign"], fields["custom_exp"] = scale_fields(case["scale"])
+    fields["patch_names"] = normalize_patch_names(case.get("patch_names"))
+    return fields
+
+
+@traced("parse")
+def normalize_case(raw):
+    """Turn a manifest entry into a case.
+
+    Accepts either the structured form (origin, lengths, cells, scale,
+    patch_names) or the flat responses.json form (xmin, length_x, ...).
+    """
+    if "origin" not in raw and "lengths" not in raw:
+        fields = {key: str(raw.get(key, "")) for key in field_names + grading_field_names}
+        fields.update({
+            "scale_unit": str(raw.get("scale_unit", "m")),
+            "custom_sign": str(raw.get("custom_sign", "+")),
+            "custom_exp": str(raw.get("custom_exp", "1")),
+            "patch_names": raw.get("patch_names"),
+        })
+        case = case_from_fields(fields)
+        if raw.get("scale") not in (None, ""):
+            case["scale"] = parse_scale(raw["scale"])
+        if raw.get("first_cell"):
+            apply_first_cell(case, raw["first_cell"])
+        return case
+
+    try:
+        origin = [float(v) for v in raw.get("origin", (0, 0, 0))]
+        lengths = [float(v) for v in raw["lengths"]]
+        cells = [int(v) for v in raw["cells"]]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("origin, lengths and cells must each be three numbers.")
+    if len(origin) != 3 or len(lengths) != 3 or len(cells) != 3:
+        raise ValueError("origin, lengths and cells must each be three numbers.")
+
+    grading = raw.get("grading", [1, 1, 1])
+    if not isinstance(grading, (list, tuple)) or len(grading) != 3:
+        raise ValueError("grading must give one spec per axis.")
+    case = {
+        "origin": origin,
+        "lengths": lengths,
+        "cells": cells,
+        "grading": [normalize_grading(spec) for spec in grading],
+        "scale": parse_scale(raw.get("scale", 1)),
+        "patch_names": normalize_patch_names(raw.get("patch_names")),
+    }
+    if raw.get("first_cell"):
+        apply_first_cell(case, raw["first_cell"])
+    return case
+
+
+def parse_scale(scale):
+    # Manifests may give the scale as a number or as one of the GUI units
+    if isinstance(scale, str):
+        if scale in unit_scale:
+            return unit_scale[scale]
+        try:
+            return float(scale)
+        except ValueError:
+            raise ValueError(f"Unknown scale '{scale}'.")
+    return scale
+
+
+@traced("validate")
+def validate_case(case):
+    for axis, length in zip("xyz", case["lengths"]):
+        if length <= 0:
+            raise ValueError(f"Length in {axis.upper()} must be positive.")
+    for axis, cells in zip("xyz", case["cells"]):
+        if cells < 1:
+            raise ValueError(f"Cells in {axis.upper()} direction must be at least 1.")
+    for face in patch_faces:
+        name = case["patch_names"][face].get("name", "").strip()
+        if name:
+            is_valid, message = validate_boundary_name(name)
+            if not is_valid:
+                raise ValueError(f"Error for '{face}': {message}")
+    check_boundary(case)
+
+
+def wedge_axes(patch_names):
+    """(thin, axial, radial) axes of a wedge case, or None if no face is a wedge.
+
+    The wedge faces are normal to the thin axis; the case turns about the
+    axial axis, the next one round (x for wedge faces at zmin/zmax), and the
+    radius is measured along the remaining one from 0.
+    """
+    for face in patch_faces:
+        if patch_names[face].get("type", "patch") == "wedge":
+            thin = face_sides[face][0]
+            return thin, (thin + 1) % 3, (thin + 2) % 3
+    return None
+
+
+def degenerate_faces(case):
+    # On the axis of a wedge the radial min face has no area, whatever it is called
+    axes = wedge_axes(case["patch_names"])
+    if axes is None or case["origin"][axes[2]] != 0:
+        return []
+    return [face for face in patch_faces if face_sides[face] == (axes[2], 0)]
+
+
+@traced("check boundary")
+def check_boundary(case):
+    """Raise ValueError if the empty, wedge or cyclic faces can't work with the box.
+
+    Each of these types has to be on both faces of a pair (opposite faces of
+    one box always match in size and cell count). Empty and wedge pairs need
+    a single cell across them, a wedge case a radius that doesn't go below
+    0, and wedge and cyclic faces a patch of their own per side, except that
+    one cyclic name may cover exactly one pair.
+    """
+    patch_names = case["patch_names"]
+    cells = case["cells"]
+    types = {face: patch_names[face].get("type", "patch") for face in patch_faces}
+    axes = wedge_axes(patch_names)
+    if axes is not None:
+        thin, axial, radial = axes
+        if any(types[face] == "wedge" for face in patch_faces if face_sides[face][0] != thin):
+            raise ValueError("Only one pair of opposite faces can be wedge.")
+        if case["origin"][radial] < 0:
+            raise ValueError(f"A wedge case turns about the {'XYZ'[axial]} axis, so {'xyz'[radial]}min "
+                             f"must be 0 or more.")
+
+    degenerate = degenerate_faces(case)
+    for face in patch_faces:
+        patch_type = types[face]
+        if patch_type not in paired_types or face in degenerate:
+            continue
+        other = opposite_faces[face]
+        if types[other] != patch_type:
+            raise ValueError(f"'{face}' is {patch_type}, so '{other}' must be {patch_type} too.")
+        axis = face_sides[face][0]
+        if patch_type != "cyclic" and cells[axis] != 1:
+            raise ValueError(f"'{face}' is {patch_type}, so Cells in {'XYZ'[axis]} direction must be 1, "
+                             f"not {cells[axis]}.")
+
+    grouped_faces, patch_types_map = group_patch_faces(patch_names)
+    for name, faces in grouped_faces.items():
+        if patch_types_map[name] == "wedge" and len(faces) > 1:
+            raise ValueError(f"Wedge faces need a name each; '{name}' is used for both.")
+        if patch_types_map[name] == "cyclic" and len({face_sides[face][0] for face in faces}) > 1:
+            raise ValueError(f"Cyclic patch '{name}' has faces on more than one axis; "
+                             f"give each opposite pair its own name.")
+
+
+def boundary_patches(patch_names):
+    """(name, type, faces, entries) for every boundary patch, in the order written.
+
+    ``entries`` are extra (key, value) lines for the patch: a cyclic patch
+    gets its neighbourPatch. A cyclic name covering both faces of a pair is
+    split into <name>_half0 and <name>_half1, since blockMesh needs one
+    patch per side. Unpaired cyclic faces are written as they are; see
+    check_boundary.
+    """
+    grouped_faces, patch_types_map = group_patch_faces(patch_names)
+    patches = []
+    for name, faces in grouped_faces.items():
+        patch_type = patch_types_map[name]
+        if patch_type == "cyclic" and len(faces) == 2 and opposite_faces[faces[0]] == faces[1]:
+            patches.append((f"{name}_half0", patch_type, faces[:1], [("neighbourPatch", f"{name}_half1")]))
+            patches.append((f"{name}_half1", patch_type, faces[1:], [("neighbourPatch", f"{name}_half0")]))
+        else:
+            patches.append((name, patch_type, faces, []))
+    owners = {face: (name, patch_type) for name, patch_type, faces, _ in patches for face in faces}
+    for name, patch_type, faces, entries in patches:
+        if patch_type == "cyclic" and len(faces) == 1 and not entries:
+            neighbour, neighbour_type = owners[opposite_faces[faces[0]]]
+            if neighbour_type == "cyclic":
+                entries.append(("neighbourPatch", neighbour))
+    return patches
+
+
+def wedge_vertices(vertices, axes, angle=WEDGE_ANGLE):
+    """Box corners turned into a wedge of ``angle`` degrees about the axial axis.
+
+    The radial coordinates become radii; the box's extent along the thin
+    axis is replaced by the wedge's opening either side of 0.
+    """
+    thin, _, radial = axes
+    half = math.radians(angle / 2)
+    low = min(vertex[thin] for vertex in vertices)
+    turned = []
+    for vertex in vertices:
+        point = list(vertex)
+        radius = vertex[radial]
+        point[radial] = radius * math.cos(half)
+        # + 0.0 so that corners on the axis are written as 0 rather than -0
+        point[thin] = (-1 if vertex[thin] == low else 1) * radius * math.sin(half) + 0.0
+        turned.append(tuple(point))
+    return turned
+
+
+def apply_preset(fields, preset):
+    """Flat fields made into a 2-D ("2d") or axisymmetric ("wedge") case, one cell thick in Z.
+
+    Z faces become empty (frontAndBack) or wedge (back and front); a wedge
+    case also starts at y = 0 with its axis patch there. Empty, wedge or
+    cyclic faces left on other axes are reset, so the result passes
+    check_boundary.
+    """
+    if preset not in ("2d", "wedge"):
+        raise ValueError(f"Unknown preset '{preset}'; expected 2d or wedge.")
+    fields = dict(fields)
+    patch_names = {face: dict(val) for face, val in normalize_patch_names(fields.get("patch_names")).items()}
+    fields["cells_z"] = "1"
+    if preset == "2d":
+        thin = {"bottom (zmin)": {"type": "empty", "name": "frontAndBack"},
+                "top (zmax)": {"type": "empty", "name": "frontAndBack"}}
+    else:
+        fields["ymin"] = "0"
+        thin = {"bottom (zmin)": {"type": "wedge", "name": "back"}, "top (zmax)": {"type": "wedge", "name": "front"},
+                "back (ymin)": {"type": "empty", "name": "axis"}}
+    for face, val in patch_names.items():
+        if face in thin:
+            patch_names[face] = thin[face]
+        elif val.get("type") in ("empty", "wedge") or (preset == "wedge" and val.get("type") == "cyclic"
+                                                       and face_sides[face][0] == 1):
+            patch_names[face] = {"type": "patch", "name": ""}
+    fields["patch_names"] = patch_names
+    return fields
+
+
+@traced("group patches")
+def group_patch_faces(patch_names):
+    # Group faces by patch names and types, keeping the faces' own keys
+    grouped_faces = {}
+    patch_types_map = {}
+    for face in patch_faces:
+        val = patch_names.get(face, "")
+        if isinstance(val, dict):
+            patch_type = val.get("type", "patch")
+            name = val.get("name", "").strip() or patch_type
+        else: # Handle legacy saved data where patch_names might just store the name
+            patch_type = "patch" # Default type for legacy data
+            name = val.strip() or patch_type
+        if name not in grouped_faces:
+            grouped_faces[name] = []
+            patch_types_map[name] = patch_type
+        grouped_faces[name].append(face)
+    return grouped_faces, patch_types_map
+
+
+def group_patches(patch_names):
+    grouped_faces, patch_types_map = group_patch_faces(patch_names)
+    for name, faces in grouped_faces.items():
+        grouped_faces[name] = [face_vertex_map[face] for face in faces]
+    return grouped_faces, patch_types_map
+
+
+@traced("render")
+def emit_dict(case, f):
+    xmin, ymin, zmin = case["origin"]
+    length_x, length_y, length_z = case["lengths"]
+    cells_x, cells_y, cells_z = case["cells"]
+    grading = " ".join(format_grading(spec) for spec in case.get("grading", [1, 1, 1]))
+    xmax = xmin + length_x
+    ymax = ymin + length_y
+    zmax = zmin + length_z
+
+    vertices = [
+        (xmin, ymin, zmin), (xmax, ymin, zmin), (xmax, ymax, zmin), (xmin, ymax, zmin),
+        (xmin, ymin, zmax), (xmax, ymin, zmax), (xmax, ymax, zmax), (xmin, ymax, zmax),
+    ]
+    labels = "(0 1 2 3 4 5 6 7)"
+    face_labels = face_vertex_map
+    axes = wedge_axes(case["patch_names"])
+    if axes is not None:
+        vertices = wedge_vertices(vertices, axes)
+        # Corners on the axis coincide; repeating their labels collapses the hex into a prism
+        first = {}
+        relabel = [first.setdefault(vertex, n) for n, vertex in enumerate(vertices)]
+        labels = "(" + " ".join(str(label) for label in relabel) + ")"
+        face_labels = {face: "(" + " ".join(str(relabel[int(v)]) for v in face_vertex_map[face].strip("()").split()) + ")"
+                       for face in patch_faces}
+    blocks = [f"hex {labels} ({cells_x} {cells_y} {cells_z}) simpleGrading ({grading})"]
+    patches = ((name, patch_type, [face_labels[face] for face in faces], entries)
+               for name, patch_type, faces, entries in boundary_patches(case["patch_names"]))
+    emit_block_mesh_dict(f, case["scale"], vertices, blocks, patches)
+
+
+def render_dict(case):
+    buf = io.StringIO()
+    emit_dict(case, buf)
+    return buf.getvalue()
+
+
+@traced("write")
+def write_dict(case, path="blockMeshDict"):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        emit_dict(case, f)
+        count("bytes written", f.tell())
+    return path
@@ -0,0 +1,304 @@
+"""Predict what a case will cost before it is generated.
+
+Counts are exact, points shared by several blocks included; polyMesh
+sizes on disk follow the layout written by ``bmg.polymesh``; blockMesh
+memory and runtime come from a per-cell model.
+The runtime model is a line (startup + per-cell time) fitted by
+``calibrate()``, which times the direct polyMesh writer and, when it is on
+the PATH, blockMesh itself on two small cases. The fit is cached in
+``~/.bmg_calibration.json`` so it only has to run once per machine.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+from bmg.core import patch_faces
+from bmg.multiblock import face_local_vertices, face_sides, hex_corners
+from bmg.polymesh import LABEL32_MAX, mesh_counts
+
+CALIBRATION_FILE = os.path.join(os.path.expanduser("~"), ".bmg_calibration.json")
+
+# Bytes per file outside the lists themselves (banner, FoamFile, footer)
+HEADER_BYTES = 1000
+POLYMESH_FILES = 5
+# Characters of one "%.12g" coordinate when the actual axes aren't known
+DEFAULT_COORD_CHARS = 8
+
+# Rough blockMesh model, used until calibrate() has measured the real thing:
+# point, face, cell shape and cell lists plus the intermediate block meshes
+BLOCKMESH_BYTES_PER_CELL = 600
+BLOCKMESH_BASE_BYTES = 50 * 2 ** 20
+BLOCKMESH_SECONDS = (0.3, 4e-6)
+
+# Case sizes timed by calibrate(), in cells per axis
+CALIBRATION_SIZES = (16, 48)
+
+# Beyond this many cells the GUI asks before writing anything
+LARGE_CASE_CELLS = 50_000_000
+
+# Corner pairs joined by a block edge, with the axis the edge runs along
+HEX_EDGES = [(c, d, a) for c in range(8) for d in range(c + 1, 8) for a in range(3)
+             if [x != y for x, y in zip(hex_corners[c], hex_corners[d])] == [b == a for b in range(3)]]
+
+CONTROL_DICT = """FoamFile
+{
+    version     2.0;
+    format      ascii;
+    class       dictionary;
+    object      controlDict;
+}
+
+application     blockMesh;
+startTime       0;
+endTime         1;
+deltaT          1;
+writeControl    timeStep;
+writeInterval   1;
+writeFormat     %s;
+"""
+
+
+def _digits_total(n):
+    # Total decimal digits of the labels 0 .. n-1
+    total = min(n, 10)
+    start = 10
+    digits = 2
+    while start < n:
+        total += digits * (min(n, start * 10) - start)
+        start *= 10
+        digits += 1
+    return total
+
+
+def _average_digits(n):
+    return _digits_total(n) / n if n else 0
+
+
+def multiblock_counts(blocks, mesh):
+    """Mesh counts of ``blocks`` as merged by ``bmg.multiblock.assemble`` into ``mesh``.
+
+    Faces shared by two blocks are internal. Points are merged the way the
+    vertices are: each block adds its interior points, each distinct block
+    face and edge (told apart by its merged vertex ids) the points strictly
+    inside it, and each merged vertex one point.
+    """
+    totals = {"points": 0, "cells": 0, "faces": 0, "internal_faces": 0, "boundary_faces": 0}
+    for block in blocks:
+        for key, value in mesh_counts(block["cells"]).items():
+            totals[key] += value
+    for index, face, _, _ in mesh["interfaces"]:
+        axis = face_sides[face][0]
+        n = [c for a, c in enumerate(blocks[index]["cells"]) if a != axis]
+        shared = n[0] * n[1]
+        totals["faces"] -= shared
+        totals["internal_faces"] += shared
+        totals["boundary_faces"] -= 2 * shared
+
+    points = len(mesh["vertices"])
+    faces = {}
+    edges = {}
+    for ids, cells, _ in mesh["blocks"]:
+        points += (cells[0] - 1) * (cells[1] - 1) * (cells[2] - 1)
+        for face in patch_faces:
+            n = [c for a, c in enumerate(cells) if a != face_sides[face][0]]
+            faces[frozenset(ids[v] for v in face_local_vertices[face])] = (n[0] - 1) * (n[1] - 1)
+        for c, d, a in HEX_EDGES:
+            edges[frozenset((ids[c], ids[d]))] = cells[a] - 1
+    totals["points"] = points + sum(faces.values()) + sum(edges.values())
+    return totals
+
+
+def _points_ascii_bytes(counts, axes, scale):
+    if axes is None:
+        return counts["points"] * (3 * DEFAULT_COORD_CHARS + 5)
+    # "(x y z)\n": every x text appears once per (y, z) pair and so on
+    lengths = [sum(len("%.12g" % (v * scale)) for v in axis) for axis in axes]
+    sizes = [len(axis) for axis in axes]
+    return (counts["points"] * 5 + lengths[0] * sizes[1] * sizes[2]
+            + lengths[1] * sizes[0] * sizes[2] + lengths[2] * sizes[0] * sizes[1])
+
+
+def polymesh_bytes(counts, axes=None, scale=1):
+    """Approximate size of constant/polyMesh as {"ascii": ..., "binary": ...} in bytes."""
+    faces = counts["faces"]
+    internal = counts["internal_faces"]
+    point_digits = _average_digits(counts["points"])
+    cell_digits = _average_digits(counts["cells"])
+    ascii_size = (_points_ascii_bytes(counts, axes, scale)
+                  + faces * (7 + 4 * point_digits)
+                  + (faces + internal) * (cell_digits + 1))
+    label = 4 if 4 * faces <= LABEL32_MAX else 8
+    binary_size = 24 * counts["points"] + label * ((faces + 1) + 4 * faces + faces + internal)
+    header = HEADER_BYTES * POLYMESH_FILES
+    return {"ascii": int(ascii_size) + header, "binary": binary_size + header}
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """The cached calibration for this machine, or None."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("host") != platform.node():
+        return None
+    return data
+
+
+def _fit(samples):
+    # Line through (cells, seconds) samples: startup time and time per cell
+    (n1, t1), (n2, t2) = samples
+    per_cell = max((t2 - t1) / (n2 - n1), 0.0)
+    return [max(t1 - per_cell * n1, 0.0), per_cell]
+
+
+def _blank_case(n):
+    from bmg.core import default_patch_names
+
+    patch_names = default_patch_names()
+    for face in patch_names:
+        patch_names[face] = {"type": "wall", "name": "walls"}
+    return {"origin": [0, 0, 0], "lengths": [1, 1, 1], "cells": [n, n, n], "grading": [1, 1, 1],
+            "scale": 1, "patch_names": patch_names}
+
+
+def _time_writer(binary):
+    from bmg.polymesh import write_polymesh
+
+    samples = []
+    for n in CALIBRATION_SIZES:
+        with tempfile.TemporaryDirectory() as case_dir:
+            start = time.perf_counter()
+            write_polymesh(_blank_case(n), case_dir, binary=binary)
+            samples.append((n ** 3, time.perf_counter() - start))
+    return _fit(samples)
+
+
+def _time_blockmesh(executable):
+    import resource
+
+    from bmg.core import write_dict
+
+    samples = []
+    for n in CALIBRATION_SIZES:
+        with tempfile.TemporaryDirectory() as case_dir:
+            write_dict(_blank_case(n), os.path.join(case_dir, "system", "blockMeshDict"))
+            with open(os.path.join(case_dir, "system", "controlDict"), "w") as f:
+                f.write(CONTROL_DICT % "binary")
+            start = time.perf_counter()
+            subprocess.run([executable, "-case", case_dir], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            samples.append((n ** 3, time.perf_counter() - start))
+    # ru_maxrss is in KiB on Linux and the largest child so far, i.e. the bigger case
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    return {"seconds": _fit(samples), "bytes_per_cell": max(peak - BLOCKMESH_BASE_BYTES, 0) / samples[-1][0]}
+
+
+def calibrate(path=CALIBRATION_FILE):
+    """Time the polyMesh writer (and blockMesh, if installed) and cache the result."""
+    data = {
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "created": time.time(),
+        "write": {"ascii": _time_writer(False), "binary": _time_writer(True)},
+        "blockmesh": None,
+    }
+    executable = shutil.which("blockMesh")
+    if executable:
+        try:
+            data["blockmesh"] = _time_blockmesh(executable)
+        except (OSError, subprocess.CalledProcessError):
+            pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+    return data
+
+
+def estimate_cost(counts, calibration=None, axes=None, scale=1):
+    """Disk, memory and runtime estimates for a mesh with ``counts``.
+
+    Without a calibration the runtimes use the built-in blockMesh model and
+    the direct writer estimate is left out.
+    """
+    cells = counts["cells"]
+    blockmesh = (calibration or {}).get("blockmesh")
+    bytes_per_cell = blockmesh["bytes_per_cell"] if blockmesh else BLOCKMESH_BYTES_PER_CELL
+    base, per_cell = blockmesh["seconds"] if blockmesh else BLOCKMESH_SECONDS
+    estimate = dict(counts)
+    estimate.update({
+        "disk": polymesh_bytes(counts, axes, scale),
+        "blockmesh_memory": BLOCKMESH_BASE_BYTES + bytes_per_cell * cells,
+        "blockmesh_seconds": base + per_cell * cells,
+        "blockmesh_calibrated": bool(blockmesh),
+        "write_seconds": None,
+    })
+    if calibration:
+        estimate["write_seconds"] = {fmt: a + b * cells for fmt, (a, b) in calibration["write"].items()}
+    return estimate
+
+
+def physical_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def cost_warnings(estimate):
+    warnings = []
+    memory = physical_memory()
+    if memory and estimate["blockmesh_memory"] > memory:
+        warnings.append(f"blockMesh needs about {format_bytes(estimate['blockmesh_memory'])}, "
+                        f"more than this machine's {format_bytes(memory)}.")
+    if estimate["cells"] > LARGE_CASE_CELLS:
+        warnings.append(f"{estimate['cells']:,} cells is a very large mesh.")
+    return warnings
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def summary_line(estimate):
+    """One-line summary for the GUI."""
+    return (f"{estimate['cells']:,} cells | polyMesh {format_bytes(estimate['disk']['ascii'])} ascii, "
+            f"{format_bytes(estimate['disk']['binary'])} binary | blockMesh ~"
+            f"{format_bytes(estimate['blockmesh_memory'])}, ~{format_seconds(estimate['blockmesh_seconds'])}")
+
+
+def format_estimate(estimate):
+    lines = [
+        f"Cells:            {estimate['cells']:,}",
+        f"Points:           {estimate['points']:,}",
+        f"Faces:            {estimate['faces']:,} ({estimate['internal_faces']:,} internal, "
+        f"{estimate['boundary_faces']:,} boundary)",
+        f"polyMesh on disk: {format_bytes(estimate['disk']['ascii'])} ascii, "
+        f"{format_bytes(estimate['disk']['binary'])} binary",
+        f"blockMesh memory: ~{format_bytes(estimate['blockmesh_memory'])}",
+        f"blockMesh time:   ~{format_seconds(estimate['blockmesh_seconds'])}"
+        + ("" if estimate["blockmesh_calibrated"] else " (built-in model, blockMesh not calibrated)"),
+    ]
+    if estimate["write_seconds"]:
+        lines.append(f"bmg polymesh:     ~{format_seconds(estimate['write_seconds']['binary'])} binary, "
+                     f"~{format_seconds(estimate['write_seconds']['ascii'])} ascii")
+    for warning in cost_warnings(estimate):
+        lines.append(f"***{warning}")
+    return "\n".join(lines)
@@ -0,0 +1,481 @@
+"""Import existing blockMeshDict files.
+
+The file is memory-mapped and tokenised in a single pass by one compiled
+regular expression. Plain parenthesised groups such as ``(0 1 2 3)`` or
+``(0.5 1 2)`` come out as one token, so the long vertex, block and face
+lists that make up most of a large dict cost one token per entry instead
+of six. A list holding nothing but words and such groups, like the
+``vertices`` and ``blocks`` lists of a generated dict, is one token too;
+the importer reads it with a few bulk regular expressions instead of token
+by token. Comments, ``#include``, ``$var`` macros, ``scale`` /
+``convertToMeters``, ``vertices``, ``blocks`` (simpleGrading and uniform
+edgeGrading), ``boundary`` (and the older ``patches``) and ``defaultPatch``
+are understood.
+"""
+import gc
+import itertools
+import mmap
+import operator
+import os
+import re
+
+from bmg.core import normalize_patch_names, patch_faces
+from bmg.multiblock import face_local_vertices, hex_corners
+
+# Leading whitespace is part of each match, which halves the number of matches
+TOKEN_RE = re.compile(rb"""
+    \s*(?:
+      (?P<skip>//[^\n]*|/\*.*?\*/|\Z)
+    | (?P<group>\((?:[^()/"$#;{}\[\]\\]*)\))
+    | (?P<flat>\((?:\s*+(?:[^\s(){};"\[\]/#$\\]++|\([^()/"$#;{}\[\]\\]*+\)))*+\s*+\))
+    | (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<punct>[(){};\[\]])
+    | (?P<directive>\#[A-Za-z]+)
+    | (?P<macro>\$\{[^}]*\}|\$:?[\w.:]+)
+    | (?P<word>[^\s(){};"\[\]/#$]+)
+    | (?P<error>.)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+
+class Group(list):
+    """A parenthesised group of plain words, e.g. ``(0 1 2 3)``."""
+
+
+class FoamList(list):
+    """A parenthesised list holding nested lists, groups or dictionaries."""
+
+
+class RawList(bytes):
+    """A parenthesised list of plain words and groups, kept as its source text."""
+
+    def items(self):
+        return FoamList(Group(group[1:-1].decode("ascii", "replace").split()) if group
+                        else word.decode("utf-8", "replace")
+                        for group, word in ITEM_RE.findall(self, 1, len(self) - 1))
+
+
+# Items of a RawList
+ITEM_RE = re.compile(rb"(\([^()]*\))|([^\s()]+)")
+# A RawList of unnamed vertices
+VERTICES_RE = re.compile(rb"\((?:\s*+\(\s*[^\s()]+\s+[^\s()]+\s+[^\s()]+\s*\))*+\s*+\)")
+# One block in the form generated dicts use: hex (8 ids) (3 counts) simpleGrading (expansions)
+HEX_RE = re.compile(rb"(\s*hex\s*\(\s*(\d+(?:\s+\d+){7})\s*\)\s*\(\s*(\d+\s+\d+\s+\d+)\s*\)"
+                    rb"\s*simpleGrading\s*\(([^()]*)\))")
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return b""
+
+
+def tokenize(buf):
+    """Yield (kind, value) tokens, skipping whitespace and comments."""
+    for m in TOKEN_RE.finditer(buf):
+        kind = m.lastgroup
+        if kind == "skip":
+            continue
+        if kind == "group":
+            yield "group", Group(m.group(kind)[1:-1].decode("ascii", "replace").split())
+        elif kind == "flat":
+            yield "flat", RawList(m.group(kind))
+        elif kind == "error":
+            line = buf.count(b"\n", 0, m.start(kind)) + 1
+            raise ValueError(f"Unexpected character {m.group(kind)!r} on line {line}.")
+        else:
+            yield kind, m.group(kind).decode("utf-8", "replace")
+
+
+class _Parser:
+    def __init__(self, path, raw=False):
+        self.path = path
+        # Leave flat lists as RawList instead of FoamList
+        self.raw = raw
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.buf = _read(path)
+        self.tokens = tokenize(self.buf)
+        self.pushed = []
+
+    def next(self):
+        if self.pushed:
+            return self.pushed.pop()
+        return next(self.tokens, (None, None))
+
+    def push(self, token):
+        self.pushed.append(token)
+
+    def parse_dict(self, scopes, closing):
+        entries = {}
+        scopes = scopes + [entries]
+        while True:
+            kind, value = self.next()
+            if kind is None:
+                if closing:
+                    raise ValueError(f"{self.path}: missing '}}'.")
+                return entries
+            if kind == "punct" and value == "}" and closing:
+                return entries
+            if kind == "directive":
+                self.directive(value, entries, scopes)
+                continue
+            if kind == "macro":
+                # A bare $dict at entry level merges that dict's entries
+                found = lookup(scopes, value)
+                if isinstance(found, dict):
+                    entries.update(found)
+                    continue
+                raise ValueError(f"{self.path}: '{value}' does not name a dictionary.")
+            if kind not in ("word", "string"):
+                raise ValueError(f"{self.path}: expected a keyword, got '{value}'.")
+            key = value.strip('"')
+            kind, value = self.next()
+            if kind == "punct" and value == "{":
+                entries[key] = self.parse_dict(scopes, True)
+            else:
+                self.push((kind, value))
+                entries[key] = self.parse_value(scopes)
+
+    def parse_value(self, scopes):
+        items = []
+        while True:
+            kind, value = self.next()
+            if kind is None:
+                raise ValueError(f"{self.path}: missing ';'.")
+            if kind == "punct" and value == ";":
+                return items
+            items.append(self.parse_item(kind, value, scopes))
+
+    def parse_item(self, kind, value, scopes):
+        if kind == "group":
+            return value
+        if kind == "flat":
+            return value if self.raw else value.items()
+        if kind == "punct" and value == "(":
+            return self.parse_list(scopes)
+        if kind == "punct" and value == "{":
+            return self.parse_dict(scopes, True)
+        if kind == "macro":
+            found = lookup(scopes, value)
+            if isinstance(found, list) and len(found) == 1:
+                return found[0]
+            return found
+        if kind == "directive":
+            raise ValueError(f"{self.path}: '{value}' is not supported inside a value.")
+        if kind == "punct":
+            raise ValueError(f"{self.path}: unexpected '{value}'.")
+        return value
+
+    def parse_list(self, scopes):
+        items = FoamList()
+        while True:
+            kind, value = self.next()
+            if kind is None:
+                raise ValueError(f"{self.path}: missing ')'.")
+            if kind == "punct" and value == ")":
+                return items
+            items.append(self.parse_item(kind, value, scopes))
+
+    def directive(self, name, entries, scopes):
+        if name in ("#include", "#includeIfPresent", "#sinclude"):
+            kind, value = self.next()
+            target = os.path.join(self.directory, os.path.expandvars(value.strip('"')))
+            if not os.path.exists(target):
+                if name == "#include":
+                    raise ValueError(f"{self.path}: cannot find included file '{target}'.")
+                return
+            included = _Parser(target, self.raw).parse_dict(scopes, False)
+            entries.update(included)
+        elif name in ("#inputMode",):
+            self.next()
+        elif name == "#remove":
+            kind, value = self.next()
+            entries.pop(value, None)
+        else:
+            raise ValueError(f"{self.path}: '{name}' is not supported.")
+
+
+def lookup(scopes, macro):
+    name = macro[2:-1] if macro.startswith("${") else macro[1:]
+    if name.startswith(":"):
+        name = name[1:]
+        scopes = scopes[:1]
+    parts = name.replace(":", ".").split(".")
+    for scope in reversed(scopes):
+        if parts[0] in scope:
+            value = scope[parts[0]]
+            for part in parts[1:]:
+                if not isinstance(value, dict) or part not in value:
+                    raise ValueError(f"Cannot expand '{macro}'.")
+                value = value[part]
+            return value
+    raise ValueError(f"Cannot expand '{macro}': it is not defined.")
+
+
+def parse_foam_file(path):
+    """Parse an OpenFOAM dictionary file into nested dicts and lists of strings."""
+    return _Parser(path).parse_dict([], False)
+
+
+def _numbers(group, count, what):
+    if not isinstance(group, list) or len(group) != count:
+        raise ValueError(f"Expected {count} numbers for {what}.")
+    try:
+        return [float(v) for v in group]
+    except (TypeError, ValueError):
+        raise ValueError(f"Expected {count} numbers for {what}.")
+
+
+def _items(value):
+    return value.items() if isinstance(value, RawList) else value
+
+
+def _vertices(items):
+    if isinstance(items, RawList):
+        if VERTICES_RE.fullmatch(items):
+            # Every group holds three words, so the coordinates can be read in one go
+            words = items[1:-1].replace(b"(", b" ").replace(b")", b" ").split()
+            try:
+                coords = list(map(float, words))
+            except ValueError:
+                raise ValueError("Expected 3 numbers for a vertex.")
+            return list(zip(coords[0::3], coords[1::3], coords[2::3])), {}
+        items = items.items()
+    vertices = []
+    names = {}
+    i = 0
+    while i < len(items):
+        item = items[i]
+        if item == "name":
+            # Named vertex: name <label> (x y z)
+            names[items[i + 1]] = len(vertices)
+            i += 2
+            item = items[i]
+        vertices.append(_numbers(item, 3, "a vertex"))
+        i += 1
+    return vertices, names
+
+
+def _grading(kind, value):
+    def spec(v):
+        if isinstance(v, str):
+            return float(v)
+        # Multi-grading: a list of (length fraction, cell fraction, expansion)
+        return [_numbers(section, 3, "a grading section") for section in _items(v)]
+
+    if kind == "simpleGrading":
+        if len(value) != 3:
+            raise ValueError("simpleGrading needs three entries.")
+        return [spec(v) for v in value]
+    if len(value) != 12:
+        raise ValueError("edgeGrading needs twelve entries.")
+    specs = [spec(v) for v in value]
+    grading = []
+    for axis in range(3):
+        edges = specs[4 * axis:4 * axis + 4]
+        if any(edge != edges[0] for edge in edges):
+            raise ValueError("Only edgeGrading with equal grading on the four edges of each axis can be imported.")
+        grading.append(edges[0])
+    return grading
+
+
+def _hex_blocks(items):
+    # Bulk read of a RawList of plain simpleGrading hexes; None if it holds anything else
+    found = HEX_RE.findall(items, 1, len(items) - 1)
+    if not found:
+        return None
+    whole, ids, cells, gradings = zip(*found)
+    # Matches never overlap, so they cover the list only if their lengths add up to it
+    if sum(map(len, whole)) != len(items[1:-1].rstrip()):
+        return None
+    ids = list(map(int, b" ".join(ids).split()))
+    cells = list(map(int, b" ".join(cells).split()))
+    specs = {grading: _grading("simpleGrading", grading.decode("ascii", "replace").split()) for grading in set(gradings)}
+    return ([ids[c::8] for c in range(8)], list(map(list, zip(cells[0::3], cells[1::3], cells[2::3]))),
+            [list(specs[grading]) for grading in gradings])
+
+
+def _blocks(items, vertex_names):
+    """(corners, cells, gradings): corners[c] lists vertex c of every block."""
+    if isinstance(items, RawList):
+        blocks = None if vertex_names else _hex_blocks(items)
+        if blocks is not None:
+            return blocks
+        items = items.items()
+    if not isinstance(items, list):
+        raise ValueError("blocks must be a list of hex entries.")
+    blocks = []
+    i = 0
+    while i < len(items):
+        shape = items[i]
+        if shape != "hex":
+            raise ValueError(f"Only hex blocks can be imported, found '{shape}'.")
+        b = len(blocks)
+        if i + 1 >= len(items) or not isinstance(items[i + 1], list):
+            raise ValueError(f"Block {b} needs eight vertices.")
+        try:
+            ids = [int(vertex_names.get(v, v)) for v in items[i + 1]]
+        except (TypeError, ValueError):
+            raise ValueError(f"Block {b} has a vertex that is not a number or a vertex name.")
+        if len(ids) != 8:
+            raise ValueError(f"Block {b} needs eight vertices.")
+        i += 2
+        if i < len(items) and isinstance(items[i], str) and items[i] not in ("simpleGrading", "edgeGrading"):
+            i += 1  # cell zone name
+        if i >= len(items) or not isinstance(items[i], list) or len(items[i]) != 3:
+            raise ValueError(f"Block {b} needs three cell counts after its vertices.")
+        try:
+            cells = [int(v) for v in items[i]]
+        except (TypeError, ValueError):
+            raise ValueError(f"Block {b} needs three whole numbers of cells.")
+        i += 1
+        grading = [1, 1, 1]
+        if i < len(items) and items[i] in ("simpleGrading", "edgeGrading"):
+            if i + 1 >= len(items) or not isinstance(items[i + 1], list):
+                raise ValueError(f"Block {b} needs a list after {items[i]}.")
+            grading = _grading(items[i], items[i + 1])
+            i += 2
+        blocks.append((ids, cells, grading))
+    return [list(corner) for corner in zip(*[ids for ids, _, _ in blocks])], [b[1] for b in blocks], [b[2] for b in blocks]
+
+
+def _pick(values, indices):
+    # values[i] for every i in indices; itemgetter does it without a Python loop
+    return operator.itemgetter(*indices)(values) if len(indices) > 1 else [values[i] for i in indices]
+
+
+def _patch_faces(name, faces):
+    faces = _items(faces)
+    if not isinstance(faces, list) or any(not isinstance(face, list) or len(face) != 4
+                                          or not all(isinstance(v, str) for v in face) for face in faces):
+        raise ValueError(f"Patch '{name}' needs a list of faces of four vertices each.")
+    return faces
+
+
+def _boundary(config):
+    patches = []
+    if "boundary" in config:
+        items = _items(config["boundary"][0]) if config["boundary"] else []
+        if not isinstance(items, list):
+            raise ValueError("boundary must list a name and a dictionary for every patch.")
+        for i in range(0, len(items), 2):
+            name = items[i]
+            if not isinstance(name, str):
+                raise ValueError(f"Boundary entry {i // 2} needs a patch name.")
+            body = items[i + 1] if i + 1 < len(items) else None
+            if not isinstance(body, dict):
+                raise ValueError(f"Patch '{name}' needs a dictionary with its type and faces.")
+            patch_type = body.get("type", ["patch"])
+            if len(patch_type) != 1 or not isinstance(patch_type[0], str):
+                raise ValueError(f"Patch '{name}' needs a single word as its type.")
+            faces = body.get("faces", [[]])
+            patches.append((name, patch_type[0], _patch_faces(name, faces[0] if len(faces) == 1 else None)))
+    elif "patches" in config:
+        items = _items(config["patches"][0]) if config["patches"] else []
+        if not isinstance(items, list):
+            raise ValueError("patches must list a type, a name and faces for every patch.")
+        for i in range(0, len(items), 3):
+            if len(items) < i + 3 or not isinstance(items[i], str) or not isinstance(items[i + 1], str):
+                raise ValueError(f"Patches entry {i // 3} needs a type, a name and a list of faces.")
+            patches.append((items[i + 1], items[i], _patch_faces(items[i + 1], items[i + 2])))
+    return patches
+
+
+def _check_box(b, points):
+    low, high = points[0], points[6]
+    picks = list(zip(low, high))
+    expected = [[picks[0][i], picks[1][j], picks[2][k]] for i, j, k in hex_corners]
+    if any(abs(x - y) > 1e-12 * max(1.0, abs(y)) for p, e in zip(points, expected) for x, y in zip(p, e)):
+        raise ValueError(f"Block {b} is not an axis-aligned box in standard vertex order.")
+
+
+def load_block_mesh_dict(path):
+    """Read a blockMeshDict into a case.
+
+    A single axis-aligned hex comes back as a single-box case (origin,
+    lengths, cells, grading, scale, patch_names); several hexes come back as
+    a multi-block case with a "blocks" list. Raises ValueError for anything
+    that can't be represented, such as rotated or curved blocks.
+    """
+    # Nothing read here can form a reference cycle, yet the hundreds of
+    # thousands of small lists of a big dict would set off collection after
+    # collection, which took more time than the import itself
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _load(path)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _load(path):
+    config = _Parser(path, raw=True).parse_dict([], False)
+    scale = 1.0
+    for key in ("scale", "convertToMeters"):
+        if key in config:
+            scale = float(config[key][0])
+            break
+    if scale.is_integer():
+        scale = int(scale)
+    vertices, vertex_names = _vertices(config.get("vertices", [[]])[0])
+    corners, cells, gradings = _blocks(config.get("blocks", [[]])[0], vertex_names)
+    if not cells:
+        raise ValueError("The dict has no blocks.")
+    if config.get("edges", [[]])[0]:
+        raise ValueError("Curved edges cannot be imported.")
+    if min(map(min, corners)) < 0 or max(map(max, corners)) >= len(vertices):
+        raise ValueError("A block uses a vertex that is not defined.")
+
+    # Work a column at a time: columns[a][c] is coordinate a of vertex c of every block
+    columns = [[_pick(axis, corner) for corner in corners] for axis in zip(*vertices)]
+    # Exact equality is the common case; only fall back to a tolerance when it fails
+    if any(columns[a][c] != columns[a][6 if corner[a] else 0] for c, corner in enumerate(hex_corners) for a in range(3)):
+        for b in range(len(cells)):
+            _check_box(b, [vertices[corner[b]] for corner in corners])
+    boxes = [{"origin": [x0, y0, z0], "lengths": [x1 - x0, y1 - y0, z1 - z0],
+              "cells": n, "grading": grading, "patches": {}}
+             for x0, y0, z0, x1, y1, z1, n, grading
+             in zip(columns[0][0], columns[1][0], columns[2][0], columns[0][6], columns[1][6], columns[2][6],
+                    cells, gradings)]
+
+    patches = _boundary(config)
+    # Vertex set -> block, per block face; only blocks with the face's first
+    # vertex on some patch face can own one
+    on_patches = {int(vertex_names.get(v, v)) for _, _, faces in patches for face in faces for v in face}
+    face_owners = []
+    for block_face in patch_faces:
+        local = face_local_vertices[block_face]
+        owners = {}
+        for b in itertools.compress(itertools.count(), map(on_patches.__contains__, corners[local[0]])):
+            owners[frozenset(corners[v][b] for v in local)] = b
+        face_owners.append((block_face, owners))
+
+    for name, patch_type, faces in patches:
+        for face in faces:
+            key = frozenset(int(vertex_names.get(v, v)) for v in face)
+            # A face shared by two blocks goes to the later one
+            owners = [(owner[key], block_face) for block_face, owner in face_owners if key in owner]
+            if not owners:
+                raise ValueError(f"Face {tuple(face)} of patch '{name}' is not a block face.")
+            b, block_face = max(owners, key=operator.itemgetter(0))
+            boxes[b]["patches"][block_face] = {"type": patch_type, "name": name}
+
+    default = config.get("defaultPatch", {})
+    default_patch = {"name": default.get("name", ["defaultFaces"])[0], "type": default.get("type", ["empty"])[0]}
+
+    if len(boxes) == 1:
+        box = boxes[0]
+        patch_names = {face: box["patches"].get(face, default_patch) for face in patch_faces}
+        return {
+            "origin": box["origin"],
+            "lengths": box["lengths"],
+            "cells": box["cells"],
+            "grading": box["grading"],
+            "scale": scale,
+            "patch_names": normalize_patch_names(patch_names),
+        }
+    return {"scale": scale, "default_patch": default_patch, "blocks": boxes}
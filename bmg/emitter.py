@@ -0,0 +1,115 @@
+"""Streaming writer for OpenFOAM dictionary files.
+
+Everything is written straight to a file object as it is produced, so the
+cost of a dict grows linearly with its entries and memory stays flat, no
+matter how many vertices, blocks or boundary faces there are.
+"""
+
+FOAM_HEADER = r"""/*--------------------------------*- C++ -*----------------------------------*\
+| =========                               |                                 |
+| \\      /  F ield        | OpenFOAM: The Open Source CFD Toolbox           |
+|  \\    /   O peration    | Version:  v2312                                 |
+|   \\  /    A nd          | Website:  www.openfoam.com                      |
+|    \\/     M anipulation |                                                 |
+\*---------------------------------------------------------------------------*/
+FoamFile
+{
+    version     2.0;
+    format      ascii;
+    class       %(cls)s;
+    object      %(object)s;
+}
+"""
+
+FOAM_FOOTER = "// ************************************************************************* //\n"
+
+INDENT = "    "
+
+# Lines handed to the file object per writelines call
+BATCH_SIZE = 4096
+
+
+class DictEmitter:
+    def __init__(self, f):
+        self.f = f
+        self.write = f.write
+
+    def header(self, object_name, cls="dictionary"):
+        self.write(FOAM_HEADER % {"cls": cls, "object": object_name})
+
+    def footer(self):
+        self.write(FOAM_FOOTER)
+
+    def blank(self):
+        self.write("\n")
+
+    def line(self, text, level=0):
+        self.write(INDENT * level + text + "\n")
+
+    def entry(self, key, value, level=0, sep=" "):
+        self.write(f"{INDENT * level}{key}{sep}{value};\n")
+
+    def dict_begin(self, name, level=0):
+        indent = INDENT * level
+        self.write(f"{indent}{name}\n{indent}{{\n")
+
+    def dict_end(self, level=0):
+        self.write(INDENT * level + "}\n")
+
+    def list_begin(self, name, level=0):
+        indent = INDENT * level
+        self.write(f"{indent}{name}\n{indent}(\n")
+
+    def list_end(self, level=0):
+        self.write(INDENT * level + ");\n")
+
+    def items(self, items, level=1):
+        """Write one list item per line, batching the writes."""
+        prefix = INDENT * level
+        batch = []
+        for item in items:
+            batch.append(f"{prefix}{item}\n")
+            if len(batch) >= BATCH_SIZE:
+                self.f.writelines(batch)
+                batch = []
+        if batch:
+            self.f.writelines(batch)
+
+
+def emit_block_mesh_dict(f, scale, vertices, blocks, patches):
+    """Write a whole blockMeshDict.
+
+    ``vertices`` yields (x, y, z), ``blocks`` yields ready-formatted hex
+    lines and ``patches`` yields (name, type, faces) or (name, type, faces,
+    entries) with ``faces`` yielding vertex-id strings such as ``(0 1 2 3)``
+    and ``entries`` extra (key, value) pairs such as neighbourPatch. All of
+    them may be generators.
+    """
+    out = DictEmitter(f)
+    out.header("blockMeshDict")
+    out.blank()
+    out.entry("scale", scale, sep="   ")
+    out.blank()
+    out.list_begin("vertices")
+    out.items(f"({x} {y} {z})" for x, y, z in vertices)
+    out.list_end()
+    out.blank()
+    out.list_begin("blocks")
+    out.items(blocks)
+    out.list_end()
+    out.blank()
+    out.line("edges();")
+    out.blank()
+    out.list_begin("boundary")
+    for name, patch_type, faces, *entries in patches:
+        out.dict_begin(name, 1)
+        out.entry("type", patch_type, 2)
+        for key, value in (entries[0] if entries else ()):
+            out.entry(key, value, 2)
+        out.list_begin("faces", 2)
+        out.items(faces, 3)
+        out.list_end(2)
+        out.dict_end(1)
+    out.list_end()
+    out.blank()
+    out.footer()
@@ -0,0 +1,355 @@
+"""Cell grading: blockMesh grading specs, graded cell sizes and a first-cell-height solver.
+
+A grading spec for one axis is either a single expansion ratio (last cell
+size / first cell size) or a list of multi-grading sections
+``[length fraction, cell fraction, expansion ratio]``, exactly as blockMesh
+reads them inside ``simpleGrading``.
+"""
+import math
+import re
+
+
+def format_number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def format_grading(spec):
+    if isinstance(spec, (list, tuple)):
+        sections = " ".join("(" + " ".join(format_number(v) for v in section) + ")" for section in spec)
+        return f"({sections})"
+    return format_number(spec)
+
+
+def parse_grading(text):
+    """Parse a grading spec typed by the user: ``2.5`` or ``(0.2 0.3 4) (0.8 0.7 1)``."""
+    text = str(text).strip()
+    if not text:
+        return 1
+    if "(" not in text:
+        try:
+            value = float(text)
+        except ValueError:
+            raise ValueError(f"Invalid grading '{text}'.")
+        return normalize_grading(value)
+    sections = re.findall(r"\(([^()]*)\)", text)
+    try:
+        return normalize_grading([[float(v) for v in section.split()] for section in sections])
+    except ValueError:
+        raise ValueError(f"Invalid grading '{text}'.")
+
+
+def normalize_grading(spec):
+    if isinstance(spec, str):
+        return parse_grading(spec)
+    if isinstance(spec, (list, tuple)):
+        sections = [[float(v) for v in section] for section in spec]
+        if not sections or any(len(section) != 3 for section in sections):
+            raise ValueError("Each multi-grading section needs (length fraction, cell fraction, expansion).")
+        if any(v <= 0 for section in sections for v in section):
+            raise ValueError("Grading fractions and expansion ratios must be positive.")
+        if len(sections) == 1:
+            return sections[0][2]
+        return sections
+    spec = float(spec)
+    if spec <= 0:
+        raise ValueError("Expansion ratio must be positive.")
+    return spec
+
+
+def section_cells(sections, cells):
+    # Same rounding as blockMesh: every section but the last rounds its share
+    total = sum(s[1] for s in sections)
+    counts = []
+    used = 0
+    for section in sections[:-1]:
+        n = min(int(cells * section[1] / total + 0.5), cells - used)
+        counts.append(n)
+        used += n
+    counts.append(cells - used)
+    return counts
+
+
+def _geometric(length, cells, expansion):
+    if cells < 1:
+        return []
+    if cells == 1 or expansion == 1:
+        return [length / cells] * cells
+    ratio = expansion ** (1.0 / (cells - 1))
+    first = length * (ratio - 1) / (ratio ** cells - 1)
+    return [first * ratio ** i for i in range(cells)]
+
+
+def cell_sizes(length, cells, spec=1):
+    """Sizes of the ``cells`` cells along an axis of ``length`` graded by ``spec``."""
+    spec = normalize_grading(spec)
+    if not isinstance(spec, list):
+        return _geometric(length, cells, spec)
+    total = sum(s[0] for s in spec)
+    sizes = []
+    for section, n in zip(spec, section_cells(spec, cells)):
+        sizes.extend(_geometric(length * section[0] / total, n, section[2]))
+    return sizes
+
+
+def geometric_runs(length, cells, spec=1):
+    """The geometric runs of an axis as (first index, cells, first size, ratio).
+
+    Cell i of a run is ``first * ratio ** i``, the same sizes ``cell_sizes``
+    lists, without building the list.
+    """
+    spec = normalize_grading(spec)
+    sections = spec if isinstance(spec, list) else [[1.0, 1.0, spec]]
+    total = sum(s[0] for s in sections)
+    runs = []
+    start = 0
+    for section, n in zip(sections, section_cells(sections, cells)):
+        if n > 0:
+            section_length = length * section[0] / total
+            if n == 1 or section[2] == 1:
+                runs.append((start, n, section_length / n, 1.0))
+            else:
+                ratio = section[2] ** (1.0 / (n - 1))
+                runs.append((start, n, section_length * (ratio - 1) / (ratio ** n - 1), ratio))
+        start += n
+    return runs
+
+
+def axis_points(start, length, cells, spec=1):
+    points = [start]
+    position = start
+    for size in cell_sizes(length, cells, spec):
+        position += size
+        points.append(position)
+    # Land exactly on the far end regardless of rounding
+    points[-1] = start + length
+    return points
+
+
+def _node_fraction(index, cells, expansion):
+    # Where node ``index`` of a geometric distribution sits, as a fraction of its length
+    if cells == 0:
+        return 0.0
+    if cells == 1 or expansion == 1:
+        return index / cells
+    ratio = expansion ** (1.0 / (cells - 1))
+    return (ratio ** index - 1) / (ratio ** cells - 1)
+
+
+def node_positions(start, length, cells, spec, indices):
+    """Positions of the grid nodes numbered ``indices`` (0 to ``cells``) without building the whole axis."""
+    spec = normalize_grading(spec)
+    sections = spec if isinstance(spec, list) else [[1.0, 1.0, spec]]
+    total = sum(s[0] for s in sections)
+    counts = section_cells(sections, cells)
+    positions = []
+    for index in indices:
+        if index >= cells:
+            positions.append(start + length)
+            continue
+        position = start
+        for number, (section, n) in enumerate(zip(sections, counts)):
+            section_length = length * section[0] / total
+            if index > n and number < len(sections) - 1:
+                position += section_length
+                index -= n
+                continue
+            position += section_length * _node_fraction(index, n, section[2])
+            break
+        positions.append(position)
+    return positions
+
+
+def _end_sizes(length, cells, expansion):
+    # First and last cell of a geometric section, the same values _geometric gives
+    if cells == 1 or expansion == 1:
+        return length / cells, length / cells
+    ratio = expansion ** (1.0 / (cells - 1))
+    first = length * (ratio - 1) / (ratio ** cells - 1)
+    return first, first * ratio ** (cells - 1)
+
+
+def spacing_stats(length, cells, spec=1):
+    """Min, max and mean cell size along an axis.
+
+    Sizes change monotonically within a geometric section, so the extremes
+    are the end cells of the sections; the distribution itself is never
+    built, whatever the cell count.
+    """
+    spec = normalize_grading(spec)
+    sections = spec if isinstance(spec, list) else [[1.0, 1.0, spec]]
+    total = sum(s[0] for s in sections)
+    ends = []
+    for section, n in zip(sections, section_cells(sections, cells)):
+        if n > 0:
+            ends.extend(_end_sizes(length * section[0] / total, n, section[2]))
+    return {"min": min(ends), "max": max(ends), "mean": length / cells}
+
+
+def cell_stats(case):
+    """Per-axis min/max/mean cell size of a case, from the graded distribution."""
+    return [spacing_stats(case["lengths"][a], case["cells"][a], case.get("grading", [1, 1, 1])[a])
+            for a in range(3)]
+
+
+def first_cell_height(y_plus, velocity, ref_length, nu=1.5e-5):
+    """Wall spacing for a target y+ from the flat-plate skin friction estimate.
+
+    Cf = 0.026 / Re^(1/7) gives the wall shear stress and so the friction
+    velocity; ``nu`` defaults to air at room temperature.
+    """
+    if velocity <= 0 or ref_length <= 0 or nu <= 0:
+        raise ValueError("Velocity, reference length and viscosity must be positive.")
+    reynolds = velocity * ref_length / nu
+    cf = 0.026 / reynolds ** (1.0 / 7.0)
+    u_tau = velocity * math.sqrt(cf / 2.0)
+    return y_plus * nu / u_tau
+
+
+def _series(r, n):
+    # (r^n - 1) / (r - 1) and its derivative with respect to r
+    if abs(r - 1.0) < 1e-12:
+        return float(n), n * (n - 1) / 2.0
+    rn = r ** n
+    value = (rn - 1.0) / (r - 1.0)
+    slope = (n * r ** (n - 1) * (r - 1.0) - (rn - 1.0)) / (r - 1.0) ** 2
+    return value, slope
+
+
+def solve_first_cell_many(lengths, first_heights, max_ratio=1.2, tol=1e-12, max_iter=50):
+    """Solve cell counts and expansion ratios for many (length, first cell height) pairs at once.
+
+    For each pair the smallest cell count whose cell-to-cell growth stays
+    within ``max_ratio`` is found in closed form, then the growth rate that
+    lands exactly on the length is solved by safeguarded Newton iterations
+    run in lockstep over all unconverged pairs. Returns (cells, expansion)
+    lists, the expansion being last / first cell size.
+    """
+    count = len(lengths)
+    cells = [1] * count
+    ratios = [1.0] * count
+    active = []
+    for i, (length, h1) in enumerate(zip(lengths, first_heights)):
+        if h1 <= 0 or length <= 0:
+            raise ValueError("Lengths and first cell heights must be positive.")
+        if h1 >= length:
+            continue
+        if max_ratio <= 1.0:
+            cells[i] = math.ceil(length / h1 - 1e-9)
+            continue
+        n = math.ceil(math.log(1.0 + length * (max_ratio - 1.0) / h1) / math.log(max_ratio) - 1e-9)
+        if n * h1 >= length:
+            # Uniform cells already come out no bigger than the target
+            cells[i] = math.ceil(length / h1 - 1e-9)
+            continue
+        cells[i] = n
+        ratios[i] = max_ratio
+        active.append(i)
+
+    low = {i: 1.0 for i in active}
+    high = {i: max_ratio for i in active}
+    for _ in range(max_iter):
+        if not active:
+            break
+        still_active = []
+        for i in active:
+            r = ratios[i]
+            value, slope = _series(r, cells[i])
+            residual = value - lengths[i] / first_heights[i]
+            if residual > 0:
+                high[i] = r
+            else:
+                low[i] = r
+            step = residual / slope if slope else 0.0
+            new_r = r - step
+            if not (low[i] < new_r < high[i]):
+                new_r = 0.5 * (low[i] + high[i])
+            ratios[i] = new_r
+            if abs(new_r - r) > tol:
+                still_active.append(i)
+        active = still_active
+
+    return cells, [r ** (n - 1) for r, n in zip(ratios, cells)]
+
+
+def _first_cell_spec(n, expansion, side):
+    if side == "both":
+        if expansion == 1:
+            return 2 * n, 1
+        return 2 * n, [[0.5, 0.5, expansion], [0.5, 0.5, 1.0 / expansion]]
+    if side == "max":
+        return n, 1.0 / expansion
+    if side != "min":
+        raise ValueError("side must be 'min', 'max' or 'both'.")
+    return n, expansion
+
+
+def solve_first_cells(targets):
+    """Cell counts and grading specs for many (length, first height, max ratio, side) targets.
+
+    Repeated targets (a sweep over one axis leaves the others' targets
+    alone) are solved once, and all distinct ones sharing a max ratio in one
+    solve_first_cell_many call; with side "both" each half of the axis is
+    solved.
+    """
+    unique = {}
+    for target in targets:
+        if target[3] not in ("min", "max", "both"):
+            raise ValueError("side must be 'min', 'max' or 'both'.")
+        unique.setdefault(tuple(target), None)
+    groups = {}
+    for target in unique:
+        groups.setdefault(target[2], []).append(target)
+    for max_ratio, members in groups.items():
+        lengths = [length / 2.0 if side == "both" else length for length, _, _, side in members]
+        cells, expansions = solve_first_cell_many(lengths, [target[1] for target in members], max_ratio)
+        for target, n, expansion in zip(members, cells, expansions):
+            unique[target] = _first_cell_spec(n, expansion, target[3])
+    return [unique[tuple(target)] for target in targets]
+
+
+def solve_first_cell(length, first_height, max_ratio=1.2, side="min"):
+    """Cell count and grading spec giving ``first_height`` at the wall(s) on ``side``.
+
+    ``side`` is "min", "max" or "both" (walls at both ends of the axis).
+    """
+    return solve_first_cells([(length, first_height, max_ratio, side)])[0]
+
+
+def _first_cell_target(case, axis, spec):
+    a = "xyz".index(axis)
+    if "height" in spec:
+        height = float(spec["height"])
+    else:
+        # The y+ estimate works in metres, the case in its own (unscaled) units
+        scale = float(case["scale"])
+        height = first_cell_height(float(spec["y_plus"]), float(spec["velocity"]),
+                                   float(spec.get("ref_length", case["lengths"][a] * scale)),
+                                   float(spec.get("nu", 1.5e-5))) / scale
+    return a, (case["lengths"][a], height, float(spec.get("max_ratio", 1.2)), spec.get("side", "min"))
+
+
+def apply_first_cell_many(pairs):
+    """apply_first_cell over many (case, first_cell) pairs, with every axis solved in one batch."""
+    axes = []
+    targets = []
+    for case, first_cell in pairs:
+        for axis, spec in first_cell.items():
+            a, target = _first_cell_target(case, axis, spec)
+            axes.append((case, a))
+            targets.append(target)
+    for (case, a), (cells, grading) in zip(axes, solve_first_cells(targets)):
+        case["cells"][a] = cells
+        case["grading"][a] = grading
+    return [case for case, _ in pairs]
+
+
+def apply_first_cell(case, first_cell):
+    """Set cells and grading of the axes named in ``first_cell``.
+
+    ``first_cell`` maps an axis ("x", "y" or "z") to ``{"height": ...}`` (in
+    the units of the lengths) or ``{"y_plus": ..., "velocity": ...}`` with
+    optional "ref_length" and "nu" in SI units, plus optional "max_ratio"
+    (default 1.2) and "side" (default "min").
+    """
+    return apply_first_cell_many([(case, first_cell)])[0]
@@ -0,0 +1,1022 @@
+"""The tkinter GUI. Importing this module loads Tk; the rest of the package never does."""
+import tkinter as tk
+from tkinter import ttk
+from tkinter import messagebox
+from tkinter import filedialog
+import os
+
+from bmg.core import (WEDGE_ANGLE, patch_faces, patch_types, apply_preset, check_boundary, fields_from_case,
+                      normalize_patch_names, write_dict)
+from bmg.quality import mesh_quality, quality_warnings
+from bmg.cost import cost_warnings, estimate_cost, load_calibration, summary_line
+from bmg.polymesh import mesh_counts
+from bmg.persist import Saver, load as load_responses
+from bmg.preview import DEFAULT_PITCH, DEFAULT_YAW, preview_scene
+from bmg.validation import box_validator, check_patch_names, field_rules
+
+# Initialize with blank patch names
+patch_names = {
+    "bottom (zmin)": {"type": "patch", "name": ""},
+    "top (zmax)": {"type": "patch", "name": ""},
+    "front (ymax)": {"type": "patch", "name": ""},
+    "back (ymin)": {"type": "patch", "name": ""},
+    "left (xmin)": {"type": "patch", "name": ""},
+    "right (xmax)": {"type": "patch", "name": ""}
+}
+
+SAVE_FILE = "responses.json"
+LIBRARY_FILE = "cases.db"
+
+# Writes responses.json in the background; created by main()
+saver = None
+# The case library, opened the first time its window is
+library = None
+# Checks the form field by field as it is typed in; created by main()
+validator = None
+# Input name -> label showing that field's error next to its entry
+field_error_labels = {}
+
+PREVIEW_SIZE = 340
+# Typing only redraws the preview once it pauses for this long
+PREVIEW_DELAY_MS = 100
+# Canvas items are kept and moved on every redraw rather than recreated
+preview_items = {"faces": [], "lines": [], "edges": []}
+preview_view = {"yaw": DEFAULT_YAW, "pitch": DEFAULT_PITCH, "pending": None, "drag": None}
+
+def load_saved_data():
+    # Returns (data, source); source is "journal" when a damaged file was recovered
+    return load_responses(SAVE_FILE)
+
+def save_data():
+    data = {
+        "xmin": xmin_var.get(),
+        "ymin": ymin_var.get(),
+        "zmin": zmin_var.get(),
+        "length_x": length_x_var.get(),
+        "length_y": length_y_var.get(),
+        "length_z": length_z_var.get(),
+        "cells_x": cells_x_var.get(),
+        "cells_y": cells_y_var.get(),
+        "cells_z": cells_z_var.get(),
+        "grading_x": grading_x_var.get(),
+        "grading_y": grading_y_var.get(),
+        "grading_z": grading_z_var.get(),
+        "scale_unit": scale_unit_var.get(),
+        "custom_sign": custom_sign_var.get(),
+        "custom_exp": custom_exp_var.get(),
+        "patch_names": patch_names,
+        "save_responses": save_responses_var.get()
+    }
+    saver.save(data)
+    if saver.error:
+        status_label.config(text=f"Couldn't save responses: {saver.error}", fg="red")
+
+def center_window(window, width, height):
+    screen_width = window.winfo_screenwidth()
+    screen_height = window.winfo_screenheight()
+    x = (screen_width // 2) - (width // 2)
+    y = (screen_height // 2) - (height // 2)
+    window.geometry(f'{width}x{height}+{x}+{y}')
+
+def open_patch_config():
+    config_win = tk.Toplevel(root)
+    config_win.title("Configure Boundaries")
+    
+    # Set the size and center the window
+    window_width = 600
+    window_height = 400
+    center_window(config_win, window_width, window_height)
+
+    config_win.resizable(False, False)
+
+    patch_type_vars = {}
+    patch_name_vars = {}
+    validation_label = tk.Label(config_win, text="", fg="red")
+    validation_label.pack(pady=(0, 5))
+
+    def on_type_change(event, face):
+        check_names_typed()
+
+    # Table header
+    header = tk.Frame(config_win)
+    header.pack(pady=(10, 0), padx=10, fill='x')
+    tk.Label(header, text="Face", width=15, anchor='w', font=("Arial", 10, "bold")).pack(side=tk.LEFT)
+    tk.Label(header, text="Type", width=14, anchor='w', font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=(0, 10))
+    tk.Label(header, text="Boundary Name", width=18, anchor='w', font=("Arial", 10, "bold")).pack(side=tk.LEFT)
+
+    for face in patch_faces:
+        frame = tk.Frame(config_win)
+        frame.pack(pady=5, padx=10, fill='x')
+        tk.Label(frame, text=face + ":", width=15, anchor='w').pack(side=tk.LEFT)
+
+        type_val = patch_names[face]["type"]
+        name_val = patch_names[face]["name"]
+
+        patch_type_var = tk.StringVar(value=type_val)
+        patch_type_vars[face] = patch_type_var
+        combo = ttk.Combobox(frame, values=patch_types, textvariable=patch_type_var, width=14, state="readonly")
+        combo.pack(side=tk.LEFT, padx=(0, 10))
+        combo.bind("<<ComboboxSelected>>", lambda event, f=face: on_type_change(event, f))
+
+        patch_name_var = tk.StringVar(value=name_val)
+        patch_name_vars[face] = patch_name_var
+        entry = tk.Entry(frame, textvariable=patch_name_var, width=18)
+        entry.pack(side=tk.LEFT)
+        entry.bind("<KeyRelease>", lambda event: check_names_typed())
+
+    def names_typed():
+        return {face: {"type": patch_type_vars[face].get(), "name": patch_name_vars[face].get().strip()}
+                for face in patch_faces}
+
+    def boundary_error(typed):
+        # Empty, wedge and cyclic faces also have to fit the box, if there is one yet
+        try:
+            box = validator.get("box")
+        except ValueError:
+            return None
+        try:
+            check_boundary(dict(box, patch_names=typed))
+        except ValueError as e:
+            return str(e)
+        return None
+
+    def check_names_typed(event=None):
+        # Blank names are only an error on saving
+        try:
+            typed = check_patch_names(names_typed())
+            validation_label.config(text=boundary_error(typed) or "")
+        except ValueError as e:
+            validation_label.config(text=str(e))
+
+    def reset_window_fields():
+        validation_label.config(text="")
+        for face in patch_faces:
+            patch_type_vars[face].set("patch")
+            patch_name_vars[face].set("")
+
+    def save_and_close_patch_config():
+        validation_label.config(text="") # Clear previous warning
+
+        try:
+            typed = check_patch_names(names_typed(), complete=True)
+        except ValueError as e:
+            validation_label.config(text=str(e))
+            return
+
+        patch_names.update(typed)
+        sync_patch_names()
+        config_win.destroy()
+        error = boundary_error(typed)
+        if error:
+            status_label.config(text=f"Boundary types/names updated, but {error}", fg="orange")
+        else:
+            status_label.config(text="Boundary types/names updated.")
+        if save_responses_var.get():
+            save_data()
+
+    btn_frame = tk.Frame(config_win)
+    btn_frame.pack(pady=15)
+    tk.Button(btn_frame, text="Save and Close", command=save_and_close_patch_config, bg="#4CAF50", fg="white", width=18).pack(side=tk.LEFT, padx=10)
+    tk.Button(btn_frame, text="Reset", command=reset_window_fields, bg="#F44336", fg="white", width=12).pack(side=tk.LEFT, padx=10)
+
+def patch_names_complete():
+    # Returns True if all patch names are non-empty
+    return validator.get("patches complete")
+
+def sync_patch_names():
+    # patch_names is changed in place, so the validator is given a copy to compare against
+    on_input_change("patch_names", {face: dict(val) for face, val in patch_names.items()})
+
+def update_patch_btn_color():
+    if patch_names_complete():
+        patch_btn.config(bg="#2196F3")  # blue
+    else:
+        patch_btn.config(bg="#FF9800")  # orange
+
+def show_cell_stats():
+    stats_window = tk.Toplevel(root)
+    stats_window.title("Cell Stats")
+    
+    # Set the size and center the window
+    window_width = 350
+    window_height = 230
+    center_window(stats_window, window_width, window_height)
+
+    try:
+        # All memoised by the validator; the origin doesn't change cell sizes or quality
+        stats = [validator.get(f"spacing {axis}") for axis in "xyz"]
+        case = {"origin": [0, 0, 0], "lengths": [validator.get(f"length {axis}") for axis in "xyz"],
+                "cells": validator.get("cells"), "grading": [validator.get(f"grading {axis}") for axis in "xyz"]}
+        report = mesh_quality([case])
+    except ValueError as e:
+        tk.Label(stats_window, text=str(e), fg="red", wraplength=320).pack(pady=20)
+        return
+
+    unit = scale_unit_var.get()
+    graded = any(abs(axis["max"] - axis["min"]) > 1e-6 for axis in stats)
+    if not graded:
+        dx, dy, dz = (axis["mean"] for axis in stats)
+        cell_dimensions = f"{dx:.3f} x {dy:.3f} x {dz:.3f} ({unit})"
+        tk.Label(stats_window, text=f"Cell Dimensions: {cell_dimensions}", font=('Arial', 12)).pack(pady=5)
+    else:
+        center_window(stats_window, 420, 290)
+        tk.Label(stats_window, text=f"Cell sizes ({unit}):", font=('Arial', 12)).pack(pady=(5, 0))
+        for axis_name, axis in zip("XYZ", stats):
+            tk.Label(stats_window, text=f"{axis_name}: min {axis['min']:.4g}  max {axis['max']:.4g}  mean {axis['mean']:.4g}",
+                     font=('Arial', 10)).pack()
+
+    aspect_ratio = report["aspect_ratio"]["max"]
+    tk.Label(stats_window, text=f"Max aspect ratio: {aspect_ratio:.4g}   Max expansion ratio: {report['expansion']['max']:.4g}",
+             font=('Arial', 10)).pack(pady=(5, 0))
+
+    warnings = quality_warnings(report)
+    if validator.get("cubic"):
+        nature = "Cubic."
+        color = "green"
+        message = "This is Optimal"
+    elif warnings:
+        nature = "Poor quality."
+        color = "red"
+        message = warnings[0]
+    else:
+        nature = "Graded." if graded else "Non-Cubic."
+        color = "orange"
+        message = "Check the expansion ratios before meshing." if graded else "Proceed with precaution."
+
+    tk.Label(stats_window, text=f"Geometry form: {nature}", bg=color, fg="white", font=('Arial', 12)).pack(pady=5)
+    tk.Label(stats_window, text=message, fg=color, font=('Arial', 10, 'italic')).pack(pady=5)
+    tk.Button(stats_window, text="Close", command=stats_window.destroy).pack(pady=10)
+
+def current_fields():
+    return {
+        "xmin": xmin_var.get(),
+        "ymin": ymin_var.get(),
+        "zmin": zmin_var.get(),
+        "length_x": length_x_var.get(),
+        "length_y": length_y_var.get(),
+        "length_z": length_z_var.get(),
+        "cells_x": cells_x_var.get(),
+        "cells_y": cells_y_var.get(),
+        "cells_z": cells_z_var.get(),
+        "grading_x": grading_x_var.get(),
+        "grading_y": grading_y_var.get(),
+        "grading_z": grading_z_var.get(),
+        "scale_unit": scale_unit_var.get(),
+        "custom_sign": custom_sign_var.get(),
+        "custom_exp": custom_exp_var.get(),
+        "patch_names": patch_names,
+    }
+
+def generate_dict():
+    try:
+        case = validator.get("case")
+    except ValueError as e:
+        status_label.config(text=str(e), fg="red")
+        return
+
+    warnings = cost_warnings(estimate_cost(mesh_counts(case["cells"]), calibration))
+    if warnings and not messagebox.askyesno("Large mesh", "\n".join(warnings) + "\n\nGenerate anyway?"):
+        status_label.config(text="Generation cancelled.", fg="orange")
+        return
+
+    write_dict(case, "blockMeshDict")
+
+    status_label.config(text="blockMeshDict has been generated!", fg="green")
+
+    if save_responses_var.get():
+        save_data()
+
+def import_dict():
+    path = filedialog.askopenfilename(title="Import blockMeshDict")
+    if not path:
+        return
+    from bmg.dictparser import load_block_mesh_dict
+    try:
+        case = load_block_mesh_dict(path)
+        if "blocks" in case:
+            raise ValueError(f"{os.path.basename(path)} has {len(case['blocks'])} blocks; "
+                             f"use 'python -m bmg import' for multi-block dicts.")
+        fields = fields_from_case(case)
+    except (OSError, ValueError) as e:
+        status_label.config(text=str(e), fg="red")
+        return
+
+    apply_fields(fields)
+    status_label.config(text=f"Imported {os.path.basename(path)}.", fg="green")
+
+def apply_fields(fields):
+    # Fill the form from a full set of flat fields (as fields_from_case or the library return them)
+    for name, var in (("xmin", xmin_var), ("ymin", ymin_var), ("zmin", zmin_var),
+                      ("length_x", length_x_var), ("length_y", length_y_var), ("length_z", length_z_var),
+                      ("cells_x", cells_x_var), ("cells_y", cells_y_var), ("cells_z", cells_z_var),
+                      ("grading_x", grading_x_var), ("grading_y", grading_y_var), ("grading_z", grading_z_var),
+                      ("scale_unit", scale_unit_var), ("custom_sign", custom_sign_var), ("custom_exp", custom_exp_var)):
+        var.set(fields[name])
+    scale_dropdown.set(scale_unit_var.get())
+    on_scale_select(None)
+    patch_names.update(normalize_patch_names(fields["patch_names"]))
+    sync_patch_names()
+
+def open_library_window():
+    global library
+    from bmg.library import PAGE_SIZE, open_library
+    if library is None:
+        try:
+            library = open_library(LIBRARY_FILE, responses_path=SAVE_FILE)
+        except ValueError as e:
+            status_label.config(text=str(e), fg="red")
+            return
+
+    window = tk.Toplevel(root)
+    window.title("Case Library")
+    center_window(window, 560, 500)
+    search_var = tk.StringVar()
+    filter_tags_var = tk.StringVar()
+    name_var = tk.StringVar()
+    tags_var = tk.StringVar()
+    # Names of the rows loaded so far; more pages are fetched as the list is scrolled
+    names = []
+    state = {"after": None, "more": False, "refresh": None}
+
+    search_frame = tk.Frame(window)
+    search_frame.pack(pady=(10, 5))
+    tk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+    tk.Entry(search_frame, textvariable=search_var, width=22).pack(side=tk.LEFT, padx=5)
+    tk.Label(search_frame, text="Tags:").pack(side=tk.LEFT)
+    tk.Entry(search_frame, textvariable=filter_tags_var, width=18).pack(side=tk.LEFT, padx=5)
+
+    list_frame = tk.Frame(window)
+    list_frame.pack(padx=10, fill="both", expand=True)
+    scrollbar = tk.Scrollbar(list_frame)
+    scrollbar.pack(side=tk.RIGHT, fill="y")
+    listbox = tk.Listbox(list_frame, font=("Courier", 9), height=16, exportselection=False)
+    listbox.pack(side=tk.LEFT, fill="both", expand=True)
+    scrollbar.config(command=listbox.yview)
+    count_label = tk.Label(window, text="", font=("Arial", 9))
+    count_label.pack()
+
+    def load_page():
+        rows = library.search(search_var.get().strip(), filter_tags_var.get(), after=state["after"])
+        for row in rows:
+            cells = f"{row['total_cells']:,}" if row["total_cells"] is not None else "-"
+            listbox.insert(tk.END, f"{row['name'][:32]:<32} {cells:>13} cells  {' '.join(row['tags'])}")
+            names.append(row["name"])
+        state["more"] = len(rows) == PAGE_SIZE
+        if rows:
+            state["after"] = rows[-1]["name"]
+
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        if state["more"] and float(last) > 0.9:
+            load_page()
+
+    def refresh():
+        state["refresh"] = None
+        listbox.delete(0, tk.END)
+        names.clear()
+        state["after"] = None
+        load_page()
+        count_label.config(text=f"{library.count(search_var.get().strip(), filter_tags_var.get()):,} case(s)")
+
+    def schedule_refresh(*args):
+        # Wait for a pause in typing rather than searching on every key
+        if state["refresh"] is not None:
+            window.after_cancel(state["refresh"])
+        state["refresh"] = window.after(200, refresh)
+
+    def selected_name():
+        selection = listbox.curselection()
+        return names[selection[0]] if selection else None
+
+    def on_select(event):
+        name = selected_name()
+        if name:
+            case = library.get(name)
+            name_var.set(case["name"])
+            tags_var.set(" ".join(case["tags"]))
+
+    def load_selected():
+        name = selected_name()
+        if not name:
+            result_label.config(text="Select a case first.", fg="red")
+            return
+        try:
+            apply_fields(library.get(name)["fields"])
+        except ValueError as e:
+            result_label.config(text=str(e), fg="red")
+            return
+        status_label.config(text=f"Loaded {name} from the library.", fg="green")
+        result_label.config(text=f"Loaded {name}.", fg="green")
+
+    def save_current():
+        name = name_var.get().strip()
+        if not name:
+            result_label.config(text="Enter a name for the case.", fg="red")
+            return
+        if library.exists(name) and not messagebox.askyesno("Replace case", f"Replace the saved case '{name}'?",
+                                                           parent=window):
+            return
+        library.save(name, current_fields(), tags_var.get())
+        refresh()
+        result_label.config(text=f"Saved {name}.", fg="green")
+
+    def delete_selected():
+        name = selected_name()
+        if not name:
+            result_label.config(text="Select a case first.", fg="red")
+            return
+        if not messagebox.askyesno("Delete case", f"Delete '{name}' from the library?", parent=window):
+            return
+        library.delete(name)
+        refresh()
+        result_label.config(text=f"Deleted {name}.", fg="blue")
+
+    listbox.config(yscrollcommand=on_scroll)
+    listbox.bind("<<ListboxSelect>>", on_select)
+    listbox.bind("<Double-Button-1>", lambda event: load_selected())
+    search_var.trace_add("write", schedule_refresh)
+    filter_tags_var.trace_add("write", schedule_refresh)
+
+    save_frame = tk.Frame(window)
+    save_frame.pack(pady=5)
+    tk.Label(save_frame, text="Name:").pack(side=tk.LEFT)
+    tk.Entry(save_frame, textvariable=name_var, width=20).pack(side=tk.LEFT, padx=5)
+    tk.Label(save_frame, text="Tags:").pack(side=tk.LEFT)
+    tk.Entry(save_frame, textvariable=tags_var, width=16).pack(side=tk.LEFT, padx=5)
+    tk.Button(save_frame, text="Save Current", command=save_current, bg="#4CAF50", fg="white", width=12).pack(side=tk.LEFT, padx=5)
+    result_label = tk.Label(window, text="", font=("Arial", 10))
+    result_label.pack()
+    btns = tk.Frame(window)
+    btns.pack(pady=5)
+    tk.Button(btns, text="Load", command=load_selected, bg="#2196F3", fg="white", width=12).pack(side=tk.LEFT, padx=10)
+    tk.Button(btns, text="Delete", command=delete_selected, bg="#F44336", fg="white", width=12).pack(side=tk.LEFT, padx=10)
+    tk.Button(btns, text="Close", command=window.destroy, width=12).pack(side=tk.LEFT, padx=10)
+    refresh()
+
+def apply_boundary_preset(preset):
+    # One cell thick in Z with the matching empty or wedge faces; everything else is kept
+    apply_fields(apply_preset(current_fields(), preset))
+    if preset == "2d":
+        status_label.config(text="Set up as a 2-D case: 1 cell in Z, empty front and back.", fg="green")
+    else:
+        status_label.config(text=f"Set up as a {WEDGE_ANGLE}-degree wedge about the X axis, with Y as the radius.",
+                            fg="green")
+
+def open_decompose_window():
+    # Same rules and messages as the form itself
+    try:
+        validator.get("cells")
+    except ValueError as e:
+        status_label.config(text=str(e), fg="red")
+        return
+
+    window = tk.Toplevel(root)
+    window.title("Plan Decomposition")
+    center_window(window, 420, 260)
+    processors_var = tk.StringVar()
+    method_var = tk.StringVar(value="hierarchical")
+
+    frame = tk.Frame(window)
+    frame.pack(pady=10)
+    tk.Label(frame, text="Processors:").pack(side=tk.LEFT)
+    tk.Entry(frame, textvariable=processors_var, width=8).pack(side=tk.LEFT, padx=5)
+    method_menu = ttk.Combobox(frame, values=["hierarchical", "simple"], width=12, state="readonly", textvariable=method_var)
+    method_menu.pack(side=tk.LEFT, padx=5)
+    result_label = tk.Label(window, text="", font=("Courier", 9), justify=tk.LEFT)
+    result_label.pack(pady=5)
+
+    def plan_and_write():
+        from bmg.decompose import plan_decomposition, write_decompose_par_dict
+        try:
+            processors = int(processors_var.get())
+        except ValueError:
+            result_label.config(text="Please enter a valid number.", fg="red")
+            return
+        try:
+            # The form may have changed since the window opened
+            scored = plan_decomposition(validator.get("cells"), processors)
+        except ValueError as e:
+            result_label.config(text=str(e), fg="red")
+            return
+        lines = []
+        for s in scored[:3]:
+            lines.append(f"({s['n'][0]} {s['n'][1]} {s['n'][2]})  {s['processor_faces']:,} faces  "
+                         f"{100 * s['imbalance']:.1f}% imbalance")
+        # Next to the blockMeshDict that generate_dict writes
+        path = write_decompose_par_dict(scored[0]["n"], "decomposeParDict", method_var.get())
+        result_label.config(text="\n".join(lines) + f"\n\n{path} written.", fg="green")
+
+    tk.Button(window, text="Plan and Write", command=plan_and_write, bg="#4CAF50", fg="white", width=15).pack(pady=5)
+    tk.Button(window, text="Close", command=window.destroy).pack(pady=5)
+
+def open_auto_size_window():
+    try:
+        for axis in "xyz":
+            validator.get(f"length {axis}")
+    except ValueError as e:
+        status_label.config(text=str(e), fg="red")
+        return
+
+    window = tk.Toplevel(root)
+    window.title("Auto Size Cells")
+    center_window(window, 380, 230)
+    mode_var = tk.StringVar(value="Total cells")
+    target_var = tk.StringVar()
+    try:
+        # Start from the current cell count
+        target_var.set(str(validator.get("total cells")))
+    except ValueError:
+        pass
+    multiple_var = tk.StringVar(value="1")
+
+    frame = tk.Frame(window)
+    frame.pack(pady=10)
+    mode_menu = ttk.Combobox(frame, values=["Total cells", "Cell size"], width=11, state="readonly", textvariable=mode_var)
+    mode_menu.pack(side=tk.LEFT, padx=5)
+    tk.Entry(frame, textvariable=target_var, width=12).pack(side=tk.LEFT, padx=5)
+    multiple_frame = tk.Frame(window)
+    multiple_frame.pack()
+    tk.Label(multiple_frame, text="Cell counts in multiples of:").pack(side=tk.LEFT)
+    tk.Entry(multiple_frame, textvariable=multiple_var, width=5).pack(side=tk.LEFT, padx=5)
+    result_label = tk.Label(window, text="", font=("Arial", 10))
+    result_label.pack(pady=5)
+
+    def apply_auto_size():
+        from bmg.autosize import auto_size
+        try:
+            target = float(target_var.get())
+            multiple = int(multiple_var.get())
+        except ValueError:
+            result_label.config(text="Please enter valid numbers.", fg="red")
+            return
+        try:
+            lengths = [validator.get(f"length {axis}") for axis in "xyz"]
+            if mode_var.get() == "Total cells":
+                result = auto_size(lengths, total_cells=int(target), multiple=multiple)
+            else:
+                result = auto_size(lengths, cell_size=target, multiple=multiple)
+        except ValueError as e:
+            result_label.config(text=str(e), fg="red")
+            return
+        for var, n in zip((cells_x_var, cells_y_var, cells_z_var), result["cells"]):
+            var.set(str(n))
+        update_reset_btn_color()
+        result_label.config(text=f"{result['cells'][0]} x {result['cells'][1]} x {result['cells'][2]} = "
+                                 f"{result['total']:,} cells, max aspect ratio {result['aspect_ratio']:.3f}", fg="green")
+
+    tk.Button(window, text="Apply", command=apply_auto_size, bg="#4CAF50", fg="white", width=12).pack(pady=5)
+    tk.Button(window, text="Close", command=window.destroy).pack(pady=5)
+
+def open_geometry_window():
+    window = tk.Toplevel(root)
+    window.title("Import Geometry")
+    center_window(window, 420, 260)
+    paths = []
+    padding_var = tk.StringVar(value="0.1")
+    size_var = tk.StringVar()
+
+    files_label = tk.Label(window, text="No STL files chosen.", font=("Arial", 9), wraplength=400)
+    files_label.pack(pady=5)
+
+    def choose_files():
+        chosen = filedialog.askopenfilenames(title="Import geometry",
+                                             filetypes=[("STL files", "*.stl *.STL"), ("All files", "*")])
+        if chosen:
+            paths[:] = chosen
+            files_label.config(text=", ".join(os.path.basename(path) for path in paths))
+
+    tk.Button(window, text="Choose STL Files...", command=choose_files, width=18).pack(pady=5)
+    frame = tk.Frame(window)
+    frame.pack()
+    tk.Label(frame, text="Padding (fraction of extent):").grid(row=0, column=0, sticky="e")
+    tk.Entry(frame, textvariable=padding_var, width=8).grid(row=0, column=1, padx=5)
+    tk.Label(frame, text="Background cell size:").grid(row=1, column=0, sticky="e")
+    tk.Entry(frame, textvariable=size_var, width=8).grid(row=1, column=1, padx=5)
+    result_label = tk.Label(window, text="", font=("Arial", 10), wraplength=400)
+    result_label.pack(pady=5)
+
+    def apply_geometry():
+        from bmg.stl import background_box, pad_bounds, stl_bounds
+        if not paths:
+            result_label.config(text="Choose one or more STL files first.", fg="red")
+            return
+        try:
+            padding = float(padding_var.get())
+            cell_size = float(size_var.get()) if size_var.get().strip() else None
+        except ValueError:
+            result_label.config(text="Please enter valid numbers.", fg="red")
+            return
+        result_label.config(text="Reading geometry...", fg="black")
+        window.update_idletasks()
+        try:
+            box = background_box(pad_bounds(stl_bounds(paths), padding), cell_size)
+        except (OSError, ValueError) as e:
+            result_label.config(text=str(e), fg="red")
+            return
+        for var, value in zip((xmin_var, ymin_var, zmin_var), box["origin"]):
+            var.set(f"{value:.6g}")
+        for var, value in zip((length_x_var, length_y_var, length_z_var), box["lengths"]):
+            var.set(f"{value:.6g}")
+        text = "Box filled in from the geometry."
+        if "cells" in box:
+            for var, n in zip((cells_x_var, cells_y_var, cells_z_var), box["cells"]):
+                var.set(str(n))
+            text = f"{box['cells'][0]} x {box['cells'][1]} x {box['cells'][2]} background cells."
+        update_reset_btn_color()
+        result_label.config(text=text, fg="green")
+
+    tk.Button(window, text="Apply", command=apply_geometry, bg="#4CAF50", fg="white", width=12).pack(pady=5)
+    tk.Button(window, text="Close", command=window.destroy).pack(pady=5)
+
+def all_fields_reset():
+    # Check if all input fields and patch names are empty/default
+    return validator.get("is reset")
+
+def update_reset_btn_color():
+    if all_fields_reset():
+        reset_btn.config(bg="#2196F3")  # blue
+    else:
+        reset_btn.config(bg="#F44336")  # red
+
+def reset_all_fields():
+    if all_fields_reset():
+        # Already reset, show info popup
+        popup = tk.Toplevel(root)
+        popup.title("Already Reset")
+        window_width = 300
+        window_height = 100
+        center_window(popup, window_width, window_height)
+        popup.configure(bg="#2196F3")
+        tk.Label(popup, text="All fields are already reset.", bg="#2196F3", fg="white", font=("Arial", 11)).pack(pady=20)
+        tk.Button(popup, text="OK", command=popup.destroy, bg="white", fg="#2196F3", width=10).pack()
+        return
+
+    def do_reset():
+        xmin_var.set("")
+        ymin_var.set("")
+        zmin_var.set("")
+        length_x_var.set("")
+        length_y_var.set("")
+        length_z_var.set("")
+        cells_x_var.set("")
+        cells_y_var.set("")
+        cells_z_var.set("")
+        grading_x_var.set("")
+        grading_y_var.set("")
+        grading_z_var.set("")
+        scale_unit_var.set("m") # Reset to default
+        custom_sign_var.set("+") # Reset to default
+        custom_exp_var.set("1")  # Reset to default
+        hide_custom_scale_entry_in_inputs() # Hide custom scale entry
+        for face in patch_faces:
+            patch_names[face] = {"type": "patch", "name": ""} # Reset to default dict structure
+        sync_patch_names()
+        save_responses_var.set(False)
+        status_label.config(text="All responses have been cleared.", fg="blue")
+        confirm.destroy()
+
+    confirm = tk.Toplevel(root)
+    confirm.title("Confirm Reset")
+    window_width = 400
+    window_height = 120
+    center_window(confirm, window_width, window_height)
+    #confirm.configure(bg="#F44336") # Commented out this line as per your original code
+    tk.Label(confirm, text="Are you sure you want to delete all your responses?", fg="black", font=("Arial", 10)).pack(pady=15)
+    btns = tk.Frame(confirm)
+    btns.pack()
+    tk.Button(btns, text="Yes, Reset", command=do_reset, fg="white", bg="red", width=12).pack(side=tk.LEFT, padx=10)
+    tk.Button(btns, text="Cancel", command=confirm.destroy, bg="white", width=12).pack(side=tk.LEFT, padx=10)
+
+custom_scale_frame = None
+
+def show_custom_scale_entry_in_inputs(parent):
+    global custom_scale_frame
+    if custom_scale_frame is not None:
+        custom_scale_frame.destroy()
+    custom_scale_frame = tk.Frame(parent)
+    custom_scale_frame.pack(pady=3)
+    tk.Label(custom_scale_frame, text="Custom scale: 1e", font=("Arial", 10)).pack(side=tk.LEFT)
+    sign_menu = ttk.Combobox(custom_scale_frame, values=["+", "-"], width=2, state="readonly", textvariable=custom_sign_var)
+    sign_menu.pack(side=tk.LEFT, padx=2)
+    if custom_sign_var.get() in ["+", "-"]:
+        sign_menu.set(custom_sign_var.get())
+    else:
+        sign_menu.set("+")
+    exp_entry = tk.Entry(custom_scale_frame, textvariable=custom_exp_var, width=2)
+    exp_entry.pack(side=tk.LEFT, padx=2)
+    tk.Label(custom_scale_frame, text=" * m", font=("Arial", 10)).pack(side=tk.LEFT)
+    field_error_labels["custom_exp"] = tk.Label(custom_scale_frame, text="", fg="red", font=("Arial", 9))
+    field_error_labels["custom_exp"].pack(side=tk.LEFT, padx=5)
+    update_field_errors(["scale"])
+
+def hide_custom_scale_entry_in_inputs():
+    global custom_scale_frame
+    if custom_scale_frame is not None:
+        custom_scale_frame.destroy()
+        custom_scale_frame = None
+        field_error_labels.pop("custom_exp", None)
+
+def on_scale_select(event):
+    if scale_unit_var.get() == "custom..":
+        show_custom_scale_entry_in_inputs(input_frame)
+    else:
+        hide_custom_scale_entry_in_inputs()
+
+scale_options = ["m", "cm", "mm", "custom.."]
+scale_map = {
+    "m": "m",
+    "cm": "cm",
+    "mm": "mm",
+    "custom..": "custom.."
+}
+
+def scale_dropdown_callback(event):
+    on_scale_select(event)
+
+def make_labeled_entry(parent, label_text, var, name=None):
+    frame = tk.Frame(parent)
+    frame.pack(pady=3)
+    tk.Label(frame, text=label_text + ":", width=15, anchor="w").pack(side=tk.LEFT)
+    entry = tk.Entry(frame, textvariable=var, width=12)
+    entry.pack(side=tk.LEFT)
+    if name:
+        # What is wrong with the field, shown as it is typed
+        field_error_labels[name] = tk.Label(frame, text="", fg="red", font=("Arial", 9), anchor="w",
+                                            width=30, wraplength=210, justify="left")
+        field_error_labels[name].pack(side=tk.LEFT, padx=5)
+        var.trace_add("write", lambda *args: on_input_change(name, var.get()))
+    return entry
+
+def update_field_errors(rules):
+    for name, label in field_error_labels.items():
+        if field_rules[name] in rules:
+            # A field being filled in isn't an error yet
+            error = validator.error(field_rules[name]) if validator.get(name).strip() else None
+            label.config(text=error or "")
+
+def on_input_change(name, value):
+    # Only what depends on the changed input is checked again
+    stale = validator.set(name, value)
+    if not stale:
+        return
+    update_field_errors(stale)
+    if "is reset" in stale:
+        update_reset_btn_color()
+    if "patches complete" in stale:
+        update_patch_btn_color()
+    if "cells" in stale:
+        update_cost_label()
+    if "box" in stale or name == "patch_names":
+        schedule_preview()
+
+def update_cost_label(*args):
+    try:
+        cells = validator.get("cells")
+    except ValueError:
+        cost_label.config(text="")
+        return
+    estimate = estimate_cost(mesh_counts(cells), calibration)
+    cost_label.config(text=summary_line(estimate), fg="red" if cost_warnings(estimate) else "black")
+
+def preview_items_for(kind, count, create):
+    items = preview_items[kind]
+    while len(items) < count:
+        items.append(create())
+    for item in items[count:]:
+        preview_canvas.itemconfigure(item, state="hidden")
+    return items
+
+def draw_preview():
+    preview_view["pending"] = None
+    try:
+        case = dict(validator.get("box"), patch_names=validator.get("patch_names"))
+        scene = preview_scene(case, preview_view["yaw"], preview_view["pitch"], PREVIEW_SIZE, PREVIEW_SIZE)
+    except ValueError:
+        scene = {"faces": [], "lines": [], "edges": [], "steps": None}
+
+    faces = preview_items_for("faces", len(scene["faces"]),
+                              lambda: preview_canvas.create_polygon(0, 0, 0, 0, 0, 0, outline="", tags="face"))
+    for item, (face, colour, polygon) in zip(faces, scene["faces"]):
+        preview_canvas.coords(item, *polygon)
+        preview_canvas.itemconfigure(item, fill=colour, state="normal")
+    created = len(preview_items["lines"]) < len(scene["lines"]) or len(preview_items["edges"]) < len(scene["edges"])
+    lines = preview_items_for("lines", len(scene["lines"]),
+                              lambda: preview_canvas.create_line(0, 0, 0, 0, fill="#757575", tags="grid"))
+    for item, segment in zip(lines, scene["lines"]):
+        preview_canvas.coords(item, *segment)
+        preview_canvas.itemconfigure(item, state="normal")
+    edges = preview_items_for("edges", len(scene["edges"]),
+                              lambda: preview_canvas.create_line(0, 0, 0, 0, fill="black", width=2, tags="edge"))
+    for item, segment in zip(edges, scene["edges"]):
+        preview_canvas.coords(item, *segment)
+        preview_canvas.itemconfigure(item, state="normal")
+    if created:
+        preview_canvas.tag_raise("grid")
+        preview_canvas.tag_raise("edge")
+
+    if scene["steps"] is None:
+        preview_label.config(text="Enter the box to see a preview.")
+    elif max(scene["steps"]) == 1:
+        preview_label.config(text="Every grid line shown.")
+    else:
+        steps = " x ".join(str(step) for step in scene["steps"])
+        preview_label.config(text=f"Grid lines every {steps} cells.")
+
+def schedule_preview(*args):
+    if preview_view["pending"] is not None:
+        root.after_cancel(preview_view["pending"])
+    preview_view["pending"] = root.after(PREVIEW_DELAY_MS, draw_preview)
+
+def start_preview_drag(event):
+    preview_view["drag"] = (event.x, event.y, preview_view["yaw"], preview_view["pitch"])
+
+def drag_preview(event):
+    if preview_view["drag"] is None:
+        return
+    x, y, yaw, pitch = preview_view["drag"]
+    preview_view["yaw"] = yaw - 0.01 * (event.x - x)
+    # Stop short of straight up or down, where the view would flip over
+    preview_view["pitch"] = min(1.55, max(-1.55, pitch + 0.01 * (event.y - y)))
+    draw_preview()
+
+def reset_preview_view(event=None):
+    preview_view["yaw"] = DEFAULT_YAW
+    preview_view["pitch"] = DEFAULT_PITCH
+    draw_preview()
+
+def main():
+    """Build the main window and run the Tk event loop."""
+    global root, scale_unit_var, custom_sign_var, custom_exp_var, scale_dropdown, input_frame
+    global xmin_var, ymin_var, zmin_var, length_x_var, length_y_var, length_z_var
+    global cells_x_var, cells_y_var, cells_z_var, grading_x_var, grading_y_var, grading_z_var
+    global calibration, cost_label, patch_btn, save_responses_var, reset_btn, status_label, saver
+    global preview_canvas, preview_label, validator
+
+    root = tk.Tk()
+    root.title("blockMeshDict Generator")
+    # Center the main window as well
+    root_width = 520 + PREVIEW_SIZE
+    root_height = 870
+    center_window(root, root_width, root_height)
+    root.resizable(False, False)
+
+    # Packed first so that it keeps the right-hand side and the form fills the rest
+    preview_frame = tk.Frame(root)
+    preview_frame.pack(side=tk.RIGHT, fill="y", padx=(0, 10))
+    tk.Label(preview_frame, text="Preview", font=("Arial", 10, "bold")).pack(pady=5)
+    preview_canvas = tk.Canvas(preview_frame, width=PREVIEW_SIZE, height=PREVIEW_SIZE, bg="white",
+                               highlightthickness=1, highlightbackground="#BDBDBD")
+    preview_canvas.pack()
+    preview_label = tk.Label(preview_frame, text="", font=("Arial", 9))
+    preview_label.pack()
+    tk.Label(preview_frame, text="Drag to rotate, double-click for the isometric view.",
+             font=("Arial", 9), fg="gray").pack()
+    preview_canvas.bind("<ButtonPress-1>", start_preview_drag)
+    preview_canvas.bind("<B1-Motion>", drag_preview)
+    preview_canvas.bind("<Double-Button-1>", reset_preview_view)
+
+    validator = box_validator()
+    scale_unit_var = tk.StringVar(value="m")
+    custom_sign_var = tk.StringVar(value="+")
+    custom_exp_var = tk.StringVar(value="1")
+    for name, var in (("scale_unit", scale_unit_var), ("custom_sign", custom_sign_var), ("custom_exp", custom_exp_var)):
+        var.trace_add("write", lambda *args, name=name, var=var: on_input_change(name, var.get()))
+    tk.Label(root, text="Select Scale:", font=("Arial", 10, "bold")).pack(pady=5)
+    units_frame = tk.Frame(root)
+    units_frame.pack()
+
+    scale_dropdown = ttk.Combobox(units_frame, values=scale_options, state="readonly", textvariable=scale_unit_var)
+    scale_dropdown.current(0)
+    scale_dropdown.pack(anchor="w")
+    scale_dropdown.bind("<<ComboboxSelected>>", scale_dropdown_callback)
+
+    input_frame = tk.Frame(root)
+    input_frame.pack(pady=10)
+
+    xmin_var = tk.StringVar()
+    ymin_var = tk.StringVar()
+    zmin_var = tk.StringVar()
+    length_x_var = tk.StringVar()
+    length_y_var = tk.StringVar()
+    length_z_var = tk.StringVar()
+    cells_x_var = tk.StringVar()
+    cells_y_var = tk.StringVar()
+    cells_z_var = tk.StringVar()
+    grading_x_var = tk.StringVar()
+    grading_y_var = tk.StringVar()
+    grading_z_var = tk.StringVar()
+
+    make_labeled_entry(input_frame, "Xmin", xmin_var, "xmin")
+    make_labeled_entry(input_frame, "Ymin", ymin_var, "ymin")
+    make_labeled_entry(input_frame, "Zmin", zmin_var, "zmin")
+    make_labeled_entry(input_frame, "Length in X", length_x_var, "length_x")
+    make_labeled_entry(input_frame, "Length in Y", length_y_var, "length_y")
+    make_labeled_entry(input_frame, "Length in Z", length_z_var, "length_z")
+    make_labeled_entry(input_frame, "Cells in X direction", cells_x_var, "cells_x")
+    make_labeled_entry(input_frame, "Cells in Y direction", cells_y_var, "cells_y")
+    make_labeled_entry(input_frame, "Cells in Z direction", cells_z_var, "cells_z")
+    make_labeled_entry(input_frame, "Grading in X", grading_x_var, "grading_x")
+    make_labeled_entry(input_frame, "Grading in Y", grading_y_var, "grading_y")
+    make_labeled_entry(input_frame, "Grading in Z", grading_z_var, "grading_z")
+
+    # Cached calibration only; timing the machine is left to 'python -m bmg cost --calibrate'
+    calibration = load_calibration()
+    cost_label = tk.Label(root, text="", font=("Arial", 9), wraplength=480)
+    cost_label.pack()
+
+
+    btn_frame = tk.Frame(root)
+    btn_frame.pack(pady=10)
+
+    patch_btn = tk.Button(btn_frame, text="Configure Boundaries", command=open_patch_config, bg="#2196F3", fg="white", width=20)
+    patch_btn.grid(row=0, column=0, padx=5, pady=5)
+
+    stats_btn = tk.Button(btn_frame, text="Show Cell Stats", command=show_cell_stats, bg="#2196F3", fg="white", width=20)
+    stats_btn.grid(row=0, column=1, padx=5, pady=5)
+
+    import_btn = tk.Button(btn_frame, text="Import blockMeshDict", command=import_dict, bg="#2196F3", fg="white", width=20)
+    import_btn.grid(row=1, column=0, padx=5, pady=5)
+
+    decompose_btn = tk.Button(btn_frame, text="Plan Decomposition", command=open_decompose_window, bg="#2196F3", fg="white", width=20)
+    decompose_btn.grid(row=1, column=1, padx=5, pady=5)
+
+    auto_size_btn = tk.Button(btn_frame, text="Auto Size Cells", command=open_auto_size_window, bg="#2196F3", fg="white", width=20)
+    auto_size_btn.grid(row=2, column=0, padx=5, pady=5)
+
+    geometry_btn = tk.Button(btn_frame, text="Import Geometry", command=open_geometry_window, bg="#2196F3", fg="white", width=20)
+    geometry_btn.grid(row=2, column=1, padx=5, pady=5)
+
+    library_btn = tk.Button(btn_frame, text="Case Library", command=open_library_window, bg="#2196F3", fg="white", width=20)
+    library_btn.grid(row=3, column=0, padx=5, pady=5)
+
+    two_d_btn = tk.Button(btn_frame, text="2-D Preset", command=lambda: apply_boundary_preset("2d"), bg="#2196F3", fg="white", width=20)
+    two_d_btn.grid(row=3, column=1, padx=5, pady=5)
+
+    wedge_btn = tk.Button(btn_frame, text="Wedge Preset", command=lambda: apply_boundary_preset("wedge"), bg="#2196F3", fg="white", width=20)
+    wedge_btn.grid(row=4, column=0, padx=5, pady=5)
+
+    generate_btn = tk.Button(root, text="Generate blockMeshDict", command=generate_dict, bg="#4CAF50", fg="white", width=25)
+    generate_btn.pack(pady=10)
+
+    save_responses_var = tk.BooleanVar(value=False)
+    save_radio_frame = tk.Frame(root)
+    save_radio_frame.pack(pady=10)
+    save_checkbox = tk.Checkbutton(save_radio_frame, text="Save responses before generating.", variable=save_responses_var)
+    save_checkbox.pack(anchor="w")
+
+    btns_below = tk.Frame(root)
+    btns_below.pack(pady=10)
+    reset_btn = tk.Button(btns_below, text="Reset", command=reset_all_fields, bg="#F44336", fg="white", width=12)
+    reset_btn.pack(side=tk.LEFT, padx=10)
+    exit_btn = tk.Button(btns_below, text="Exit", command=root.destroy, bg="#F44336", fg="white", width=12)
+    exit_btn.pack(side=tk.LEFT, padx=10)
+
+    status_label = tk.Label(root, text="", font=("Arial", 10))
+    status_label.pack(pady=10)
+
+    # Load saved data if exists
+    saver = Saver(SAVE_FILE)
+    saved, source = load_saved_data()
+    if saved:
+        xmin_var.set(saved.get("xmin", ""))
+        ymin_var.set(saved.get("ymin", ""))
+        zmin_var.set(saved.get("zmin", ""))
+        length_x_var.set(saved.get("length_x", ""))
+        length_y_var.set(saved.get("length_y", ""))
+        length_z_var.set(saved.get("length_z", ""))
+        cells_x_var.set(saved.get("cells_x", ""))
+        cells_y_var.set(saved.get("cells_y", ""))
+        cells_z_var.set(saved.get("cells_z", ""))
+        grading_x_var.set(saved.get("grading_x", ""))
+        grading_y_var.set(saved.get("grading_y", ""))
+        grading_z_var.set(saved.get("grading_z", ""))
+        scale_unit_var.set(saved.get("scale_unit", "m"))
+        custom_sign_var.set(saved.get("custom_sign", "+"))
+        custom_exp_var.set(saved.get("custom_exp", "1"))
+
+        if scale_unit_var.get() in scale_options:
+            scale_dropdown.set(scale_unit_var.get())
+        else:
+            scale_dropdown.set("custom..")
+
+        # Update patch_names from saved data, handling old format
+        patch_names.update(normalize_patch_names(saved.get("patch_names", {})))
+        sync_patch_names()
+
+        save_responses_var.set(saved.get("save_responses", False))
+        if source == "journal":
+            status_label.config(text=f"{SAVE_FILE} was damaged; restored the last good save.", fg="orange")
+        else:
+            status_label.config(text="Loaded previous responses.", fg="green")
+
+    if scale_unit_var.get() == "custom..":
+        show_custom_scale_entry_in_inputs(input_frame)
+    else:
+        hide_custom_scale_entry_in_inputs()
+
+    update_patch_btn_color()
+    update_reset_btn_color()
+    update_cost_label()
+    draw_preview()
+
+    root.mainloop()
@@ -0,0 +1,309 @@
+"""A library of named cases in one SQLite file (``cases.db`` by default).
+
+Each case is stored as the flat GUI fields, the same ones responses.json
+holds, together with its tags and indexed columns for the box size (in
+metres) and the cell counts, so searching by name, tag, dimensions or cell
+count never has to decode the stored fields. Listings are paged by name,
+which keeps a library of tens of thousands of cases as quick to browse as
+an empty one.
+
+Cases can be exported to and imported from JSON lines, one
+``{"name", "tags", "fields"}`` object per line. The import also accepts
+flat responses.json fields or structured cases (origin, lengths, cells)
+next to a "name", like a batch manifest.
+"""
+import json
+import os
+import sqlite3
+import time
+
+from bmg.core import (case_from_fields, field_names, fields_from_case, grading_field_names, normalize_case,
+                      normalize_patch_names)
+from bmg.trace import traced
+
+LIBRARY_FILE = "cases.db"
+# Rows fetched per page of a listing
+PAGE_SIZE = 100
+# Name given to the case migrated from an old responses.json
+MIGRATED_NAME = "responses"
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    tags TEXT NOT NULL DEFAULT '',
+    length_x REAL, length_y REAL, length_z REAL,
+    cells_x INTEGER, cells_y INTEGER, cells_z INTEGER, cells INTEGER,
+    modified REAL NOT NULL,
+    fields TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS case_tags (
+    tag TEXT NOT NULL,
+    name TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (tag, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS case_tags_name ON case_tags (name);
+CREATE INDEX IF NOT EXISTS cases_cells ON cases (cells);
+CREATE INDEX IF NOT EXISTS cases_length_x ON cases (length_x);
+CREATE INDEX IF NOT EXISTS cases_length_y ON cases (length_y);
+CREATE INDEX IF NOT EXISTS cases_length_z ON cases (length_z);
+CREATE INDEX IF NOT EXISTS cases_modified ON cases (modified);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Columns that can be filtered by a (low, high) range
+range_columns = ["length_x", "length_y", "length_z", "cells_x", "cells_y", "cells_z", "cells", "modified"]
+
+# Flat fields kept for every case, with the GUI's defaults
+stored_fields = dict.fromkeys(field_names + grading_field_names, "")
+stored_fields.update({"scale_unit": "m", "custom_sign": "+", "custom_exp": "1"})
+
+
+def parse_tags(tags):
+    """Tags from a list or a comma/space separated string, lower-cased and without repeats."""
+    if isinstance(tags, str):
+        tags = tags.replace(",", " ").split()
+    result = []
+    for tag in tags or ():
+        tag = str(tag).strip().lower()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+def parse_range(text):
+    """(low, high) from "low..high", "low.." or "..high"; a single number matches itself."""
+    low, dots, high = str(text).partition("..")
+    try:
+        low = float(low) if low.strip() else None
+        high = float(high) if high.strip() else None
+    except ValueError:
+        raise ValueError(f"Expected a range like 1e5..1e6, not '{text}'.")
+    return (low, high) if dots else (low, low)
+
+
+def clean_fields(fields):
+    """The stored form of a set of flat fields: known keys only, as strings, patch names normalized."""
+    cleaned = {}
+    for key, default in stored_fields.items():
+        value = fields.get(key)
+        cleaned[key] = default if value is None else str(value)
+    # Also converts the old string-valued patch names of early responses.json files
+    cleaned["patch_names"] = normalize_patch_names(fields.get("patch_names"))
+    return cleaned
+
+
+def fields_from_entry(entry):
+    """Flat fields for an import entry: {"fields": ...}, flat fields or a structured case."""
+    if isinstance(entry.get("fields"), dict):
+        return clean_fields(entry["fields"])
+    if "lengths" in entry or "origin" in entry:
+        return fields_from_case(normalize_case(entry))
+    return clean_fields(entry)
+
+
+def indexed_columns(fields):
+    # Lengths in metres so that cases in different units compare; None where a field is incomplete
+    try:
+        case = case_from_fields(fields)
+    except ValueError:
+        return [None] * 7
+    lengths = [length * case["scale"] for length in case["lengths"]]
+    cells = case["cells"]
+    return lengths + cells + [cells[0] * cells[1] * cells[2]]
+
+
+class Library:
+    """Named cases in a SQLite file; use as a context manager or call close()."""
+
+    def __init__(self, path=LIBRARY_FILE):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self.db = sqlite3.connect(path)
+        try:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            self.db.close()
+            raise ValueError(f"{path} is not a case library ({e}).")
+        if version > SCHEMA_VERSION:
+            self.db.close()
+            raise ValueError(f"{path} was written by a newer version of bmg.")
+        if version < SCHEMA_VERSION:
+            with self.db:
+                self.db.executescript(SCHEMA)
+                self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _rows(self, entries):
+        now = time.time()
+        for name, tags, fields, modified in entries:
+            name = str(name).strip()
+            if not name:
+                raise ValueError("Every case needs a name.")
+            yield (name, tags, *indexed_columns(fields), float(modified or now),
+                   json.dumps(fields, separators=(",", ":")))
+
+    def _store(self, rows):
+        # One statement per table, so a bulk import costs a few executemany calls;
+        # the last of several rows with the same name wins, as it would one at a time
+        rows = list({row[0].lower(): row for row in rows}.values())
+        self.db.executemany(
+            "INSERT INTO cases (name, tags, length_x, length_y, length_z, cells_x, cells_y, cells_z, cells, "
+            "modified, fields) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+            "tags = excluded.tags, length_x = excluded.length_x, length_y = excluded.length_y, "
+            "length_z = excluded.length_z, cells_x = excluded.cells_x, cells_y = excluded.cells_y, "
+            "cells_z = excluded.cells_z, cells = excluded.cells, modified = excluded.modified, "
+            "fields = excluded.fields", rows)
+        self.db.executemany("DELETE FROM case_tags WHERE name = ?", [(row[0],) for row in rows])
+        self.db.executemany("INSERT OR IGNORE INTO case_tags (tag, name) VALUES (?, ?)",
+                            [(tag, row[0]) for row in rows for tag in row[1].split()])
+
+    def save(self, name, fields, tags=()):
+        """Store ``fields`` as ``name``, replacing any case of that name (names ignore case)."""
+        rows = list(self._rows([(name, " ".join(parse_tags(tags)), clean_fields(fields), None)]))
+        with self.db:
+            self._store(rows)
+
+    def exists(self, name):
+        return self.db.execute("SELECT 1 FROM cases WHERE name = ?", (name,)).fetchone() is not None
+
+    def get(self, name):
+        """{"name", "tags", "fields", "modified"} for one case; ValueError if there is none."""
+        row = self.db.execute("SELECT name, tags, fields, modified FROM cases WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise ValueError(f"No case named '{name}' in the library.")
+        return {"name": row[0], "tags": row[1].split(), "fields": json.loads(row[2]), "modified": row[3]}
+
+    def delete(self, name):
+        with self.db:
+            if not self.db.execute("DELETE FROM cases WHERE name = ?", (name,)).rowcount:
+                raise ValueError(f"No case named '{name}' in the library.")
+            self.db.execute("DELETE FROM case_tags WHERE name = ?", (name,))
+
+    def _where(self, text="", tags=(), ranges=None):
+        clauses = []
+        params = []
+        if text:
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        for tag in parse_tags(tags):
+            clauses.append("name IN (SELECT name FROM case_tags WHERE tag = ?)")
+            params.append(tag)
+        for column, (low, high) in (ranges or {}).items():
+            if column not in range_columns:
+                raise ValueError(f"Cannot filter on '{column}'; expected one of {', '.join(range_columns)}.")
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    @traced("library search")
+    def search(self, text="", tags=(), ranges=None, after=None, limit=PAGE_SIZE):
+        """One page of matching cases in name order, without their fields.
+
+        ``text`` matches anywhere in the name, every tag in ``tags`` must be
+        present and ``ranges`` maps columns in ``range_columns`` to (low,
+        high) bounds, either of which may be None. Pass the last name of a
+        page as ``after`` to get the next one.
+        """
+        where, params = self._where(text, tags, ranges)
+        if after is not None:
+            where += (" AND " if where else " WHERE ") + "name > ?"
+            params.append(after)
+        rows = self.db.execute(
+            f"SELECT name, tags, length_x, length_y, length_z, cells_x, cells_y, cells_z, cells, modified "
+            f"FROM cases{where} ORDER BY name LIMIT ?", params + [limit])
+        return [{"name": row[0], "tags": row[1].split(), "lengths": list(row[2:5]), "cells": list(row[5:8]),
+                 "total_cells": row[8], "modified": row[9]} for row in rows]
+
+    def count(self, text="", tags=(), ranges=None):
+        where, params = self._where(text, tags, ranges)
+        return self.db.execute(f"SELECT COUNT(*) FROM cases{where}", params).fetchone()[0]
+
+    @traced("library import")
+    def import_jsonl(self, path, batch_size=5000):
+        """Add or replace the cases in a JSON lines file.
+
+        Returns (imported, errors) with one (line number, message) per
+        entry that couldn't be read; the other entries are still imported.
+        """
+        imported = 0
+        errors = []
+        pending = []
+        with open(path, "r") as f, self.db:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    if not isinstance(entry, dict):
+                        raise ValueError("expected a JSON object")
+                    # Exported cases keep their modification time
+                    pending.extend(self._rows([(entry.get("name") or "", " ".join(parse_tags(entry.get("tags"))),
+                                                fields_from_entry(entry), entry.get("modified"))]))
+                except (TypeError, ValueError) as e:
+                    errors.append((number, str(e)))
+                    continue
+                if len(pending) >= batch_size:
+                    self._store(pending)
+                    imported += len(pending)
+                    pending = []
+            self._store(pending)
+            imported += len(pending)
+        return imported, errors
+
+    def export_jsonl(self, path, text="", tags=(), ranges=None):
+        """Write the matching cases to a JSON lines file in name order; returns how many."""
+        where, params = self._where(text, tags, ranges)
+        rows = self.db.execute(f"SELECT name, tags, fields, modified FROM cases{where} ORDER BY name", params)
+        exported = 0
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for name, tags_text, fields, modified in rows:
+                f.write(f'{{"name": {json.dumps(name)}, "tags": {json.dumps(tags_text.split())}, '
+                        f'"modified": {modified!r}, "fields": {fields}}}\n')
+                exported += 1
+        os.replace(tmp_path, path)
+        return exported
+
+    def migrate_responses(self, path, name=MIGRATED_NAME):
+        """Add a responses.json (or its journal, if damaged) as the case ``name``.
+
+        Each file is migrated once; returns True if a case was added.
+        """
+        from bmg.persist import load
+
+        key = "migrated " + os.path.abspath(path)
+        if self.db.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return False
+        data, _ = load(path)
+        added = False
+        with self.db:
+            if data and not self.exists(name):
+                self._store(list(self._rows([(name, "migrated", clean_fields(data), None)])))
+                added = True
+            self.db.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+        return added
+
+
+def open_library(path=LIBRARY_FILE, responses_path=None):
+    """Open (or create) a library, first migrating ``responses_path`` if it exists."""
+    library = Library(path)
+    if responses_path and os.path.exists(responses_path):
+        library.migrate_responses(responses_path)
+    return library
@@ -0,0 +1,180 @@
+"""Crash-safe, non-blocking saves of responses.json.
+
+``Saver.save()`` only serialises the data and hands it to a background
+thread, which waits until saves have stopped arriving for ``delay``
+seconds and then writes the newest one: to a temporary file next to the
+target, fsync'ed, then moved over it with ``os.replace``. A crash leaves
+either the old file or the new one, never half of each, and a slow or
+network home directory never holds up the GUI.
+
+Every write is also appended to a journal (``responses.json.journal``,
+one JSON line per save, trimmed back to the last JOURNAL_ENTRIES whenever
+it reaches twice that). If the file itself can't be read, ``load()`` falls
+back to the newest complete journal line.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+from bmg.trace import traced
+
+DEBOUNCE_SECONDS = 0.5
+JOURNAL_ENTRIES = 20
+
+
+def journal_path(path):
+    return path + ".journal"
+
+
+def _replace(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _ends_torn(path):
+    try:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except OSError:
+        return False
+
+
+def read_journal(path):
+    """Saved states in the journal of ``path``, oldest first; a torn last line is skipped."""
+    entries = []
+    try:
+        with open(journal_path(path), "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return [entry for entry in entries if isinstance(entry, dict) and isinstance(entry.get("data"), dict)]
+
+
+def load(path):
+    """(data, source): the saved dict and "file" or "journal", or ({}, None) if there is nothing usable."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data, "file"
+    except FileNotFoundError:
+        return {}, None
+    except (OSError, ValueError):
+        pass
+    entries = read_journal(path)
+    if entries:
+        return entries[-1]["data"], "journal"
+    return {}, None
+
+
+class Saver:
+    """Debounced background writer for one JSON file and its journal."""
+
+    def __init__(self, path, delay=DEBOUNCE_SECONDS, journal_entries=JOURNAL_ENTRIES):
+        self.path = path
+        self.delay = delay
+        self.journal_entries = journal_entries
+        self.error = None
+        self.writes = 0
+        self._condition = threading.Condition()
+        self._pending = None
+        self._due = 0.0
+        self._writing = False
+        self._closed = False
+        self._thread = None
+        self._journal_lines = None
+
+    def save(self, data):
+        """Queue ``data`` for writing; returns at once. Later saves replace earlier unwritten ones."""
+        # Serialised here so the caller can keep changing its own dicts
+        text = json.dumps(data)
+        with self._condition:
+            if self._closed:
+                raise ValueError("The saver has been closed.")
+            self._pending = text
+            self._due = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bmg-saver", daemon=True)
+                self._thread.start()
+                # Daemon threads die with the interpreter, so finish the last save on exit
+                atexit.register(self.close)
+            self._condition.notify()
+
+    def flush(self, timeout=None):
+        """Write any queued save now and wait for it; False if ``timeout`` ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._due = 0.0
+            self._condition.notify_all()
+            while self._pending is not None or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and (self._pending is None or time.monotonic() < self._due):
+                    wait = None if self._pending is None else self._due - time.monotonic()
+                    self._condition.wait(wait)
+                if self._pending is None:
+                    return
+                text = self._pending
+                self._pending = None
+                self._writing = True
+            try:
+                self._write(text)
+                self.error = None
+            except OSError as e:
+                self.error = e
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    @traced("save responses")
+    def _write(self, text):
+        _replace(self.path, text)
+        self.writes += 1
+        self._append_journal(text)
+
+    def _append_journal(self, text):
+        path = journal_path(self.path)
+        line = f'{{"time": {time.time()!r}, "data": {text}}}\n'
+        if self._journal_lines is None:
+            self._journal_lines = len(read_journal(self.path))
+            # A crash mid-append leaves a torn last line; don't glue the next one onto it
+            if _ends_torn(path):
+                line = "\n" + line
+        if self._journal_lines >= 2 * self.journal_entries:
+            # Rewritten atomically like the file itself, keeping the newest entries
+            entries = read_journal(self.path)
+            entries = entries[max(0, len(entries) - self.journal_entries + 1):] if self.journal_entries > 1 else []
+            kept = [json.dumps(entry) + "\n" for entry in entries]
+            _replace(path, "".join(kept) + line.lstrip("\n"))
+            self._journal_lines = len(kept) + 1
+        else:
+            with open(path, "a") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_lines += 1
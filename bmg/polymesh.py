@@ -0,0 +1,406 @@
+"""Write constant/polyMesh for a box case directly, without running blockMesh.
+
+A single hex block is a structured grid, so every point, face, owner and
+neighbour index is plain index arithmetic. Each grid row is filled with
+strided slice assignments of ``array`` ranges (C speed, no per-cell Python
+loop) and written out chunk by chunk, so memory stays bounded no matter how
+many cells the mesh has.
+
+Points are numbered i-fastest, cells likewise, internal faces are in upper
+triangular order and boundary faces are grouped by patch, exactly as
+OpenFOAM expects.
+"""
+import os
+import sys
+from array import array
+
+from bmg.core import boundary_patches, wedge_axes
+from bmg.grading import axis_points
+from bmg.trace import traced
+
+# Entries (labels or scalars) buffered before a chunk is flushed to disk
+CHUNK_ENTRIES = 1 << 18
+
+LABEL32_MAX = 2 ** 31 - 1
+
+FOAM_BANNER = r"""/*--------------------------------*- C++ -*----------------------------------*\
+| =========                               |                                 |
+| \\      /  F ield        | OpenFOAM: The Open Source CFD Toolbox           |
+|  \\    /   O peration    | Version:  v2312                                 |
+|   \\  /    A nd          | Website:  www.openfoam.com                      |
+|    \\/     M anipulation |                                                 |
+\*---------------------------------------------------------------------------*/
+"""
+
+# Corner offsets (di, dj, dk) of a face relative to its owner cell, ordered so
+# that the right-hand-rule normal points out of the owner
+internal_face_corners = {
+    "x": ((1, 0, 0), (1, 1, 0), (1, 1, 1), (1, 0, 1)),
+    "y": ((0, 1, 0), (0, 1, 1), (1, 1, 1), (1, 1, 0)),
+    "z": ((0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)),
+}
+
+# face -> (normal axis, owner cell layer is the last one, inner axis, outer axis, corners)
+boundary_sides = {
+    "left (xmin)": (0, False, 1, 2, ((0, 0, 0), (0, 0, 1), (0, 1, 1), (0, 1, 0))),
+    "right (xmax)": (0, True, 1, 2, internal_face_corners["x"]),
+    "back (ymin)": (1, False, 0, 2, ((0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1))),
+    "front (ymax)": (1, True, 0, 2, internal_face_corners["y"]),
+    "bottom (zmin)": (2, False, 0, 1, ((0, 0, 0), (0, 1, 0), (1, 1, 0), (1, 0, 0))),
+    "top (zmax)": (2, True, 0, 1, internal_face_corners["z"]),
+}
+
+
+def mesh_axes(case):
+    grading = case.get("grading", [1, 1, 1])
+    return [axis_points(case["origin"][a], case["lengths"][a], case["cells"][a], grading[a]) for a in range(3)]
+
+
+def mesh_counts(cells):
+    nx, ny, nz = cells
+    n_internal = (nx - 1) * ny * nz + nx * (ny - 1) * nz + nx * ny * (nz - 1)
+    n_boundary = 2 * (ny * nz + nx * nz + nx * ny)
+    return {
+        "points": (nx + 1) * (ny + 1) * (nz + 1),
+        "cells": nx * ny * nz,
+        "faces": n_internal + n_boundary,
+        "internal_faces": n_internal,
+        "boundary_faces": n_boundary,
+    }
+
+
+class ListWriter:
+    """Streams one OpenFOAM list: header, size, then chunks, then the closing bracket."""
+
+    def __init__(self, f, binary, size):
+        self.f = f
+        self.binary = binary
+        if binary:
+            f.write(b"\n%d\n(" % size)
+        else:
+            f.write(b"\n%d\n(\n" % size)
+
+    def write(self, data, ascii_format):
+        if not data:
+            return
+        if self.binary:
+            if sys.byteorder != "little":
+                data = array(data.typecode, data)
+                data.byteswap()
+            self.f.write(data.tobytes())
+        else:
+            per_entry = ascii_format.count("%")
+            count = len(data) // per_entry
+            self.f.write(((ascii_format * count) % tuple(data)).encode("ascii"))
+
+    def close(self):
+        self.f.write(b")\n")
+
+
+def foam_header(cls, obj, binary, label_bits, note=None):
+    fmt = "binary" if binary else "ascii"
+    lines = [
+        FOAM_BANNER,
+        "FoamFile\n{\n",
+        "    version     2.0;\n",
+        f"    format      {fmt};\n",
+    ]
+    if binary:
+        lines.append(f'    arch        "LSB;label={label_bits};scalar=64";\n')
+    lines.append(f"    class       {cls};\n")
+    if note:
+        lines.append(f'    note        "{note}";\n')
+    lines.append('    location    "constant/polyMesh";\n')
+    lines.append(f"    object      {obj};\n}}\n")
+    lines.append("// * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * //\n")
+    return "".join(lines).encode("ascii")
+
+
+FOAM_FOOTER = b"\n\n// ************************************************************************* //\n"
+
+
+class _Grid:
+    def __init__(self, cells):
+        nx, ny, nz = cells
+        self.n = cells
+        self.point_strides = (1, nx + 1, (nx + 1) * (ny + 1))
+        self.cell_strides = (1, nx, nx * ny)
+
+    def point(self, ijk):
+        s = self.point_strides
+        return ijk[0] * s[0] + ijk[1] * s[1] + ijk[2] * s[2]
+
+    def cell(self, ijk):
+        s = self.cell_strides
+        return ijk[0] * s[0] + ijk[1] * s[1] + ijk[2] * s[2]
+
+
+class _Pattern:
+    """A label array that can be shifted by a constant with one big-integer add.
+
+    The array's bytes are read as a single integer with one lane per label;
+    adding ``offset * ones`` adds ``offset`` to every lane at C speed (the
+    lanes never overflow because all labels stay below the label maximum).
+    Building the same array from ``range`` costs a Python int per entry.
+    """
+
+    def __init__(self, data):
+        self.typecode = data.typecode
+        self.size = len(data)
+        self.nbytes = self.size * data.itemsize
+        self.value = int.from_bytes(data.tobytes(), sys.byteorder)
+        self.ones = int.from_bytes((array(data.typecode, [1]) * self.size).tobytes(), sys.byteorder)
+
+    def shifted(self, offset):
+        return array(self.typecode, (self.value + offset * self.ones).to_bytes(self.nbytes, sys.byteorder))
+
+
+def _row_arrays(grid, j, directions, typecode):
+    """(faces, owners, neighbours) of the internal faces of x-row j of the bottom cell layer."""
+    nx = grid.n[0]
+    per_cell = len(directions)
+    base_cell = grid.cell((0, j, 0))
+    base_point = grid.point((0, j, 0))
+    faces = array(typecode, [0]) * (4 * per_cell * nx)
+    owners = array(typecode, [0]) * (per_cell * nx)
+    neighbours = array(typecode, [0]) * (per_cell * nx)
+    for slot, d in enumerate(directions):
+        owners[slot::per_cell] = array(typecode, range(base_cell, base_cell + nx))
+        offset = grid.cell_strides["xyz".index(d)]
+        neighbours[slot::per_cell] = array(typecode, range(base_cell + offset, base_cell + offset + nx))
+        for c, corner in enumerate(internal_face_corners[d]):
+            start = base_point + grid.point(corner)
+            faces[4 * slot + c::4 * per_cell] = array(typecode, range(start, start + nx))
+    if directions and directions[0] == "x":
+        # The last cell of the row has no +x neighbour
+        last = (nx - 1) * per_cell
+        del owners[last]
+        del neighbours[last]
+        del faces[4 * last:4 * last + 4]
+    return faces, owners, neighbours
+
+
+def _internal_rows(grid, typecode, rows_per_block):
+    """Yield (faces, owners, neighbours) per block of x-rows, in upper triangular order.
+
+    Rows with the same set of neighbour directions only differ by a constant
+    point/cell offset, so each kind of row block is built once and shifted.
+    """
+    nx, ny, nz = grid.n
+    sp, sc = grid.point_strides, grid.cell_strides
+    patterns = {}
+
+    def pattern(has_y, has_z, rows):
+        key = (has_y, has_z, rows)
+        if key not in patterns:
+            directions = [d for d, has in (("x", nx > 1), ("y", has_y), ("z", has_z)) if has]
+            block = [array(typecode) for _ in range(3)]
+            for j in range(rows):
+                for buf, a in zip(block, _row_arrays(grid, j, directions, typecode)):
+                    buf.extend(a)
+            patterns[key] = [_Pattern(a) for a in block]
+        return patterns[key]
+
+    for k in range(nz):
+        has_z = k < nz - 1
+        j = 0
+        while j < ny:
+            # The last row of a layer has no +y neighbour
+            rows = 1 if j == ny - 1 else min(rows_per_block, ny - 1 - j)
+            faces, owners, neighbours = pattern(j < ny - 1, has_z, rows)
+            if faces.size:
+                point_offset = j * sp[1] + k * sp[2]
+                cell_offset = j * sc[1] + k * sc[2]
+                yield faces.shifted(point_offset), owners.shifted(cell_offset), neighbours.shifted(cell_offset)
+            j += rows
+
+
+def _boundary_rows(grid, face, typecode, rows_per_block):
+    """Yield (faces, owners) per block of rows of one box side, faces pointing outwards."""
+    axis, at_end, inner, outer, corners = boundary_sides[face]
+    n = grid.n
+    count = n[inner]
+    step_cell = grid.cell_strides[inner]
+    step_point = grid.point_strides[inner]
+    patterns = {}
+
+    def pattern(rows):
+        if rows not in patterns:
+            faces = array(typecode)
+            owners = array(typecode)
+            for o in range(rows):
+                ijk = [0, 0, 0]
+                ijk[axis] = n[axis] - 1 if at_end else 0
+                ijk[outer] = o
+                base_cell = grid.cell(ijk)
+                base_point = grid.point(ijk)
+                row = array(typecode, [0]) * (4 * count)
+                for c, corner in enumerate(corners):
+                    start = base_point + grid.point(corner)
+                    row[c::4] = array(typecode, range(start, start + count * step_point, step_point))
+                faces.extend(row)
+                owners.extend(array(typecode, range(base_cell, base_cell + count * step_cell, step_cell)))
+            patterns[rows] = (_Pattern(faces), _Pattern(owners))
+        return patterns[rows]
+
+    o = 0
+    while o < n[outer]:
+        rows = min(rows_per_block, n[outer] - o)
+        faces, owners = pattern(rows)
+        yield faces.shifted(o * grid.point_strides[outer]), owners.shifted(o * grid.cell_strides[outer])
+        o += rows
+
+
+def _buffered(rows, limit=CHUNK_ENTRIES):
+    # Concatenate small row blocks into chunks of roughly ``limit`` entries
+    pending = None
+    for row in rows:
+        if pending is None:
+            pending = [array(a.typecode) for a in row]
+        for buf, a in zip(pending, row):
+            buf.extend(a)
+        if len(pending[0]) >= limit:
+            yield pending
+            pending = None
+    if pending is not None:
+        yield pending
+
+
+def _ordered_boundary(grid, patches, typecode):
+    for _, _, faces, _ in patches:
+        for face in faces:
+            axis, _, inner, _, _ = boundary_sides[face]
+            rows_per_block = max(1, CHUNK_ENTRIES // (4 * grid.n[inner]))
+            yield from _boundary_rows(grid, face, typecode, rows_per_block)
+
+
+@traced("polymesh points")
+def _write_points(path, axes, scale, binary, label_bits):
+    xs, ys, zs = ([v * scale for v in axis] for axis in axes)
+    n_points = len(xs) * len(ys) * len(zs)
+    xs_array = array("d", xs)
+    xs_text = ["%.12g" % x for x in xs]
+    with open(path, "wb") as f:
+        f.write(foam_header("vectorField", "points", binary, label_bits))
+        out = ListWriter(f, binary, n_points)
+        chunk = array("d") if binary else []
+        chunk_len = 0
+        for z in zs:
+            for y in ys:
+                if binary:
+                    row = array("d", [0.0]) * (3 * len(xs))
+                    row[0::3] = xs_array
+                    row[1::3] = array("d", [y]) * len(xs)
+                    row[2::3] = array("d", [z]) * len(xs)
+                    chunk.extend(row)
+                else:
+                    suffix = " %.12g %.12g)\n" % (y, z)
+                    chunk.append("(" + (suffix + "(").join(xs_text) + suffix)
+                chunk_len += 3 * len(xs)
+                if chunk_len >= CHUNK_ENTRIES:
+                    _flush_points(f, out, chunk, binary)
+                    chunk = array("d") if binary else []
+                    chunk_len = 0
+        _flush_points(f, out, chunk, binary)
+        out.close()
+        f.write(FOAM_FOOTER)
+
+
+def _flush_points(f, out, chunk, binary):
+    if binary:
+        out.write(chunk, None)
+    else:
+        f.write("".join(chunk).encode("ascii"))
+
+
+@traced("polymesh")
+def write_polymesh(case, case_dir=".", binary=False, axes=None):
+    """Write points, faces, owner, neighbour and boundary below ``case_dir/constant/polyMesh``.
+
+    ``axes`` optionally gives the x, y and z point coordinates (before
+    scaling); by default they follow the case's grading. Returns the mesh
+    counts.
+    """
+    if wedge_axes(case["patch_names"]) is not None:
+        raise ValueError("A wedge case is not a box; write its blockMeshDict and run blockMesh instead.")
+    cells = case["cells"]
+    counts = mesh_counts(cells)
+    axes = axes or mesh_axes(case)
+    # faceCompactList offsets reach 4 * nFaces, which must fit in a label
+    label_bits = 32 if 4 * counts["faces"] <= LABEL32_MAX else 64
+    typecode = "i" if label_bits == 32 else "q"
+
+    mesh_dir = os.path.join(case_dir, "constant", "polyMesh")
+    os.makedirs(mesh_dir, exist_ok=True)
+    grid = _Grid(cells)
+    patches = boundary_patches(case["patch_names"])
+    note = "nPoints:%d  nCells:%d  nFaces:%d  nInternalFaces:%d" % (
+        counts["points"], counts["cells"], counts["faces"], counts["internal_faces"])
+
+    _write_points(os.path.join(mesh_dir, "points"), axes, case["scale"], binary, label_bits)
+
+    # faces, owner and neighbour are written side by side in one pass over the grid
+    with open(os.path.join(mesh_dir, "faces"), "wb") as ff, \
+            open(os.path.join(mesh_dir, "owner"), "wb") as fo, \
+            open(os.path.join(mesh_dir, "neighbour"), "wb") as fn:
+        ff.write(foam_header("faceCompactList" if binary else "faceList", "faces", binary, label_bits))
+        fo.write(foam_header("labelList", "owner", binary, label_bits, note))
+        fn.write(foam_header("labelList", "neighbour", binary, label_bits, note))
+
+        if binary:
+            # faceCompactList: offsets into the flat point list, then the list itself
+            offsets = ListWriter(ff, True, counts["faces"] + 1)
+            offset_pattern = _Pattern(array(typecode, range(0, 4 * CHUNK_ENTRIES, 4)))
+            written = 0
+            while written + CHUNK_ENTRIES <= counts["faces"] + 1:
+                offsets.write(offset_pattern.shifted(4 * written), None)
+                written += CHUNK_ENTRIES
+            offsets.write(array(typecode, range(4 * written, 4 * (counts["faces"] + 1), 4)), None)
+            offsets.close()
+            face_out = ListWriter(ff, True, 4 * counts["faces"])
+        else:
+            face_out = ListWriter(ff, False, counts["faces"])
+        owner_out = ListWriter(fo, binary, counts["faces"])
+        neighbour_out = ListWriter(fn, binary, counts["internal_faces"])
+
+        rows_per_block = max(1, CHUNK_ENTRIES // (4 * 3 * cells[0]))
+        for faces, owners, neighbours in _buffered(_internal_rows(grid, typecode, rows_per_block)):
+            face_out.write(faces, "4(%d %d %d %d)\n")
+            owner_out.write(owners, "%d\n")
+            neighbour_out.write(neighbours, "%d\n")
+        for faces, owners in _buffered(_ordered_boundary(grid, patches, typecode)):
+            face_out.write(faces, "4(%d %d %d %d)\n")
+            owner_out.write(owners, "%d\n")
+
+        for f, out in ((ff, face_out), (fo, owner_out), (fn, neighbour_out)):
+            out.close()
+            f.write(FOAM_FOOTER)
+
+    _write_boundary(os.path.join(mesh_dir, "boundary"), cells, patches, counts["internal_faces"])
+    return counts
+
+
+def side_face_count(cells, face):
+    axis, _, inner, outer, _ = boundary_sides[face]
+    return cells[inner] * cells[outer]
+
+
+@traced("polymesh boundary")
+def _write_boundary(path, cells, patches, start_face):
+    lines = ["\n%d\n(\n" % len(patches)]
+    for name, patch_type, faces, entries in patches:
+        n_faces = sum(side_face_count(cells, face) for face in faces)
+        lines.append(f"    {name}\n    {{\n")
+        lines.append(f"        type            {patch_type};\n")
+        if patch_type in ("wall", "empty", "wedge", "symmetryPlane", "cyclic"):
+            lines.append(f"        inGroups        1({patch_type});\n")
+        for key, value in entries:
+            lines.append(f"        {key:<16}{value};\n")
+        lines.append(f"        nFaces          {n_faces};\n")
+        lines.append(f"        startFace       {start_face};\n    }}\n")
+        start_face += n_faces
+    lines.append(")\n")
+    with open(path, "wb") as f:
+        f.write(foam_header("polyBoundaryMesh", "boundary", False, 32))
+        f.write("".join(lines).encode("ascii"))
+        f.write(FOAM_FOOTER)
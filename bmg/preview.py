@@ -0,0 +1,162 @@
+"""Projected wireframe of a box case for the GUI's preview pane.
+
+Everything here is plain geometry in canvas pixels; the GUI only moves
+canvas items to the coordinates ``preview_scene`` returns. However many
+cells the case has, only every n-th grid line is drawn, so a scene never
+has more than about MAX_LINES lines. Node positions come straight from the
+grading formula, so picking them costs nothing for a 2000-cell axis
+either.
+"""
+import math
+
+from bmg.core import face_sides, group_patch_faces, patch_faces
+from bmg.grading import node_positions
+
+# Grid lines drawn at most, over the three faces turned towards the viewer
+MAX_LINES = 300
+# Isometric view: looking down the diagonal of the box
+DEFAULT_YAW = math.radians(45)
+DEFAULT_PITCH = math.radians(35.264)
+MARGIN = 20
+
+# Fill colours given to patch names in order of appearance
+patch_colours = ["#90CAF9", "#A5D6A7", "#FFCC80", "#CE93D8", "#EF9A9A", "#80DEEA"]
+# Unnamed faces, which blockMesh puts in defaultFaces or a patch named after the type
+default_colour = "#E0E0E0"
+
+
+def rotation(yaw, pitch):
+    """Rows of the view matrix: screen right, screen up and towards the viewer."""
+    cy, sy, cp, sp = math.cos(yaw), math.sin(yaw), math.cos(pitch), math.sin(pitch)
+    return [(cy, -sy, 0.0), (sp * sy, sp * cy, cp), (-cp * sy, -cp * cy, sp)]
+
+
+def project(xs, ys, zs, matrix):
+    """Screen right and up of the points given as coordinate columns, in one pass per column."""
+    (a, b, c), (d, e, f) = matrix[0], matrix[1]
+    return ([a * x + b * y + c * z for x, y, z in zip(xs, ys, zs)],
+            [d * x + e * y + f * z for x, y, z in zip(xs, ys, zs)])
+
+
+def sampled_indices(cells, limit):
+    """Every n-th node index from 0 to ``cells``, at most ``limit`` + 1 of them, and n."""
+    step = max(1, math.ceil(cells / max(limit, 1)))
+    indices = list(range(0, cells, step))
+    indices.append(cells)
+    return indices, step
+
+
+def face_colours(patch_names):
+    """Fill colour of each face: one per patch name, grey for unnamed faces."""
+    grouped, _ = group_patch_faces(patch_names)
+    colours = {}
+    named = 0
+    for name, faces in grouped.items():
+        if any(patch_names.get(face, {}).get("name", "").strip() for face in faces):
+            colour = patch_colours[named % len(patch_colours)]
+            named += 1
+        else:
+            colour = default_colour
+        for face in faces:
+            colours[face] = colour
+    return colours
+
+
+def preview_scene(case, yaw=DEFAULT_YAW, pitch=DEFAULT_PITCH, width=320, height=320, max_lines=MAX_LINES):
+    """Canvas coordinates for a case seen from ``yaw`` and ``pitch`` (radians).
+
+    Returns {"faces": [(face, colour, polygon)], "lines": [segment],
+    "edges": [segment], "steps": [n per axis]} where faces are the
+    ones turned towards the viewer and every polygon or segment is a flat
+    [x0, y0, x1, y1, ...] list.
+    """
+    origin = case.get("origin", [0, 0, 0])
+    lengths = case["lengths"]
+    grading = case.get("grading", [1, 1, 1])
+    matrix = rotation(yaw, pitch)
+    towards = matrix[2]
+
+    # Each axis shows up on two of the three visible faces
+    per_axis = max_lines // 6
+    sampled = []
+    steps = []
+    for axis in range(3):
+        indices, step = sampled_indices(case["cells"][axis], per_axis)
+        sampled.append(node_positions(origin[axis], lengths[axis], case["cells"][axis], grading[axis], indices))
+        steps.append(step)
+    bounds = [(origin[axis], origin[axis] + lengths[axis]) for axis in range(3)]
+
+    # All 3D points first (corners, then both ends of every grid line), projected together
+    xs, ys, zs = [], [], []
+
+    def add(point):
+        xs.append(point[0])
+        ys.append(point[1])
+        zs.append(point[2])
+
+    for corner in range(8):
+        add([bounds[axis][(corner >> axis) & 1] for axis in range(3)])
+
+    visible = []
+    for face in patch_faces:
+        axis, side = face_sides[face]
+        if (1 if side else -1) * towards[axis] > 1e-9:
+            visible.append(face)
+    line_count = 0
+    for face in visible:
+        axis, side = face_sides[face]
+        for along in range(3):
+            if along == axis:
+                continue
+            across = 3 - axis - along
+            for position in sampled[along][1:-1]:
+                for end in (0, 1):
+                    point = [0.0, 0.0, 0.0]
+                    point[axis] = bounds[axis][side]
+                    point[along] = position
+                    point[across] = bounds[across][end]
+                    add(point)
+                line_count += 1
+
+    right, up = project(xs, ys, zs, matrix)
+    # Fit the projected corners into the canvas, keeping proportions
+    left, top = min(right[:8]), max(up[:8])
+    extent = max(max(right[:8]) - left, top - min(up[:8]), 1e-30)
+    scale = min(width, height) - 2 * MARGIN
+    scale /= extent
+    x_offset = (width - scale * (max(right[:8]) - left)) / 2
+    y_offset = (height - scale * (top - min(up[:8]))) / 2
+    px = [x_offset + scale * (r - left) for r in right]
+    py = [y_offset + scale * (top - u) for u in up]
+
+    def corner_of(face, a, b):
+        axis, side = face_sides[face]
+        others = [n for n in range(3) if n != axis]
+        return (side << axis) | (a << others[0]) | (b << others[1])
+
+    # The visible faces of a box never overlap, so their order only matters at shared edges
+    colours = face_colours(case["patch_names"]) if "patch_names" in case else {}
+    faces = []
+    for face in visible:
+        polygon = []
+        for a, b in ((0, 0), (1, 0), (1, 1), (0, 1)):
+            corner = corner_of(face, a, b)
+            polygon.extend((px[corner], py[corner]))
+        faces.append((face, colours.get(face, default_colour), polygon))
+
+    lines = []
+    for n in range(line_count):
+        first = 8 + 2 * n
+        lines.append([px[first], py[first], px[first + 1], py[first + 1]])
+
+    # Only the edges of visible faces; the faces are opaque
+    edges = []
+    for axis in range(3):
+        for corner in range(8):
+            if corner & (1 << axis):
+                continue
+            other = corner | (1 << axis)
+            sides = [(n, (corner >> n) & 1) for n in range(3) if n != axis]
+            if any(face_sides[face] in sides for face in visible):
+                edges.append([px[corner], py[corner], px[other], py[other]])
+    return {"faces": faces, "lines": lines, "edges": edges, "steps": steps}
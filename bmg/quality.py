@@ -0,0 +1,352 @@
+"""checkMesh-style quality metrics for axis-aligned block meshes.
+
+Every cell of an axis-aligned block is one x spacing times one y spacing
+times one z spacing, so the metrics are worked out from the geometric runs
+of graded spacings along each axis instead of from the cells themselves.
+The aspect ratio histogram is counted per distinct spacing with bisection
+over the other two axes; the longest axis, when it has more than
+SPACINGS_LIMIT cells, is never listed and is bisected run by run instead.
+Expansion ratios are constant inside a run, so each run adds one weighted
+entry. Work and memory grow with the cells along the shorter axes and the
+number of runs, so a 1e9 x 1 x 1 mesh costs about as much as a small one.
+
+Faces between rectilinear cells are perpendicular to the line joining the
+cell centres and cut it at their own centre, so non-orthogonality and
+skewness are exactly zero for these meshes; they are still reported so the
+output reads like checkMesh.
+"""
+import bisect
+import collections
+
+from bmg.grading import geometric_runs, node_positions
+from bmg.multiblock import assemble, face_sides
+
+# Histogram bin edges; the last bin is open-ended
+ASPECT_RATIO_EDGES = [1, 2, 5, 10, 100, 1000]
+EXPANSION_EDGES = [1, 1.1, 1.2, 1.3, 1.5, 2, 5]
+
+# checkMesh flags aspect ratios above 1000; growth above 1.3 is a common rule of thumb
+ASPECT_RATIO_LIMIT = 1000
+EXPANSION_LIMIT = 1.3
+
+# Axes with more cells than this are not listed cell by cell
+SPACINGS_LIMIT = 10_000
+
+
+class _Spacings:
+    """Distinct cell sizes along one axis with their counts."""
+
+    def __init__(self, runs):
+        self.sizes = [first * ratio ** i for _, n, first, ratio in runs for i in range(n)]
+        counts = collections.Counter(self.sizes)
+        self.values = sorted(counts)
+        self.cumulative = [0]
+        for value in self.values:
+            self.cumulative.append(self.cumulative[-1] + counts[value])
+        self.counts = counts
+        self.smallest, self.largest = self.values[0], self.values[-1]
+        self.first, self.last = self.sizes[0], self.sizes[-1]
+
+    def index(self, value):
+        return self.sizes.index(value)
+
+    def count_in(self, low, limit, include_low):
+        # Number of cells whose size s is >= low (or > low) with s / low < limit
+        values = self.values
+        start = (bisect.bisect_left if include_low else bisect.bisect_right)(values, low)
+        stop = bisect.bisect_left(values, limit * low)
+        # Settle rounding at the edge the same way a direct s / low comparison would
+        while stop < len(values) and values[stop] / low < limit:
+            stop += 1
+        while stop > start and values[stop - 1] / low >= limit:
+            stop -= 1
+        return self.cumulative[stop] - self.cumulative[start] if stop > start else 0
+
+    def count_cells(self, others, limit):
+        # Cells of this axis times the cells of each other axis inside [s, limit * s)
+        total = 0
+        for value in self.values:
+            count = self.counts[value]
+            for other, strict in others:
+                count *= other.count_in(value, limit, not strict)
+                if not count:
+                    break
+            total += count
+        return total
+
+
+def _first_index(n, reached):
+    # First k in 0..n with reached(k), for a test that stays true once it holds
+    low, high = 0, n
+    while low < high:
+        middle = (low + high) // 2
+        if reached(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+class _Runs:
+    """Cell sizes along one long axis, kept as geometric runs instead of a list."""
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.ends = []
+        for start, n, first, ratio in runs:
+            self.ends.append((first, start))
+            if ratio != 1:
+                self.ends.append((first * ratio ** (n - 1), start + n - 1))
+        self.smallest = min(value for value, _ in self.ends)
+        self.largest = max(value for value, _ in self.ends)
+        start, n, first, ratio = runs[-1]
+        self.first, self.last = runs[0][2], first * ratio ** (n - 1)
+
+    def index(self, value):
+        return min(index for size, index in self.ends if size == value)
+
+    def _count(self, below):
+        # Cells whose size s has below(s), a test that holds up to some size and not beyond
+        total = 0
+        for _, n, first, ratio in self.runs:
+            if ratio >= 1:
+                total += _first_index(n, lambda k: not below(first * ratio ** k))
+            else:
+                total += n - _first_index(n, lambda k: below(first * ratio ** k))
+        return total
+
+    def count_in(self, low, limit, include_low):
+        # Sizes under low always have s / low < limit, as limit >= 1
+        inside = self._count(lambda s: s / low < limit)
+        return inside - self._count((lambda s: s < low) if include_low else (lambda s: s <= low))
+
+    def count_cells(self, others, limit):
+        # Inside a run the size v grows (or shrinks) monotonically, so a size s of
+        # another axis counts from the first v with s / v < limit until v passes s.
+        # The product only changes at those indices, found by bisection.
+        total = 0
+        for _, n, first, ratio in self.runs:
+            if ratio == 1:
+                count = n
+                for other, strict in others:
+                    count *= other.count_in(first, limit, not strict)
+                total += count
+                continue
+
+            def size(k, n=n, first=first, ratio=ratio):
+                return first * ratio ** (k if ratio > 1 else n - 1 - k)
+
+            events = []
+            for axis, (other, strict) in enumerate(others):
+                for value in other.values:
+                    on = _first_index(n, lambda k: value / size(k) < limit)
+                    if strict:
+                        off = _first_index(n, lambda k: value <= size(k))
+                    else:
+                        off = _first_index(n, lambda k: value < size(k))
+                    if on < off:
+                        events.append((on, axis, other.counts[value]))
+                        events.append((off, axis, -other.counts[value]))
+            events.sort()
+            inside = [0] * len(others)
+            position = 0
+            for k, axis, change in events:
+                total += (k - position) * inside[0] * inside[1]
+                inside[axis] += change
+                position = k
+        return total
+
+
+def _aspect_ratio_below(axes, limit):
+    # Cells with max size < limit * min size. Each cell is counted once, on the
+    # first axis holding its smallest size: earlier axes must be strictly bigger.
+    total = 0
+    for a, axis in enumerate(axes):
+        total += axis.count_cells([(axes[b], b < a) for b in range(3) if b != a], limit)
+    return total
+
+
+def _histogram(edges, count_below, total):
+    bins = []
+    below = [count_below(edge) for edge in edges] + [total]
+    for i, edge in enumerate(edges):
+        high = edges[i + 1] if i + 1 < len(edges) else None
+        bins.append((edge, high, below[i + 1] - below[i]))
+    return bins
+
+
+def _worst_aspect_ratio(axes):
+    # The extreme sizes of a cell always sit on two different axes
+    worst = (1.0, 0, 0)
+    for a in range(3):
+        for b in range(3):
+            if a != b:
+                ratio = axes[a].largest / axes[b].smallest
+                if ratio > worst[0]:
+                    worst = (ratio, a, b)
+    ratio, a, b = worst
+    ijk = [0, 0, 0]
+    ijk[a] = axes[a].index(axes[a].largest)
+    ijk[b] = axes[b].index(axes[b].smallest)
+    return ratio, ijk
+
+
+def _growth(first, second):
+    return second / first if second > first else first / second
+
+
+def block_quality(block):
+    """Quality report of one block: a case or a multi-block entry with origin, lengths, cells and grading."""
+    cells = block["cells"]
+    grading = block.get("grading", [1, 1, 1])
+    runs = [geometric_runs(block["lengths"][a], cells[a], grading[a]) for a in range(3)]
+    longest = max(range(3), key=lambda a: cells[a])
+    axes = [_Runs(runs[a]) if a == longest and cells[a] > SPACINGS_LIMIT else _Spacings(runs[a])
+            for a in range(3)]
+    total = cells[0] * cells[1] * cells[2]
+
+    ratio, ratio_ijk = _worst_aspect_ratio(axes)
+    aspect = {
+        "max": ratio,
+        "worst": ratio_ijk,
+        "histogram": _histogram(ASPECT_RATIO_EDGES, lambda edge: _aspect_ratio_below(axes, edge), total),
+    }
+
+    # Neighbour pairs along each axis, each repeated over a whole layer of cells:
+    # the n - 1 pairs inside a run all grow by its ratio, plus one pair across each run boundary
+    pairs = []
+    worst = (1.0, [0, 0, 0])
+    for a in range(3):
+        layer = total // cells[a]
+        previous = None
+        for start, n, first, ratio in runs[a]:
+            found = []
+            if previous is not None:
+                found.append((_growth(previous, first), 1, start - 1))
+            if n > 1:
+                found.append((_growth(first, first * ratio), n - 1, start))
+            for growth, count, i in found:
+                pairs.append((growth, count * layer))
+                if growth > worst[0]:
+                    ijk = [0, 0, 0]
+                    ijk[a] = i
+                    worst = (growth, ijk)
+            previous = first * ratio ** (n - 1)
+    expansion = {"max": worst[0], "worst": worst[1], "pairs": pairs}
+    return {"cells": total, "aspect_ratio": aspect, "expansion": expansion, "axes": axes}
+
+
+def _expansion_histogram(pairs):
+    growths = sorted(pairs)
+    cumulative = [0]
+    for _, weight in growths:
+        cumulative.append(cumulative[-1] + weight)
+    keys = [growth for growth, _ in growths]
+    total = cumulative[-1]
+    return _histogram(EXPANSION_EDGES, lambda edge: cumulative[bisect.bisect_left(keys, edge)], total)
+
+
+def _centre(block, ijk):
+    centre = []
+    for a in range(3):
+        low, high = node_positions(block["origin"][a], block["lengths"][a], block["cells"][a],
+                                   block.get("grading", [1, 1, 1])[a], [ijk[a], ijk[a] + 1])
+        centre.append(0.5 * (low + high))
+    return centre
+
+
+def _merge_histograms(histograms):
+    merged = [list(bin_) for bin_ in histograms[0]]
+    for histogram in histograms[1:]:
+        for bin_, (_, _, count) in zip(merged, histogram):
+            bin_[2] += count
+    return [tuple(bin_) for bin_ in merged]
+
+
+def mesh_quality(blocks, interfaces=()):
+    """Quality report over ``blocks``, plus the jumps across ``interfaces``.
+
+    ``interfaces`` lists shared faces as (block, face, other block, other
+    face), as returned by ``bmg.multiblock.assemble``. Each metric has a
+    "max", a "histogram" of (low, high, count) bins (high is None for the
+    last bin) and a "worst" location with the block, the (i, j, k) cell index
+    and the cell centre.
+    """
+    reports = [block_quality(block) for block in blocks]
+    total = sum(report["cells"] for report in reports)
+
+    worst_aspect = max(range(len(reports)), key=lambda b: reports[b]["aspect_ratio"]["max"])
+    pairs = []
+    worst_growth = (1.0, 0, [0, 0, 0])
+    for b, report in enumerate(reports):
+        pairs.extend(report["expansion"]["pairs"])
+        if report["expansion"]["max"] > worst_growth[0]:
+            worst_growth = (report["expansion"]["max"], b, report["expansion"]["worst"])
+
+    for index, face, other_index, other_face in interfaces:
+        axis, side = face_sides[face]
+        a, b = (index, other_index) if side == 1 else (other_index, index)
+        last = reports[a]["axes"][axis].last
+        first = reports[b]["axes"][axis].first
+        cells = blocks[a]["cells"]
+        growth = _growth(last, first)
+        pairs.append((growth, cells[0] * cells[1] * cells[2] // cells[axis]))
+        if growth > worst_growth[0]:
+            ijk = [0, 0, 0]
+            ijk[axis] = cells[axis] - 1
+            worst_growth = (growth, a, ijk)
+
+    aspect_ijk = reports[worst_aspect]["aspect_ratio"]["worst"]
+    zero = {"max": 0.0, "histogram": [(0, None, total)], "worst": None}
+    return {
+        "cells": total,
+        "aspect_ratio": {
+            "max": reports[worst_aspect]["aspect_ratio"]["max"],
+            "histogram": _merge_histograms([report["aspect_ratio"]["histogram"] for report in reports]),
+            "worst": {"block": worst_aspect, "cell": aspect_ijk, "centre": _centre(blocks[worst_aspect], aspect_ijk)},
+        },
+        "expansion": {
+            "max": worst_growth[0],
+            "histogram": _expansion_histogram(pairs),
+            "worst": {"block": worst_growth[1], "cell": worst_growth[2],
+                      "centre": _centre(blocks[worst_growth[1]], worst_growth[2])},
+        },
+        "non_orthogonality": dict(zero),
+        "skewness": dict(zero),
+    }
+
+
+def case_quality(case):
+    """Quality report of a single-box case or a normalized multi-block topology."""
+    if "blocks" in case:
+        mesh = assemble(case)
+        return mesh_quality(case["blocks"], mesh["interfaces"])
+    return mesh_quality([case])
+
+
+def quality_warnings(report):
+    warnings = []
+    if report["aspect_ratio"]["max"] > ASPECT_RATIO_LIMIT:
+        warnings.append(f"Max aspect ratio {report['aspect_ratio']['max']:.4g} is above {ASPECT_RATIO_LIMIT}.")
+    if report["expansion"]["max"] > EXPANSION_LIMIT:
+        warnings.append(f"Max expansion ratio {report['expansion']['max']:.4g} is above {EXPANSION_LIMIT}.")
+    return warnings
+
+
+def format_report(report):
+    """Plain text report in the spirit of checkMesh."""
+    lines = [f"Cells: {report['cells']}"]
+    for key, title in (("aspect_ratio", "Aspect ratio"), ("expansion", "Expansion ratio")):
+        metric = report[key]
+        worst = metric["worst"]
+        centre = " ".join(f"{c:.6g}" for c in worst["centre"])
+        lines.append(f"{title}: max {metric['max']:.4g} at block {worst['block']} cell "
+                     f"({worst['cell'][0]} {worst['cell'][1]} {worst['cell'][2]}), centre ({centre})")
+        for low, high, count in metric["histogram"]:
+            label = f"{low:g} - {high:g}" if high is not None else f">= {low:g}"
+            lines.append(f"    {label:>12}: {count}")
+    lines.append(f"Non-orthogonality: max {report['non_orthogonality']['max']:g}")
+    lines.append(f"Skewness: max {report['skewness']['max']:g}")
+    for warning in quality_warnings(report):
+        lines.append(f"***{warning}")
+    return "\n".join(lines)
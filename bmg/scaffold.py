@@ -0,0 +1,151 @@
+"""Complete OpenFOAM case directories from a template case.
+
+Every case gets the template's files (system/, constant/, 0/, scripts...)
+with its own generated system/blockMeshDict. The template's files are
+shared rather than copied where the filesystem allows:
+
+    reflink    copy-on-write clone (btrfs, XFS, bcachefs); cases can edit freely
+    hardlink   one inode for all cases; a tool editing a file in place edits it everywhere
+    copy       a plain copy
+
+"auto" takes the first of these that works between the template and the
+output directory, found once up front by placing one probe file.
+"""
+import errno
+import os
+import re
+import shutil
+
+LINK_MODES = ["auto", "reflink", "hardlink", "copy"]
+# From linux/fs.h: clone the whole of one file into another
+FICLONE = 0x40049409
+
+# Never taken from the template: the mesh is generated, results are not input
+skipped_paths = ["system/blockMeshDict", "constant/polyMesh"]
+skipped_dir_re = re.compile(r"^(processor\d+|postProcessing|dynamicCode|[0-9.eE+-]+)$")
+
+
+def _reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src, "rb") as source, open(dst, "xb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.unlink(dst)
+            raise
+    shutil.copymode(src, dst)
+
+
+def place(src, dst, mode):
+    """Put ``src`` at ``dst`` by ``mode`` ("reflink", "hardlink" or "copy"); FileExistsError if ``dst`` exists."""
+    if mode == "reflink":
+        _reflink(src, dst)
+    elif mode == "hardlink":
+        os.link(src, dst)
+    else:
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, "File exists", dst)
+        shutil.copy2(src, dst)
+
+
+def template_files(template_dir):
+    """Relative directories and files of a template case, leaving out meshes and results."""
+    dirs = []
+    files = []
+    for root, subdirs, names in os.walk(template_dir):
+        rel_root = os.path.relpath(root, template_dir)
+        rel_root = "" if rel_root == "." else rel_root
+        kept = []
+        for subdir in sorted(subdirs):
+            rel = os.path.join(rel_root, subdir)
+            # Time directories other than 0 hold results; 0 holds the initial conditions
+            results = not rel_root and subdir != "0" and skipped_dir_re.match(subdir)
+            if results or rel.replace(os.sep, "/") in skipped_paths:
+                continue
+            kept.append(subdir)
+            dirs.append(rel)
+        subdirs[:] = kept
+        for name in sorted(names):
+            rel = os.path.join(rel_root, name)
+            if rel.replace(os.sep, "/") not in skipped_paths:
+                files.append(rel)
+    return dirs, files
+
+
+def resolve_link(template_dir, files, out_dir, link="auto"):
+    """The link mode that works from ``template_dir`` into ``out_dir``; ValueError if ``link`` doesn't."""
+    if link not in LINK_MODES:
+        raise ValueError(f"Unknown link mode '{link}'; expected one of {', '.join(LINK_MODES)}.")
+    os.makedirs(out_dir, exist_ok=True)
+    if not files:
+        return "copy"
+    probe = os.path.join(out_dir, f".bmg-probe-{os.getpid()}")
+    modes = LINK_MODES[1:] if link == "auto" else [link]
+    for mode in modes:
+        try:
+            place(os.path.join(template_dir, files[0]), probe, mode)
+            return mode
+        except OSError as e:
+            if link != "auto":
+                raise ValueError(f"Can't {mode} files from {template_dir} into {out_dir}: {e}")
+        finally:
+            if os.path.lexists(probe):
+                os.unlink(probe)
+    return "copy"
+
+
+def load_template(template_dir, out_dir, link="auto"):
+    """Everything a worker needs to scaffold cases from ``template_dir``, as plain data."""
+    if not os.path.isdir(template_dir):
+        raise ValueError(f"Template case {template_dir} is not a directory.")
+    template_dir = os.path.abspath(template_dir)
+    dirs, files = template_files(template_dir)
+    return {"root": template_dir, "dirs": dirs, "files": files,
+            "link": resolve_link(template_dir, files, out_dir, link)}
+
+
+def unshare(path):
+    """Remove ``path`` if it is a hard link, so that writing it can't change other cases."""
+    try:
+        if os.lstat(path).st_nlink > 1:
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def scaffold_case(case_dir, template, skip=()):
+    """Create ``case_dir`` with the template's directories and files, plus system/.
+
+    Files already in the case are left alone, so scaffolding again only
+    fills in what is missing. Paths in ``skip`` (relative, with "/") are
+    left out because the caller writes them itself. Returns how many files
+    were placed.
+    """
+    os.makedirs(case_dir, exist_ok=True)
+    # Parents come before their children, so one mkdir each will do
+    for rel in ["system"] + template["dirs"]:
+        try:
+            os.mkdir(os.path.join(case_dir, rel))
+        except FileExistsError:
+            pass
+    placed = 0
+    for rel in template["files"]:
+        if rel.replace(os.sep, "/") in skip:
+            continue
+        src = os.path.join(template["root"], rel)
+        dst = os.path.join(case_dir, rel)
+        try:
+            place(src, dst, template["link"])
+        except FileExistsError:
+            continue
+        except OSError:
+            # The probe worked, so this is a one-off (a file on another device, a link limit...)
+            if template["link"] == "copy":
+                raise
+            shutil.copy2(src, dst)
+        placed += 1
+    return placed
@@ -0,0 +1,361 @@
+"""Local generation service: ``python -m bmg serve``.
+
+A small HTTP/1.1 server on asyncio, listening on a TCP port or a Unix
+socket, so callers pay for one long-lived process instead of one per
+request. Every POST takes a case as JSON, in either form that manifests
+accept (the GUI's flat fields or origin / lengths / cells), or a
+multi-block case:
+
+    POST /dict       the blockMeshDict text
+    POST /quality    the mesh quality report (worker process)
+    POST /cost       the size and cost estimate
+    POST /polymesh   {"case": ..., "case_dir": ..., "format": "binary"} writes
+                     constant/polyMesh on this machine (worker process)
+    GET  /stats      request, cache and latency counters
+    GET  /health
+
+Cases are normalized before anything else, so requests that mean the same
+thing share work: a request identical to one still in flight waits for
+that one's result instead of starting its own, and finished results are
+kept, already encoded, in an LRU cache. polyMesh writes are coalesced but
+never cached, since the files they write may have changed since. The
+service writes files wherever it is told, so it only listens on localhost
+unless given another host.
+"""
+import asyncio
+import collections
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bmg.sweep import case_hash
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Rendered results kept, by count and by total size of their bodies
+CACHE_ENTRIES = 1024
+CACHE_BYTES = 256 * 2 ** 20
+
+MAX_BODY_BYTES = 16 * 2 ** 20
+# Latencies kept for the percentiles in /stats, and the window of the recent rate
+LATENCY_SAMPLES = 10000
+RATE_WINDOW = 10.0
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def load_case(raw):
+    """Normalize (and validate) a single or multi-block case from a request."""
+    from bmg.core import normalize_case, validate_case
+    from bmg.multiblock import normalize_multiblock
+
+    if not isinstance(raw, dict):
+        raise ValueError("The case must be a JSON object.")
+    if "blocks" in raw:
+        return normalize_multiblock(raw)
+    case = normalize_case(raw)
+    validate_case(case)
+    return case
+
+
+def render_job(case):
+    from bmg.core import render_dict
+    from bmg.multiblock import render_multiblock
+
+    return render_multiblock(case) if "blocks" in case else render_dict(case)
+
+
+def quality_job(case):
+    from bmg.quality import case_quality, quality_warnings
+
+    report = case_quality(case)
+    report["warnings"] = quality_warnings(report)
+    return report
+
+
+def cost_job(case):
+    from bmg.cost import cost_warnings, estimate_cost, load_calibration, multiblock_counts
+    from bmg.multiblock import assemble
+    from bmg.polymesh import mesh_axes, mesh_counts
+
+    calibration = load_calibration()
+    if "blocks" in case:
+        counts = multiblock_counts(case["blocks"], assemble(case))
+        estimate = estimate_cost(counts, calibration)
+    else:
+        estimate = estimate_cost(mesh_counts(case["cells"]), calibration, mesh_axes(case), case["scale"])
+    estimate["warnings"] = cost_warnings(estimate)
+    return estimate
+
+
+def polymesh_job(case, case_dir, binary):
+    from bmg.polymesh import write_polymesh
+
+    if "blocks" in case:
+        raise ValueError("polyMesh can only be written for single-block cases.")
+    counts = write_polymesh(case, case_dir, binary=binary)
+    counts["case_dir"] = case_dir
+    return counts
+
+
+def _polymesh_args(raw):
+    if not isinstance(raw, dict) or "case" not in raw or not raw.get("case_dir"):
+        raise ValueError("Send {\"case\": ..., \"case_dir\": ...} to write a polyMesh.")
+    if raw.get("format", "binary") not in ("ascii", "binary"):
+        raise ValueError("The format must be 'ascii' or 'binary'.")
+    return load_case(raw["case"]), os.path.abspath(raw["case_dir"]), raw.get("format", "binary") == "binary"
+
+
+# Path -> (job, argument parser, runs in a worker process, cacheable)
+ENDPOINTS = {
+    "/dict": (render_job, lambda raw: (load_case(raw),), False, True),
+    "/quality": (quality_job, lambda raw: (load_case(raw),), True, True),
+    "/cost": (cost_job, lambda raw: (load_case(raw),), False, True),
+    "/polymesh": (polymesh_job, _polymesh_args, True, False),
+}
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return "text/plain; charset=utf-8", value.encode("utf-8")
+    return "application/json", json.dumps(value).encode("utf-8")
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Service:
+    """Request handling, coalescing, caching and counters for one server."""
+
+    def __init__(self, workers=None, cache_entries=CACHE_ENTRIES, cache_bytes=CACHE_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.cache = collections.OrderedDict()
+        self.cache_entries = cache_entries
+        self.cache_bytes = cache_bytes
+        self.cached_bytes = 0
+        self.in_flight = {}
+        self.counts = collections.Counter()
+        self.by_endpoint = collections.Counter()
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.finished = collections.deque()
+        self.started = time.monotonic()
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+
+    def _remember(self, key, response):
+        size = len(response[1])
+        if size > self.cache_bytes:
+            return
+        self.cache[key] = response
+        self.cached_bytes += size
+        while len(self.cache) > self.cache_entries or self.cached_bytes > self.cache_bytes:
+            _, (_, old) = self.cache.popitem(last=False)
+            self.cached_bytes -= len(old)
+
+    async def _run(self, job, args, pooled):
+        if not pooled:
+            return job(*args)
+        if self.pool is None:
+            # Started on first use so that serving plain dicts never forks
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, job, *args)
+
+    async def result(self, path, raw):
+        """(content type, body) for a POST to ``path``; raises ValueError for bad cases."""
+        job, parse, pooled, cacheable = ENDPOINTS[path]
+        args = parse(raw)
+        key = (path, case_hash(args))
+        if cacheable and key in self.cache:
+            self.counts["cache_hits"] += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        if key in self.in_flight:
+            self.counts["coalesced"] += 1
+            error, response = await asyncio.shield(self.in_flight[key])
+        else:
+            if cacheable:
+                self.counts["cache_misses"] += 1
+            # Waiters get (error, response) so a failure is raised in each of them
+            future = asyncio.get_running_loop().create_future()
+            self.in_flight[key] = future
+            try:
+                response = _encode(await self._run(job, args, pooled))
+                error = None
+                if cacheable:
+                    self._remember(key, response)
+            except Exception as e:
+                response = None
+                error = e
+            finally:
+                del self.in_flight[key]
+            future.set_result((error, response))
+        if error:
+            raise error
+        return response
+
+    def stats(self):
+        now = time.monotonic()
+        while self.finished and self.finished[0] < now - RATE_WINDOW:
+            self.finished.popleft()
+        uptime = now - self.started
+        ordered = sorted(self.latencies)
+        return {
+            "uptime_s": uptime,
+            "requests": self.counts["requests"],
+            "errors": self.counts["errors"],
+            "by_endpoint": dict(self.by_endpoint),
+            "in_flight": len(self.in_flight),
+            "coalesced": self.counts["coalesced"],
+            "cache": {"entries": len(self.cache), "bytes": self.cached_bytes,
+                      "hits": self.counts["cache_hits"], "misses": self.counts["cache_misses"]},
+            "throughput_rps": {"overall": self.counts["requests"] / uptime if uptime else 0.0,
+                               "recent": len(self.finished) / min(RATE_WINDOW, uptime) if uptime else 0.0},
+            "latency_ms": {"p50": 1000 * _percentile(ordered, 0.5), "p95": 1000 * _percentile(ordered, 0.95),
+                           "p99": 1000 * _percentile(ordered, 0.99), "max": 1000 * (ordered[-1] if ordered else 0.0)},
+            "workers": self.workers,
+        }
+
+    async def respond(self, method, path, body):
+        if path == "/stats" or path == "/health":
+            if method != "GET":
+                raise HTTPError(405, f"Use GET for {path}.")
+            return _encode(self.stats() if path == "/stats" else {"ok": True})
+        if path not in ENDPOINTS:
+            raise HTTPError(404, f"No endpoint {path}.")
+        if method != "POST":
+            raise HTTPError(405, f"Use POST for {path}.")
+        try:
+            raw = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "The request body is not valid JSON.")
+        return await self.result(path, raw)
+
+    def record(self, path, status, elapsed):
+        self.counts["requests"] += 1
+        self.by_endpoint[path] += 1
+        if status != 200:
+            self.counts["errors"] += 1
+        self.latencies.append(elapsed)
+        self.finished.append(time.monotonic())
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    write_response(writer, e.status, *_encode({"error": str(e)}), False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body, keep_alive = request
+                start = time.perf_counter()
+                try:
+                    status = 200
+                    content_type, data = await self.respond(method, path, body)
+                except HTTPError as e:
+                    status = e.status
+                    content_type, data = _encode({"error": str(e)})
+                except ValueError as e:
+                    status = 400
+                    content_type, data = _encode({"error": str(e)})
+                except Exception as e:
+                    status = 500
+                    content_type, data = _encode({"error": f"{type(e).__name__}: {e}"})
+                write_response(writer, status, content_type, data, keep_alive)
+                await writer.drain()
+                self.record(path, status, time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def read_request(reader):
+    """(method, path, headers, body, keep_alive), or None once the client has closed."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line.")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Bad Content-Length.")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"Request bodies are limited to {MAX_BODY_BYTES} bytes.")
+    body = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+    return method.upper(), target.split("?", 1)[0], headers, body, keep_alive
+
+
+def write_response(writer, status, content_type, data, keep_alive):
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + data)
+
+
+async def _serve(service, host, port, unix_path, ready):
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle, path=unix_path)
+        address = f"unix:{unix_path}"
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        address = "http://%s:%d" % server.sockets[0].getsockname()[:2]
+    if ready:
+        ready(address)
+    try:
+        # Stop cleanly on SIGTERM too, as service managers and CI send it
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    async with server:
+        try:
+            await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, workers=None,
+          cache_entries=CACHE_ENTRIES, ready=None):
+    """Run the service until interrupted; ``ready`` is called with its address once listening."""
+    service = Service(workers, cache_entries)
+    try:
+        asyncio.run(_serve(service, host, port, unix_path, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        if unix_path and os.path.exists(unix_path):
+            os.remove(unix_path)
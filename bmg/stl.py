@@ -0,0 +1,218 @@
+"""Bounding boxes of STL surfaces, for sizing snappyHexMesh background meshes.
+
+Binary STLs are memory-mapped and never walked triangle by triangle. With
+NumPy installed the triangle records are viewed in place as a structured
+array and reduced in one call. Without it, every vertex coordinate column
+is pulled out of a block of records with four strided byte slices (one per
+byte of the float), reinterpreted as floats and reduced with min() and
+max(); blocks are spread over worker processes for large files. ASCII STLs
+are streamed a block of lines at a time.
+"""
+import contextlib
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+HEADER_BYTES = 80
+RECORD_BYTES = 50
+# Byte offset of the first vertex in a record, after the facet normal
+VERTEX_OFFSET = 12
+
+# Triangles reduced at a time, and files worth spreading over worker processes
+CHUNK_TRIANGLES = 1 << 20
+PARALLEL_TRIANGLES = 8 * CHUNK_TRIANGLES
+
+# Bytes of an ASCII STL scanned at a time
+ASCII_BLOCK_BYTES = 64 * 2 ** 20
+
+VERTEX_RE = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+
+# Default padding around the geometry, as a fraction of its extent on each side
+DEFAULT_PADDING = 0.1
+
+
+def _map(path):
+    # Read-only map of the file, to be used in a with statement so it gets closed;
+    # empty files can't be mapped and read as b""
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return contextlib.nullcontext(b"")
+
+
+def triangle_count(buf):
+    """Triangles of a binary STL, or None if ``buf`` is not one.
+
+    Some exporters start binary headers with "solid" too, so the file size
+    decides rather than the first word.
+    """
+    if len(buf) < HEADER_BYTES + 4:
+        return None
+    count = struct.unpack_from("<I", buf, HEADER_BYTES)[0]
+    if len(buf) != HEADER_BYTES + 4 + RECORD_BYTES * count:
+        return None
+    return count
+
+
+def _merge(bounds, other):
+    if bounds is None:
+        return other
+    if other is None:
+        return bounds
+    return ([min(a, b) for a, b in zip(bounds[0], other[0])],
+            [max(a, b) for a, b in zip(bounds[1], other[1])])
+
+
+def _column(block, offset, count):
+    # Little-endian floats at ``offset`` of every record, as a memoryview of floats
+    column = bytearray(4 * count)
+    for byte in range(4):
+        column[byte::4] = block[offset + byte::RECORD_BYTES]
+    values = array("f")
+    values.frombytes(column)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return memoryview(values)
+
+
+def _block_bounds(block, count):
+    low = []
+    high = []
+    for axis in range(3):
+        lo = math.inf
+        hi = -math.inf
+        for vertex in range(3):
+            values = _column(block, VERTEX_OFFSET + 12 * vertex + 4 * axis, count)
+            lo = min(lo, min(values))
+            hi = max(hi, max(values))
+        low.append(lo)
+        high.append(hi)
+    return low, high
+
+
+def _chunk_bounds(path, first, count):
+    # Bounds of triangles first .. first + count - 1, in blocks of CHUNK_TRIANGLES
+    bounds = None
+    start = HEADER_BYTES + 4 + RECORD_BYTES * first
+    end = start + RECORD_BYTES * count
+    with _map(path) as buf:
+        while start < end:
+            stop = min(end, start + RECORD_BYTES * CHUNK_TRIANGLES)
+            bounds = _merge(bounds, _block_bounds(buf[start:stop], (stop - start) // RECORD_BYTES))
+            start = stop
+    return bounds
+
+
+def _numpy_bounds(buf, count):
+    import numpy
+
+    record = numpy.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+    vertices = numpy.frombuffer(buf, dtype=record, count=count, offset=HEADER_BYTES + 4)["vertices"]
+    return vertices.min(axis=(0, 1)).tolist(), vertices.max(axis=(0, 1)).tolist()
+
+
+def binary_bounds(path, count, workers=None):
+    """(low, high) corners of the ``count`` triangles of a binary STL."""
+    if not count:
+        return None
+    try:
+        # The arrays over the map are gone once _numpy_bounds returns, so it can be closed
+        with _map(path) as view:
+            return _numpy_bounds(view, count)
+    except ImportError:
+        pass
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or count < PARALLEL_TRIANGLES:
+        return _chunk_bounds(path, 0, count)
+    step = -(-count // workers)
+    bounds = None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_chunk_bounds, path, first, min(step, count - first))
+                   for first in range(0, count, step)]
+        for future in futures:
+            bounds = _merge(bounds, future.result())
+    return bounds
+
+
+def ascii_bounds(buf):
+    """(low, high) corners of the vertices of an ASCII STL, or None if it has none."""
+    bounds = None
+    start = 0
+    while start < len(buf):
+        # Blocks end on a line break so no vertex line is split
+        stop = buf.find(b"\n", min(len(buf), start + ASCII_BLOCK_BYTES))
+        stop = len(buf) if stop < 0 else stop + 1
+        found = VERTEX_RE.findall(buf, start, stop)
+        start = stop
+        if not found:
+            continue
+        try:
+            columns = [list(map(float, column)) for column in zip(*found)]
+        except ValueError:
+            raise ValueError("Unreadable vertex coordinates in ASCII STL.")
+        bounds = _merge(bounds, ([min(c) for c in columns], [max(c) for c in columns]))
+    return bounds
+
+
+def stl_bounds(paths, workers=None):
+    """Combined (low, high) corners of one or more STL files.
+
+    Raises ValueError if a file holds no triangles or isn't an STL.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    bounds = None
+    for path in paths:
+        with _map(path) as buf:
+            count = triangle_count(buf)
+            if count is not None:
+                found = binary_bounds(path, count, workers)
+            elif buf[:5].lower() == b"solid":
+                found = ascii_bounds(buf)
+            else:
+                raise ValueError(f"{os.path.basename(path)} is not an STL file.")
+        if found is None:
+            raise ValueError(f"{os.path.basename(path)} has no triangles.")
+        bounds = _merge(bounds, found)
+    if bounds is None:
+        raise ValueError("No STL files given.")
+    return bounds
+
+
+def pad_bounds(bounds, padding=DEFAULT_PADDING, distance=0.0):
+    """Grow ``bounds`` on each side by ``padding`` times its extent plus ``distance``.
+
+    Flat geometry (zero extent along an axis) is padded by the largest extent instead.
+    """
+    low, high = bounds
+    extents = [h - l for l, h in zip(low, high)]
+    largest = max(extents)
+    margins = [padding * (e if e > 0 else largest) + distance for e in extents]
+    return [l - m for l, m in zip(low, margins)], [h + m for h, m in zip(high, margins)]
+
+
+def background_box(bounds, cell_size=None):
+    """Origin, lengths and (given ``cell_size``) cells of a box around ``bounds``.
+
+    With a cell size the lengths are grown, about the same centre, to a whole
+    number of cells so the background cells come out cubic.
+    """
+    low, high = bounds
+    lengths = [h - l for l, h in zip(low, high)]
+    if min(lengths) <= 0:
+        raise ValueError("The box has zero length along an axis; add some padding.")
+    box = {"origin": list(low), "lengths": lengths}
+    if cell_size is not None:
+        if cell_size <= 0:
+            raise ValueError("The cell size must be positive.")
+        cells = [max(1, math.ceil(length / cell_size - 1e-9)) for length in lengths]
+        box["origin"] = [l - (n * cell_size - length) / 2 for l, n, length in zip(low, cells, lengths)]
+        box["lengths"] = [n * cell_size for n in cells]
+        box["cells"] = cells
+    return box
@@ -0,0 +1,252 @@
+"""Parametric sweeps with incremental, content-hash-based regeneration.
+
+A sweep spec is a base case plus a set of swept parameters::
+
+    {
+        "base": {"origin": [0, 0, 0], "lengths": [1, 1, 1], "cells": [20, 20, 20], "scale": "mm"},
+        "sweep": {"cells_x": "20..400:20", "length_x": [1.0, 2.0, 4.0]},
+        "name": "cx{cells_x}_lx{length_x}"
+    }
+
+Swept values are a list, a scalar, a ``"start..stop:step"`` string or a
+``{"start", "stop", "step"}`` object (stop is inclusive). Cases are expanded
+lazily as the cartesian product of all swept parameters.
+"""
+import hashlib
+import itertools
+import json
+import os
+import string
+
+from bmg.batch import case_name, dict_dir, run_batch
+from bmg.core import normalize_case
+from bmg.grading import apply_first_cell_many
+from bmg.trace import traced
+
+INDEX_FILE = ".bmg-index.json"
+# Cases whose first_cell targets are solved together
+SOLVE_CHUNK = 10_000
+
+# Swept parameter -> (key in the structured case, component)
+sweep_params = {
+    "xmin": ("origin", 0), "ymin": ("origin", 1), "zmin": ("origin", 2),
+    "length_x": ("lengths", 0), "length_y": ("lengths", 1), "length_z": ("lengths", 2),
+    "cells_x": ("cells", 0), "cells_y": ("cells", 1), "cells_z": ("cells", 2),
+    "scale": ("scale", None),
+    "patch_names": ("patch_names", None),
+}
+
+
+def expand_range(spec):
+    """Return the values of one swept parameter as a list."""
+    if isinstance(spec, str) and ".." in spec:
+        bounds, _, step = spec.partition(":")
+        start, _, stop = bounds.partition("..")
+        spec = {"start": start, "stop": stop, "step": step or "1"}
+    if isinstance(spec, dict):
+        start, stop, step = spec["start"], spec["stop"], spec.get("step", 1)
+        numbers = [str(start), str(stop), str(step)]
+        if all(n.lstrip("-").isdigit() for n in numbers):
+            start, stop, step = int(start), int(stop), int(step)
+            if step == 0:
+                raise ValueError("Sweep step cannot be zero.")
+            return list(range(start, stop + (1 if step > 0 else -1), step))
+        start, stop, step = float(start), float(stop), float(step)
+        if step == 0:
+            raise ValueError("Sweep step cannot be zero.")
+        # Index-based so that rounding errors don't accumulate or drop the end point
+        count = int((stop - start) / step + 1e-9) + 1
+        return [round(start + i * step, 12) for i in range(max(count, 0))]
+    if isinstance(spec, list):
+        return spec
+    return [spec]
+
+
+def sweep_size(spec):
+    size = 1
+    for values in spec.get("sweep", {}).values():
+        size *= len(expand_range(values))
+    return size
+
+
+def default_name(params):
+    return "_".join(f"{key}-{value}" for key, value in params.items() if key != "patch_names") or "case"
+
+
+def apply_params(base, params):
+    raw = json.loads(json.dumps(base))
+    raw.setdefault("origin", [0, 0, 0])
+    for key, value in params.items():
+        target, component = sweep_params[key]
+        if component is None:
+            raw[target] = value
+        else:
+            raw[target] = list(raw[target])
+            raw[target][component] = value
+    return raw
+
+
+def check_name_template(template, keys):
+    # Every placeholder has to be a swept parameter or {index}
+    for _, field, _, _ in string.Formatter().parse(template):
+        if field is None:
+            continue
+        key = field.split(".")[0].split("[")[0]
+        if key not in keys and key != "index":
+            raise ValueError(f"Name template '{template}' uses '{{{field}}}', which is not a swept parameter "
+                             f"or index.")
+
+
+def expand_sweep(spec):
+    """Lazily yield raw cases (with a "name") for every point of the sweep.
+
+    The spec is checked up front; ValueError for an unknown parameter or a
+    name template placeholder that isn't one of the swept parameters.
+    """
+    sweep = spec.get("sweep", {})
+    for key in sweep:
+        if key not in sweep_params:
+            raise ValueError(f"Cannot sweep '{key}'; expected one of {', '.join(sweep_params)}.")
+    keys = list(sweep)
+    axes = [expand_range(sweep[key]) for key in keys]
+    template = spec.get("name")
+    if template:
+        check_name_template(template, keys)
+    return _expanded(spec.get("base", {}), keys, axes, template)
+
+
+def _expanded(base, keys, axes, template):
+    for index, values in enumerate(itertools.product(*axes)):
+        params = dict(zip(keys, values))
+        raw = apply_params(base, params)
+        if template:
+            raw["name"] = template.format(index=index, **params)
+        else:
+            raw["name"] = default_name(params)
+        yield raw
+
+
+@traced("first cell")
+def solve_first_cells(raws):
+    """``raws`` with every first_cell replaced by the cells and grading it gives, all solved at once.
+
+    Entries that don't normalise are left alone, and if any target is bad
+    none are touched, so each case reports its own error later.
+    """
+    pending = []
+    for raw in raws:
+        if raw.get("first_cell"):
+            try:
+                pending.append((raw, normalize_case(dict(raw, first_cell=None))))
+            except ValueError:
+                continue
+    try:
+        apply_first_cell_many([(case, raw["first_cell"]) for raw, case in pending])
+    except (KeyError, TypeError, ValueError):
+        return raws
+    for raw, case in pending:
+        del raw["first_cell"]
+        raw["cells"] = case["cells"]
+        raw["grading"] = case["grading"]
+    return raws
+
+
+def solved_sweep(cases):
+    # Solves first_cell a chunk at a time so that the sweep stays lazy
+    while True:
+        chunk = list(itertools.islice(cases, SOLVE_CHUNK))
+        if not chunk:
+            return
+        yield from solve_first_cells(chunk)
+
+
+@traced("hash")
+def case_hash(case):
+    # Hash of the canonical (normalised) inputs; equal hashes render identical dicts
+    canonical = json.dumps(case, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Inputs outside the case itself that batch.generate_case reads from an entry
+decomposition_keys = ["processors", "nodes", "decomposition_method"]
+
+
+def case_inputs(raw, template=None):
+    """Everything that decides what is written for one sweep case, for hashing."""
+    inputs = {"case": normalize_case(raw), "decomposition": {key: raw.get(key) for key in decomposition_keys}}
+    if template:
+        inputs["template"] = {key: template[key] for key in ("root", "link", "dirs", "files")}
+    return inputs
+
+
+def load_index(out_dir):
+    path = os.path.join(out_dir, INDEX_FILE)
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("cases", {})
+    except (OSError, ValueError):
+        return {}
+
+
+@traced("save index")
+def save_index(out_dir, index):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, INDEX_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": 1, "cases": index}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def run_sweep(spec, out_dir, workers=None, force=False, template=None):
+    """Generate the sweep below ``out_dir``, rewriting only cases whose inputs changed.
+
+    The inputs are the case, its decomposition settings and, with
+    ``template``, which template files are placed and how (case_inputs).
+    Returns a dict with "written", "unchanged" and "failed" counts plus the
+    list of (name, error) failures. Unchanged cases are not touched, so their
+    mtimes stay put and make/Snakemake don't rerun blockMesh for them.
+    ``template`` scaffolds complete cases as in ``run_batch``.
+    """
+    cases = solved_sweep(expand_sweep(spec))
+    index = load_index(out_dir)
+    hashes = {}
+    seen = set()
+    summary = {"written": 0, "unchanged": 0, "failed": 0, "errors": []}
+
+    def changed_cases():
+        for raw in cases:
+            name = raw["name"]
+            # Two cases with one name would write over each other
+            if name in seen:
+                summary["failed"] += 1
+                summary["errors"].append((name, f"Duplicate case name '{name}'; the name template must tell "
+                                                f"every case apart."))
+                continue
+            seen.add(name)
+            try:
+                case_name(raw, 0)
+                digest = case_hash(case_inputs(raw, template))
+            except ValueError as e:
+                summary["failed"] += 1
+                summary["errors"].append((name, str(e)))
+                continue
+            path = os.path.join(dict_dir(out_dir, name, template), "blockMeshDict")
+            if not force and index.get(name) == digest and os.path.exists(path):
+                summary["unchanged"] += 1
+                continue
+            hashes[name] = digest
+            yield raw
+
+    try:
+        for _, name, path, error in run_batch(changed_cases(), out_dir, workers=workers, template=template):
+            if error:
+                summary["failed"] += 1
+                summary["errors"].append((name, error))
+                index.pop(name, None)
+            else:
+                summary["written"] += 1
+                index[name] = hashes.pop(name)
+    finally:
+        save_index(out_dir, index)
+    return summary
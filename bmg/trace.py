@@ -0,0 +1,199 @@
+"""Named timing spans and counters: ``python -m bmg --profile ...``.
+
+Stages are marked with ``@traced("name")`` or ``with span("name"):`` and
+counted with ``count("name", n)``. Tracing is off unless ``enable()`` has
+been called, and then all a span costs is the check of one flag and a
+shared do-nothing context manager.
+
+When on, every span adds to a per-name total and, up to MAX_EVENTS, is kept
+as an event for ``write_chrome_trace``, whose output loads in
+chrome://tracing or https://ui.perfetto.dev. Worker processes hand their
+spans back with ``collect()`` and the parent adds them with ``merge()``.
+"""
+import collections
+import functools
+import os
+import threading
+import time
+
+# Events kept for the trace file; the summary counts every span regardless
+MAX_EVENTS = 1_000_000
+
+_enabled = False
+_started = 0
+_events = []
+_dropped = 0
+# name -> [calls, total ns, max ns]
+_stats = {}
+_counters = collections.Counter()
+_lock = threading.Lock()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+
+def _record(name, start, duration, args):
+    global _dropped
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            _stats[name] = [1, duration, duration]
+        else:
+            stat[0] += 1
+            stat[1] += duration
+            if duration > stat[2]:
+                stat[2] = duration
+        if len(_events) < MAX_EVENTS:
+            _events.append((name, start, duration, os.getpid(), threading.get_ident(), args))
+        else:
+            _dropped += 1
+
+
+def enable():
+    global _enabled, _started
+    if not _enabled:
+        _started = time.perf_counter_ns()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    global _dropped, _started
+    with _lock:
+        _events.clear()
+        _stats.clear()
+        _counters.clear()
+        _dropped = 0
+        _started = time.perf_counter_ns()
+
+
+def span(name, **args):
+    """Context manager timing the stage ``name``; ``args`` end up in the trace file."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args or None)
+
+
+def traced(name):
+    """Decorator timing every call of a function as the stage ``name``."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter_ns() - start, None)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    if _enabled:
+        _counters[name] += n
+
+
+def collect():
+    """Everything recorded so far as plain data, and start afresh (for worker processes)."""
+    global _dropped
+    with _lock:
+        snapshot = {"events": list(_events), "stats": {k: list(v) for k, v in _stats.items()},
+                    "counters": dict(_counters), "dropped": _dropped}
+        _events.clear()
+        _stats.clear()
+        _counters.clear()
+        _dropped = 0
+    return snapshot
+
+
+def merge(snapshot):
+    """Add a ``collect()`` snapshot from another process."""
+    global _dropped
+    with _lock:
+        for name, (calls, total, longest) in snapshot["stats"].items():
+            stat = _stats.setdefault(name, [0, 0, 0])
+            stat[0] += calls
+            stat[1] += total
+            stat[2] = max(stat[2], longest)
+        room = max(0, MAX_EVENTS - len(_events))
+        _events.extend(snapshot["events"][:room])
+        _dropped += snapshot["dropped"] + max(0, len(snapshot["events"]) - room)
+        _counters.update(snapshot["counters"])
+
+
+def summary():
+    """Rows of (name, calls, total s, mean ms, max ms), most total time first."""
+    rows = [(name, calls, total / 1e9, total / calls / 1e6, longest / 1e6)
+            for name, (calls, total, longest) in _stats.items()]
+    rows.sort(key=lambda row: -row[2])
+    return rows
+
+
+def format_summary():
+    wall = (time.perf_counter_ns() - _started) / 1e9
+    lines = [f"{'stage':<22} {'calls':>9} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'% wall':>7}"]
+    for name, calls, total, mean, longest in summary():
+        # Spans from worker processes overlap, so the share of wall time can pass 100%
+        lines.append(f"{name:<22} {calls:>9,} {total:>9.3f} {mean:>9.3f} {longest:>9.3f} "
+                     f"{100 * total / wall if wall else 0:>6.1f}%")
+    lines.append(f"wall time {wall:.3f} s")
+    for name, value in sorted(_counters.items()):
+        lines.append(f"{name:<22} {value:>9,}")
+    if _dropped:
+        lines.append(f"{_dropped:,} spans left out of the trace file (MAX_EVENTS is {MAX_EVENTS:,})")
+    return "\n".join(lines)
+
+
+def write_chrome_trace(path):
+    """Write the recorded spans and counters in the Chrome trace event format."""
+    import json
+
+    events = []
+    for name, start, duration, pid, tid, args in _events:
+        event = {"name": name, "cat": "bmg", "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+                 "pid": pid, "tid": tid}
+        if args:
+            event["args"] = args
+        events.append(event)
+    if _counters:
+        events.append({"name": "counters", "ph": "C", "ts": time.perf_counter_ns() / 1000,
+                       "pid": os.getpid(), "tid": threading.get_ident(), "args": dict(_counters)})
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,261 @@
+"""Dependency-tracked, memoised validation of the GUI's input fields.
+
+Inputs are the raw field strings (and the patch_names dict). Rules are
+named values computed from inputs or other rules, each either a value or a
+ValueError message. A rule is only recomputed when one of its inputs has
+changed since it was last asked for, so a keystroke in "Cells in X" costs
+re-parsing that one field and the handful of values built on it, however
+many other fields the form has::
+
+    validator = box_validator()
+    changed = validator.set("cells_x", "2000")   # rules now out of date
+    validator.error("cells x")                   # message for that field, or None
+    validator.get("case")                        # raises ValueError with the first problem
+
+Adding a field means adding an input and the rules that read it; nothing
+else has to know.
+"""
+from bmg.core import (check_boundary, default_patch_names, field_names, grading_field_names, normalize_patch_names, patch_faces,
+                      unit_scale, validate_boundary_name)
+from bmg.grading import parse_grading, spacing_stats
+from bmg.trace import count
+
+# Inputs and what the GUI resets them to
+field_defaults = dict.fromkeys(field_names + grading_field_names, "")
+field_defaults.update({"scale_unit": "m", "custom_sign": "+", "custom_exp": "1"})
+
+# Input -> label used in messages, as on the form
+field_labels = {
+    "xmin": "Xmin", "ymin": "Ymin", "zmin": "Zmin",
+    "length_x": "Length in X", "length_y": "Length in Y", "length_z": "Length in Z",
+    "cells_x": "Cells in X direction", "cells_y": "Cells in Y direction", "cells_z": "Cells in Z direction",
+    "grading_x": "Grading in X", "grading_y": "Grading in Y", "grading_z": "Grading in Z",
+}
+
+# Rule that checks each input field
+field_rules = {
+    "xmin": "origin x", "ymin": "origin y", "zmin": "origin z",
+    "length_x": "length x", "length_y": "length y", "length_z": "length z",
+    "cells_x": "cells x", "cells_y": "cells y", "cells_z": "cells z",
+    "grading_x": "grading x", "grading_y": "grading y", "grading_z": "grading z",
+    "custom_exp": "scale",
+}
+
+_MISSING = object()
+
+
+class Validator:
+    """Inputs, rules over them and the memoised result of every rule."""
+
+    def __init__(self):
+        self.inputs = {}
+        self.rules = {}
+        # name -> rules that read it directly
+        self.dependents = {}
+        # rule -> (value or _MISSING, error message or None, True if the error is the rule's own)
+        self.results = {}
+        self.evaluations = 0
+
+    def add_input(self, name, value=""):
+        self.inputs[name] = value
+        self.dependents.setdefault(name, [])
+
+    def add_rule(self, name, deps, func):
+        """``func(*values of deps)`` gives the rule's value or raises ValueError."""
+        for dep in deps:
+            if dep not in self.inputs and dep not in self.rules:
+                raise ValueError(f"Rule '{name}' depends on unknown '{dep}'.")
+            self.dependents[dep].append(name)
+        self.rules[name] = (list(deps), func)
+        self.dependents.setdefault(name, [])
+
+    def set(self, name, value):
+        """Change an input; returns the rules that are now out of date (none if the value is the same)."""
+        if self.inputs[name] == value:
+            return []
+        self.inputs[name] = value
+        stale = []
+        pending = list(self.dependents[name])
+        while pending:
+            rule = pending.pop()
+            if rule in stale:
+                continue
+            stale.append(rule)
+            self.results.pop(rule, None)
+            pending.extend(self.dependents[rule])
+        return stale
+
+    def _evaluate(self, name):
+        if name in self.inputs:
+            return self.inputs[name], None, False
+        result = self.results.get(name)
+        if result is not None:
+            return result
+        deps, func = self.rules[name]
+        values = []
+        result = None
+        for dep in deps:
+            value, error, _ = self._evaluate(dep)
+            if error is not None:
+                result = (_MISSING, error, False)
+                break
+            values.append(value)
+        if result is None:
+            self.evaluations += 1
+            count("validations")
+            try:
+                result = (func(*values), None, False)
+            except ValueError as e:
+                result = (_MISSING, str(e), True)
+        self.results[name] = result
+        return result
+
+    def get(self, name):
+        """Value of an input or rule; ValueError with the first problem found if there is none."""
+        value, error, _ = self._evaluate(name)
+        if error is not None:
+            raise ValueError(error)
+        return value
+
+    def error(self, name):
+        """The rule's own error message, or None if it is fine or only a rule it reads has failed."""
+        _, error, own = self._evaluate(name)
+        return error if own else None
+
+
+def _number(name, positive=False):
+    label = field_labels[name]
+
+    def parse(text):
+        text = str(text).strip()
+        if not text:
+            raise ValueError(f"{label} is required.")
+        try:
+            value = float(text)
+        except ValueError:
+            raise ValueError(f"{label} must be a number.")
+        if positive and value <= 0:
+            raise ValueError(f"{label} must be positive.")
+        return value
+    return parse
+
+
+def _cell_count(name):
+    label = field_labels[name]
+
+    def parse(text):
+        text = str(text).strip()
+        if not text:
+            raise ValueError(f"{label} is required.")
+        try:
+            value = int(text)
+        except ValueError:
+            raise ValueError(f"{label} must be a whole number.")
+        if value < 1:
+            raise ValueError(f"{label} must be at least 1.")
+        return value
+    return parse
+
+
+def _grading(name):
+    label = field_labels[name]
+
+    def parse(text):
+        try:
+            return parse_grading(text)
+        except ValueError as e:
+            raise ValueError(f"{label}: {e}")
+    return parse
+
+
+def _scale(scale_unit, custom_sign, custom_exp):
+    if scale_unit != "custom..":
+        return unit_scale.get(scale_unit, 1)
+    try:
+        exponent = int(custom_exp)
+    except ValueError:
+        exponent = 0
+    if not 1 <= exponent <= 10:
+        raise ValueError("The custom scale exponent must be a whole number from 1 to 10.")
+    return 10 ** (exponent if custom_sign == "+" else -exponent)
+
+
+def check_patch_names(patch_names, complete=False):
+    """Normalised patch names; ValueError for a bad name, or a name used with two types.
+
+    Unnamed faces are fine unless ``complete`` is set, as on saving the
+    boundary dialog.
+    """
+    patch_names = normalize_patch_names(patch_names)
+    types = {}
+    for face in patch_faces:
+        name = patch_names[face].get("name", "").strip()
+        if not name and not complete:
+            continue
+        is_valid, message = validate_boundary_name(name)
+        if not is_valid:
+            raise ValueError(f"Error for '{face}': {message}")
+        p_type = patch_names[face].get("type", "patch")
+        if types.setdefault(name, p_type) != p_type:
+            raise ValueError(f"Same boundary name '{name}' has different types!")
+    return patch_names
+
+
+def _is_reset(patch_names, *values):
+    if any(value != default for value, default in zip(values, field_defaults.values())):
+        return False
+    patch_names = normalize_patch_names(patch_names)
+    return all(val.get("type", "patch") == "patch" and not val.get("name", "").strip()
+               for val in patch_names.values())
+
+
+def _cubic(x, y, z):
+    sizes = [x["min"], x["max"], y["min"], y["max"], z["min"], z["max"]]
+    return max(sizes) / min(sizes) < 1 + 1e-6
+
+
+def box_validator(fields=None):
+    """The validator for the single-box form, filled from ``fields`` if given.
+
+    Rules: "origin x"..z, "length x"..z, "cells x"..z, "grading x"..z,
+    "scale" and "patch names" check single fields; "cells" (list),
+    "total cells", "spacing x"..z (min/max/mean cell size), "cell size"
+    (mean per axis), "cubic", "box", "boundary" (check_boundary),
+    "case" (as case_from_fields builds it),
+    "is reset" and "patches complete" are derived from them.
+    """
+    validator = Validator()
+    for name, default in field_defaults.items():
+        validator.add_input(name, default)
+    validator.add_input("patch_names", default_patch_names())
+
+    for axis in "xyz":
+        validator.add_rule(f"origin {axis}", [f"{axis}min"], _number(f"{axis}min"))
+        validator.add_rule(f"length {axis}", [f"length_{axis}"], _number(f"length_{axis}", positive=True))
+        validator.add_rule(f"cells {axis}", [f"cells_{axis}"], _cell_count(f"cells_{axis}"))
+        validator.add_rule(f"grading {axis}", [f"grading_{axis}"], _grading(f"grading_{axis}"))
+        validator.add_rule(f"spacing {axis}", [f"length {axis}", f"cells {axis}", f"grading {axis}"], spacing_stats)
+    validator.add_rule("scale", ["scale_unit", "custom_sign", "custom_exp"], _scale)
+    validator.add_rule("patch names", ["patch_names"], check_patch_names)
+
+    validator.add_rule("cells", ["cells x", "cells y", "cells z"], lambda *cells: list(cells))
+    validator.add_rule("total cells", ["cells"], lambda cells: cells[0] * cells[1] * cells[2])
+    validator.add_rule("cell size", ["spacing x", "spacing y", "spacing z"],
+                       lambda *spacings: [spacing["mean"] for spacing in spacings])
+    validator.add_rule("cubic", ["spacing x", "spacing y", "spacing z"], _cubic)
+    validator.add_rule("box", [f"{kind} {axis}" for kind in ("origin", "length", "grading") for axis in "xyz"] + ["cells"],
+                       lambda x0, y0, z0, lx, ly, lz, gx, gy, gz, cells: {
+                           "origin": [x0, y0, z0], "lengths": [lx, ly, lz], "cells": cells, "grading": [gx, gy, gz]})
+    validator.add_rule("boundary", ["box", "patch names"],
+                       lambda box, patch_names: check_boundary(dict(box, patch_names=patch_names)))
+    validator.add_rule("case", ["box", "scale", "patch names", "boundary"],
+                       lambda box, scale, patch_names, boundary: dict(box, scale=scale, patch_names=patch_names))
+    validator.add_rule("is reset", ["patch_names"] + list(field_defaults), _is_reset)
+    validator.add_rule("patches complete", ["patch_names"],
+                       lambda patch_names: all(val.get("name", "").strip()
+                                               for val in normalize_patch_names(patch_names).values()))
+
+    for name, value in (fields or {}).items():
+        if name in validator.inputs:
+            validator.set(name, value)
+    return validator